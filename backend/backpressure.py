@@ -0,0 +1,78 @@
+import time
+import asyncio
+import itertools
+from typing import Any, Dict, Optional, Tuple
+
+from metrics import RunningStats, metrics
+
+_stream_ids = itertools.count(1)
+
+
+class LatestFrameMailbox:
+    """
+    Single-slot, latest-frame-wins mailbox between a socket reader and a
+    frame processor. A frame that arrives while another is still waiting
+    replaces it and the older one is dropped, so the processor always works
+    on the newest frame and results never fall further behind the camera.
+    """
+
+    def __init__(self, name: str = "ws.recognition"):
+        self.name = name
+        self.stream_id = next(_stream_ids)
+        self._frame: Optional[Tuple[Any, float]] = None
+        self._ready = asyncio.Event()
+        self.closed = False
+        self.received = 0
+        self.processed = 0
+        self.dropped = 0
+        self._pending = 0  # frames received since the processor last took one
+        # Frames that arrived per processed frame; 1 means no backlog at all
+        self.queue_depth = RunningStats()
+        # Time from a frame's arrival to its result being sent
+        self.result_age = RunningStats()
+
+    def put(self, frame: Any):
+        self.received += 1
+        self._pending += 1
+        if self._frame is not None:
+            self.dropped += 1
+            metrics.incr(f"{self.name}.dropped")
+        self._frame = (frame, time.perf_counter())
+        self._ready.set()
+
+    def close(self):
+        self.closed = True
+        self._ready.set()
+
+    async def get(self) -> Optional[Tuple[Any, float]]:
+        """Waits for the newest frame; returns (frame, received_at), or None once closed."""
+        while self._frame is None:
+            if self.closed:
+                return None
+            self._ready.clear()
+            await self._ready.wait()
+        frame, self._frame = self._frame, None
+        self.queue_depth.record(self._pending)
+        metrics.observe(f"{self.name}.queue_depth", self._pending)
+        self._pending = 0
+        return frame
+
+    def done(self, received_at: float):
+        """Records that the result for a frame received at `received_at` was sent."""
+        self.processed += 1
+        age = (time.perf_counter() - received_at) * 1000
+        self.result_age.record(age)
+        metrics.record(f"{self.name}.result_age", age)
+
+    def snapshot(self) -> dict:
+        return {
+            "received": self.received,
+            "processed": self.processed,
+            "dropped": self.dropped,
+            "queue_depth": self.queue_depth.snapshot(),
+            "result_age_ms": self.result_age.snapshot(),
+        }
+
+
+# Open recognition sockets, by stream id (reported by GET /metrics)
+recognition_streams: Dict[int, LatestFrameMailbox] = {}
@@ -0,0 +1,127 @@
+import argparse
+import asyncio
+import time
+import numpy as np
+
+from llm import LLMClient
+from prompts import SUMMARY_PROMPT
+from speech import MockSTTBackend, create_stt_backend
+
+
+class _MockResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class MockGenerativeModel:
+    """Stands in for the Gemini model with a fixed response latency."""
+
+    def __init__(self, latency_s: float):
+        self.latency_s = latency_s
+
+    async def generate_content_async(self, prompt: str):
+        await asyncio.sleep(self.latency_s)
+        return _MockResponse('{"summary": "Talked about the weekend."}')
+
+
+def load_chunks(path: str, duration: float, chunk_s: float, bytes_per_second: int):
+    """Splits a recording (or random bytes of the same size) into recorder-sized chunks."""
+    if path:
+        with open(path, "rb") as f:
+            audio = f.read()
+    else:
+        audio = np.random.default_rng(0).bytes(int(duration * bytes_per_second))
+    count = max(1, int(round(duration / chunk_s)))
+    size = -(-len(audio) // count)
+    return [audio[i : i + size] for i in range(0, len(audio), size)]
+
+
+async def record(chunks, chunk_s: float):
+    """Yields chunks at the pace a MediaRecorder with a `chunk_s` timeslice would."""
+    for chunk in chunks:
+        await asyncio.sleep(chunk_s)
+        yield chunk
+
+
+async def run_batch(stt, llm, chunks, chunk_s):
+    """Current flow: record everything, then upload, then summarize."""
+    recorded = [chunk async for chunk in record(chunks, chunk_s)]
+    stopped = time.perf_counter()
+    transcript = await stt.transcribe(b"".join(recorded))
+    transcribed = time.perf_counter()
+    await llm.generate(SUMMARY_PROMPT.format(transcript=transcript))
+    return transcribed - stopped, time.perf_counter() - stopped
+
+
+async def run_stream(stt, llm, chunks, chunk_s):
+    """Streaming flow: chunks are uploaded while recording."""
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def upload():
+        while True:
+            chunk = await queue.get()
+            if chunk is None:
+                return
+            yield chunk
+
+    transcription = asyncio.create_task(stt.transcribe_stream(upload()))
+    async for chunk in record(chunks, chunk_s):
+        await queue.put(chunk)
+    stopped = time.perf_counter()
+    await queue.put(None)
+    transcript = await transcription
+    transcribed = time.perf_counter()
+    await llm.generate(SUMMARY_PROMPT.format(transcript=transcript))
+    return transcribed - stopped, time.perf_counter() - stopped
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmarks record -> transcript -> summary latency, batch upload vs streaming."
+    )
+    parser.add_argument("--backend", default="mock", help="STT backend (mock, deepgram)")
+    parser.add_argument("--audio", default="", help="webm recording to replay instead of random bytes")
+    parser.add_argument("--duration", type=float, default=8.0, help="Recording length in seconds")
+    parser.add_argument("--chunk-ms", type=int, default=500, help="MediaRecorder timeslice")
+    parser.add_argument("--bytes-per-second", type=int, default=4000)
+    parser.add_argument("--rtf", type=float, default=0.1, help="Mock STT real-time factor")
+    parser.add_argument("--stt-latency", type=float, default=0.15, help="Mock STT fixed latency (s)")
+    parser.add_argument(
+        "--upload-bytes-per-s", type=int, default=250_000, help="Mock STT upload bandwidth (what streaming saves)"
+    )
+    parser.add_argument("--llm-latency", type=float, default=0.8, help="Mock Gemini latency (s)")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.backend == "mock":
+        stt = MockSTTBackend(
+            base_latency_s=args.stt_latency,
+            realtime_factor=args.rtf,
+            bytes_per_second=args.bytes_per_second,
+            upload_bytes_per_s=args.upload_bytes_per_s,
+        )
+    else:
+        stt = create_stt_backend(args.backend)
+    chunk_s = args.chunk_ms / 1000
+    chunks = load_chunks(args.audio, args.duration, chunk_s, args.bytes_per_second)
+
+    async def bench():
+        results = {}
+        for mode, run in (("batch", run_batch), ("stream", run_stream)):
+            # Fresh client per mode so prompt coalescing can't leak between runs
+            llm = LLMClient(MockGenerativeModel(args.llm_latency))
+            timings = np.asarray([await run(stt, llm, chunks, chunk_s) for _ in range(args.runs)])
+            results[mode] = timings.mean(axis=0) * 1000
+        await stt.close()
+        return results
+
+    results = asyncio.run(bench())
+    print(f"{len(chunks)} chunks, {sum(map(len, chunks))} bytes, backend={stt.name}")
+    print("Latency after the recording stops (ms):")
+    for mode, (transcript_ms, summary_ms) in results.items():
+        print(f"  {mode:6s}  transcript {transcript_ms:8.1f}  summary {summary_ms:8.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
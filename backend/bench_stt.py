@@ -0,0 +1,134 @@
+import argparse
+import asyncio
+import re
+import time
+import wave
+from pathlib import Path
+import numpy as np
+
+from speech import create_stt_backend
+
+AUDIO_SUFFIXES = (".wav", ".webm", ".ogg", ".mp3")
+
+
+def load_fixtures(directory: str):
+    """Recordings with a same-named .txt reference transcript next to them."""
+    fixtures = []
+    for path in sorted(Path(directory).iterdir()):
+        reference = path.with_suffix(".txt")
+        if path.suffix in AUDIO_SUFFIXES and reference.exists():
+            fixtures.append((path, reference.read_text().strip()))
+    return fixtures
+
+
+def words(text: str):
+    return re.sub(r"[^a-z0-9' ]+", " ", text.lower()).split()
+
+
+def word_errors(reference: str, hypothesis: str):
+    """(edit distance in words, reference length)."""
+    ref, hyp = words(reference), words(hypothesis)
+    row = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        previous, row[0] = row[0], i
+        for j, h in enumerate(hyp, 1):
+            previous, row[j] = row[j], min(row[j] + 1, row[j - 1] + 1, previous + (r != h))
+    return row[-1], len(ref)
+
+
+def wav_pcm(path: Path):
+    """16 kHz mono int16 samples of a WAV fixture, or None if it has another format."""
+    with wave.open(str(path)) as f:
+        if f.getframerate() != 16000 or f.getnchannels() != 1 or f.getsampwidth() != 2:
+            return None
+        return f.readframes(f.getnframes())
+
+
+def audio_seconds(path: Path) -> float:
+    if path.suffix != ".wav":
+        return 0.0
+    with wave.open(str(path)) as f:
+        return f.getnframes() / f.getframerate()
+
+
+async def run_batch(backend, path: Path):
+    audio = path.read_bytes()
+    content_type = "audio/wav" if path.suffix == ".wav" else f"audio/{path.suffix[1:]}"
+    start = time.perf_counter()
+    transcript = await backend.transcribe(audio, content_type)
+    return transcript, time.perf_counter() - start
+
+
+async def run_live(backend, pcm: bytes, chunk_ms: int = 100):
+    """Plays PCM into the live socket in real time; latency is end of audio -> last transcript."""
+    parts = []
+    chunk = 16000 * 2 * chunk_ms // 1000
+    async with backend.connect_live(
+        model="nova-2", language="en-US", smart_format="true", interim_results="false"
+    ) as socket:
+        socket.on("transcript", lambda result, **kwargs: parts.append(result.channel.alternatives[0].transcript))
+        for i in range(0, len(pcm), chunk):
+            await socket.send_media(pcm[i : i + chunk])
+            await asyncio.sleep(chunk_ms / 1000)
+        ended = time.perf_counter()
+    return " ".join(parts), time.perf_counter() - ended
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Latency and word error rate of the STT backends on recorded fixtures."
+    )
+    parser.add_argument("--fixtures", default="fixtures/stt", help="Directory of audio + .txt references")
+    parser.add_argument("--backends", default="deepgram,local", help="Comma-separated STT_BACKEND names")
+    parser.add_argument("--live", action="store_true", help="Also replay 16 kHz WAV fixtures through the live socket")
+    args = parser.parse_args()
+
+    fixtures = load_fixtures(args.fixtures)
+    if not fixtures:
+        print(f"No fixtures in {args.fixtures} (expected <name>.wav/.webm with <name>.txt)")
+        return 1
+    print(f"{len(fixtures)} fixtures")
+
+    async def bench(name: str):
+        backend = create_stt_backend(name)
+        backend.warmup()
+        results = {mode: {"latency": [], "edits": 0, "words": 0, "audio_s": 0.0, "busy_s": 0.0}
+                   for mode in (("batch", "live") if args.live else ("batch",))}
+        for path, reference in fixtures:
+            for mode, stats in results.items():
+                if mode == "live":
+                    pcm = wav_pcm(path) if path.suffix == ".wav" else None
+                    if pcm is None:
+                        continue
+                    transcript, seconds = await run_live(backend, pcm)
+                else:
+                    transcript, seconds = await run_batch(backend, path)
+                edits, total = word_errors(reference, transcript)
+                stats["edits"] += edits
+                stats["words"] += total
+                stats["latency"].append(seconds * 1000)
+                duration = audio_seconds(path)
+                if duration:
+                    stats["audio_s"] += duration
+                    stats["busy_s"] += seconds
+        await backend.close()
+        return results
+
+    # RTF: batch processing time per second of audio (WAV fixtures only)
+    print(f"{'backend':10s} {'mode':6s} {'n':>4s} {'p50 ms':>9s} {'p95 ms':>9s} {'RTF':>6s} {'WER':>7s}")
+    for name in args.backends.split(","):
+        for mode, stats in asyncio.run(bench(name)).items():
+            if not stats["latency"]:
+                continue
+            latency = np.asarray(stats["latency"])
+            rtf = stats["busy_s"] / stats["audio_s"] if stats["audio_s"] and mode == "batch" else float("nan")
+            wer = stats["edits"] / stats["words"] if stats["words"] else 0.0
+            print(
+                f"{name:10s} {mode:6s} {len(latency):4d} {np.percentile(latency, 50):9.1f} "
+                f"{np.percentile(latency, 95):9.1f} {rtf:6.2f} {wer:7.2%}"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
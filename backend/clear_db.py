@@ -1,5 +1,6 @@
 import asyncio
 import os
+from datetime import datetime, timezone
 from motor.motor_asyncio import AsyncIOMotorClient
 from dotenv import load_dotenv
 
@@ -18,6 +19,15 @@ async def clear_database():
 
     print("Clearing collections...")
 
+    # Tombstones, so running servers and face cache snapshots drop everyone
+    # on their next catch-up (see models.delete_people)
+    ids = await db.people.distinct("_id")
+    if ids:
+        now = datetime.now(timezone.utc)
+        await db.deleted_people.insert_many(
+            [{"person_id": person_id, "deleted_at": now} for person_id in ids]
+        )
+
     # Delete all documents from 'people' collection
     result_people = await db.people.delete_many({})
     print(f"Deleted {result_people.deleted_count} documents from 'people' collection.")
@@ -0,0 +1,139 @@
+import os
+import threading
+from typing import List, Optional, Tuple
+from dotenv import load_dotenv
+
+from metrics import metrics
+from tracking import bbox_iou
+
+load_dotenv()
+
+# Adaptive detection: run the detector on crops around tracked faces, sized
+# from the faces' previous size, instead of a padded 640x640 input each frame
+DETECT_ADAPTIVE = os.getenv("DETECT_ADAPTIVE", "0") == "1"
+# Scan the whole frame at the default size every N frames to pick up newcomers
+DETECT_FULL_SCAN_EVERY = int(os.getenv("DETECT_FULL_SCAN_EVERY", "5"))
+# Faces are scaled to about this size (px) at the detector input
+DETECT_MIN_FACE_PX = int(os.getenv("DETECT_MIN_FACE_PX", "48"))
+# Crop margin around a tracked face, as a fraction of its size per side
+DETECT_ROI_MARGIN = float(os.getenv("DETECT_ROI_MARGIN", "0.75"))
+# Estimated detector cost at DET_SIZE (SCRFD-500M: 0.5 GFLOPs at 640x480)
+DETECT_MFLOPS = float(os.getenv("DETECT_MFLOPS", "667"))
+
+DET_SIZE = (640, 640)
+
+# (x1, y1, x2, y2, (input_width, input_height)) in frame pixels
+Region = Tuple[int, int, int, int, Tuple[int, int]]
+
+
+def _ceil32(value: float, low: int = 64, high: int = 640) -> int:
+    """Detector input sides must be multiples of the largest stride (32)."""
+    return int(min(high, max(low, -(-int(value) // 32) * 32)))
+
+
+class DetectorCost:
+    """Measured detector latency per input pixel, used to estimate time saved."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.pixels = 0
+        self.seconds = 0.0
+
+    def record(self, pixels: int, seconds: float):
+        with self._lock:
+            self.pixels += pixels
+            self.seconds += seconds
+
+    @property
+    def ms_per_pixel(self) -> float:
+        return self.seconds * 1000 / self.pixels if self.pixels else 0.0
+
+
+# Singleton instance
+detector_cost = DetectorCost()
+
+
+class DetectionPlanner:
+    """
+    Per-connection choice of what the detector looks at in the next frame.
+
+    Full scans at DET_SIZE run on the first frame, every `full_scan_every`
+    frames, and whenever a tracked face was not found in its crop. In
+    between, only expanded regions around the tracked faces are detected,
+    each at an input size that brings the face to about `min_face_px`. If
+    those crops would cover most of the frame, the whole frame is scanned
+    at a size fitted to the smallest tracked face instead.
+    """
+
+    def __init__(
+        self,
+        full_scan_every: int = DETECT_FULL_SCAN_EVERY,
+        min_face_px: int = DETECT_MIN_FACE_PX,
+        roi_margin: float = DETECT_ROI_MARGIN,
+        max_roi_coverage: float = 0.5,
+        det_size: Tuple[int, int] = DET_SIZE,
+    ):
+        self.full_scan_every = full_scan_every
+        self.min_face_px = min_face_px
+        self.roi_margin = roi_margin
+        self.max_roi_coverage = max_roi_coverage
+        self.det_size = det_size
+        self.frame = 0
+        self.force_full = True
+        self.mode = "full"
+
+    def plan(self, boxes: List[List[int]], shape: Tuple[int, int]) -> Optional[List[Region]]:
+        """
+        Returns the regions to detect in a frame of `shape` (height, width)
+        given the tracked face boxes ([top, right, bottom, left], frame
+        pixels), or None for a full scan at the default size.
+        """
+        self.frame += 1
+        self.mode = "full"
+        if self.force_full or not boxes or self.frame % self.full_scan_every == 0:
+            return None
+
+        height, width = shape[:2]
+        sizes = [max(b[2] - b[0], b[1] - b[3], 1) for b in boxes]
+        regions = [self._roi(box, size, width, height) for box, size in zip(boxes, sizes)]
+        covered = sum((x2 - x1) * (y2 - y1) for x1, y1, x2, y2, _ in regions)
+        if covered > self.max_roi_coverage * width * height:
+            scale = min(
+                self.min_face_px / min(sizes),
+                self.det_size[0] / width,
+                self.det_size[1] / height,
+            )
+            self.mode = "fitted"
+            return [(0, 0, width, height, (_ceil32(width * scale), _ceil32(height * scale)))]
+        self.mode = "roi"
+        return regions
+
+    def _roi(self, box: List[int], size: int, width: int, height: int) -> Region:
+        top, right, bottom, left = box
+        half = size / 2 + size * self.roi_margin
+        cx, cy = (left + right) / 2, (top + bottom) / 2
+        x1, y1 = max(0, int(cx - half)), max(0, int(cy - half))
+        x2, y2 = min(width, int(cx + half)), min(height, int(cy + half))
+        scale = self.min_face_px / size
+        input_size = (_ceil32((x2 - x1) * scale, high=320), _ceil32((y2 - y1) * scale, high=320))
+        return (x1, y1, x2, y2, input_size)
+
+    def merge(self, detections: List[dict], iou_threshold: float = 0.4) -> List[dict]:
+        """Drops duplicates of one face found in overlapping crops, keeping the best score."""
+        kept = []
+        for det in sorted(detections, key=lambda d: d["det_score"], reverse=True):
+            if all(bbox_iou(det["bbox"], other["bbox"]) < iou_threshold for other in kept):
+                kept.append(det)
+        return kept
+
+    def observe(self, regions: Optional[List[Region]], boxes: List[List[int]], found: int):
+        """Updates the plan state after a frame and reports the detector work saved."""
+        metrics.incr(f"detect.frames.{self.mode}")
+        # A tracked face left its crop: look at the whole frame next time
+        self.force_full = regions is not None and found < len(boxes)
+
+        baseline = self.det_size[0] * self.det_size[1]
+        pixels = baseline if regions is None else sum(w * h for *_, (w, h) in regions)
+        metrics.observe("detect.input_kpx", pixels / 1000)
+        metrics.observe("detect.mflops_saved", (baseline - pixels) / baseline * DETECT_MFLOPS)
+        metrics.observe("detect.latency_saved_ms", (baseline - pixels) * detector_cost.ms_per_pixel)
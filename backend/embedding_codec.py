@@ -0,0 +1,64 @@
+import os
+import numpy as np
+from bson.binary import Binary
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Storage precision of face embeddings: float32, or float16 (half the size)
+EMBEDDING_DTYPE = os.getenv("EMBEDDING_DTYPE", "float32")
+# Tag of the recognition model that produced stored embeddings; embeddings
+# from another model live in a different space and must not be matched.
+# Unset or empty: the recognition model pack's name.
+EMBEDDING_MODEL_VERSION = os.getenv("EMBEDDING_MODEL_VERSION") or os.getenv(
+    "RECOGNITION_MODEL_PACK", "buffalo_sc"
+)
+
+# Most embeddings kept per person: the registration one plus gallery
+# prototypes consolidated from confident matches (see gallery.py)
+GALLERY_MAX_PROTOTYPES = int(os.getenv("GALLERY_MAX_PROTOTYPES", "5"))
+
+DTYPES = {"float32": np.dtype("<f4"), "float16": np.dtype("<f2")}
+
+
+def pack_embedding(embedding, dtype: str = EMBEDDING_DTYPE) -> dict:
+    """
+    Document fields storing an embedding as packed little-endian BSON binary,
+    with its dtype and the model version that produced it.
+    """
+    packed = np.asarray(embedding, dtype=DTYPES[dtype]).tobytes()
+    return {
+        "face_embedding": Binary(packed),
+        "embedding_dtype": dtype,
+        "embedding_model": EMBEDDING_MODEL_VERSION,
+    }
+
+
+def unpack_embedding(value, dtype: str = "float32") -> np.ndarray:
+    """Decodes a stored embedding: packed binary, or a legacy array of doubles."""
+    if isinstance(value, bytes):  # BSON binary (subtype 0) decodes to bytes
+        return np.frombuffer(value, dtype=DTYPES[dtype])
+    return np.asarray(value, dtype=np.float32)
+
+
+def is_current_model(document: dict) -> bool:
+    """Untagged (legacy) embeddings are assumed to come from the current model."""
+    return document.get("embedding_model", EMBEDDING_MODEL_VERSION) == EMBEDDING_MODEL_VERSION
+
+
+def pack_gallery(embeddings, dtype: str = EMBEDDING_DTYPE) -> list:
+    """Gallery prototypes as a list of packed binaries (same dtype as face_embedding)."""
+    return [Binary(np.asarray(e, dtype=DTYPES[dtype]).tobytes()) for e in embeddings]
+
+
+def row_key(person_id: str, k: int = 0) -> str:
+    """
+    Face cache key of a person's k-th embedding: the person id for the one
+    captured at registration, "<id>:<k>" for gallery prototypes.
+    """
+    return str(person_id) if k == 0 else f"{person_id}:{k}"
+
+
+def person_of(key: str) -> str:
+    """Person id of a face cache key (see row_key)."""
+    return key.split(":", 1)[0]
@@ -0,0 +1,219 @@
+import os
+import numpy as np
+from typing import List, Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Index backend for the face cache: "flat" (exact scan) or "ivf" (IVF-flat ANN)
+FACE_INDEX = os.getenv("FACE_INDEX", "flat")
+FACE_INDEX_PATH = os.getenv("FACE_INDEX_PATH", "face_index.npz")
+FACE_INDEX_NLIST = int(os.getenv("FACE_INDEX_NLIST", "256"))
+FACE_INDEX_NPROBE = int(os.getenv("FACE_INDEX_NPROBE", "16"))
+FACE_INDEX_MIN_ROWS = int(os.getenv("FACE_INDEX_MIN_ROWS", "20000"))
+
+
+class FlatIndex:
+    """
+    Exact index: every cached row is a candidate.
+    The EmbeddingCache calls the hooks below whenever its rows change, so
+    other backends can keep their own per-row state in sync.
+    """
+
+    name = "flat"
+    trained = False
+
+    def build(self, matrix: np.ndarray, ids: List[str]):
+        pass
+
+    def add(self, row: int, embedding: np.ndarray):
+        pass
+
+    def move(self, src: int, dst: int):
+        pass
+
+    def truncate(self, size: int):
+        pass
+
+    def needs_build(self, size: int) -> bool:
+        """Whether the cache, now `size` rows, should call build() again."""
+        return False
+
+    def save(self, ids: List[str]):
+        pass
+
+    def candidates(self, target: np.ndarray, size: int) -> Optional[np.ndarray]:
+        """Returns candidate row indices for one normalized target, or None for all rows."""
+        return None
+
+
+class IVFFlatIndex(FlatIndex):
+    """
+    Inverted-file index written in NumPy.
+
+    Rows are clustered around `nlist` spherical k-means centroids; a query
+    only scores the rows of its `nprobe` closest clusters. Raising `nprobe`
+    trades latency for recall. Below `min_rows` the exact scan is used; a
+    cache that reaches it through live upserts is trained on its next search.
+    Centroids and per-person assignments are persisted to `path` so a
+    restart doesn't retrain.
+    """
+
+    name = "ivf"
+
+    def __init__(
+        self,
+        nlist: int = FACE_INDEX_NLIST,
+        nprobe: int = FACE_INDEX_NPROBE,
+        min_rows: int = FACE_INDEX_MIN_ROWS,
+        path: Optional[str] = FACE_INDEX_PATH,
+        kmeans_iters: int = 10,
+        train_sample: int = 64,
+    ):
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.min_rows = min_rows
+        self.path = path
+        self.kmeans_iters = kmeans_iters
+        self.train_sample = train_sample  # training rows per centroid
+        self.centroids = None  # (nlist, dim) normalized
+        self.assignments = np.zeros(0, dtype=np.int32)  # row -> list id
+        # Inverted lists in CSR form, rebuilt lazily after rows change
+        self._order = None
+        self._offsets = None
+
+    @property
+    def trained(self) -> bool:
+        return self.centroids is not None
+
+    def _reserve(self, capacity: int):
+        if capacity > len(self.assignments):
+            grown = np.zeros(max(capacity, 2 * len(self.assignments)), dtype=np.int32)
+            grown[: len(self.assignments)] = self.assignments
+            self.assignments = grown
+
+    def _lists(self, size: int):
+        """Returns (rows sorted by list id, list offsets) for the first `size` rows."""
+        if self._order is None or len(self._order) != size:
+            assignments = self.assignments[:size]
+            self._order = np.argsort(assignments, kind="stable")
+            counts = np.bincount(assignments, minlength=len(self.centroids))
+            self._offsets = np.concatenate(([0], np.cumsum(counts)))
+        return self._order, self._offsets
+
+    def _assign(self, embeddings: np.ndarray, chunk: int = 8192) -> np.ndarray:
+        """Returns the closest centroid of each normalized row."""
+        out = np.empty(len(embeddings), dtype=np.int32)
+        for start in range(0, len(embeddings), chunk):
+            block = embeddings[start : start + chunk]
+            out[start : start + chunk] = np.argmax(block @ self.centroids.T, axis=1)
+        return out
+
+    def _train(self, matrix: np.ndarray):
+        """Spherical k-means on a random sample of the cached rows."""
+        rng = np.random.default_rng(0)
+        nlist = min(self.nlist, len(matrix))
+        sample_size = min(len(matrix), nlist * self.train_sample)
+        sample = matrix[rng.choice(len(matrix), sample_size, replace=False)]
+        centroids = sample[rng.choice(sample_size, nlist, replace=False)].copy()
+
+        for _ in range(self.kmeans_iters):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            filled = norms[:, 0] > 0
+            # Empty clusters keep their previous centroid
+            centroids[filled] = sums[filled] / norms[filled]
+
+        self.centroids = centroids.astype(np.float32)
+        print(f"DEBUG: IVF index trained with {nlist} lists on {sample_size} rows")
+
+    def _load(self, matrix: np.ndarray, ids: List[str]) -> bool:
+        """Restores centroids and assignments from disk if they fit this cache."""
+        if not self.path or not os.path.exists(self.path):
+            return False
+        try:
+            data = np.load(self.path, allow_pickle=False)
+            centroids = data["centroids"]
+            if centroids.shape[1] != matrix.shape[1] or len(centroids) != min(
+                self.nlist, len(matrix)
+            ):
+                return False
+            saved = dict(zip(data["ids"].tolist(), data["assignments"].tolist()))
+        except Exception as e:
+            print(f"Error loading face index from {self.path}: {e}")
+            return False
+
+        self.centroids = centroids
+        rows = [saved.get(person_id, -1) for person_id in ids]
+        assignments = np.asarray(rows, dtype=np.int32)
+        missing = np.flatnonzero(assignments < 0)
+        if len(missing):
+            assignments[missing] = self._assign(matrix[missing])
+        self._reserve(len(ids))
+        self.assignments[: len(ids)] = assignments
+        print(
+            f"DEBUG: IVF index loaded from {self.path} ({len(missing)} new rows assigned)"
+        )
+        return True
+
+    def save(self, ids: List[str]):
+        if not self.path or not self.trained:
+            return
+        try:
+            np.savez(
+                self.path,
+                centroids=self.centroids,
+                ids=np.asarray(ids, dtype="U32"),
+                assignments=self.assignments[: len(ids)],
+            )
+        except Exception as e:
+            print(f"Error saving face index to {self.path}: {e}")
+
+    def build(self, matrix: np.ndarray, ids: List[str]):
+        self.centroids = None
+        self._order = None
+        if len(matrix) < self.min_rows:
+            return
+        if self._load(matrix, ids):
+            return
+        self._train(matrix)
+        self._reserve(len(matrix))
+        self.assignments[: len(matrix)] = self._assign(matrix)
+        self.save(ids)
+
+    def add(self, row: int, embedding: np.ndarray):
+        if not self.trained:
+            return
+        self._reserve(row + 1)
+        self.assignments[row] = self._assign(embedding[None, :])[0]
+        self._order = None
+
+    def move(self, src: int, dst: int):
+        if self.trained:
+            self.assignments[dst] = self.assignments[src]
+            self._order = None
+
+    def truncate(self, size: int):
+        self._order = None
+
+    def needs_build(self, size: int) -> bool:
+        # add() can't train (it sees one row), so a cache that grew past
+        # min_rows through live upserts is trained on its next search
+        return not self.trained and size >= self.min_rows
+
+    def candidates(self, target: np.ndarray, size: int) -> Optional[np.ndarray]:
+        if not self.trained:
+            return None
+        nprobe = min(self.nprobe, len(self.centroids))
+        probe = np.argpartition(-(self.centroids @ target), nprobe - 1)[:nprobe]
+        order, offsets = self._lists(size)
+        return np.concatenate([order[offsets[l] : offsets[l + 1]] for l in probe])
+
+
+def create_index(backend: str = FACE_INDEX) -> FlatIndex:
+    """Builds the configured index backend for the face cache."""
+    if backend == "ivf":
+        return IVFFlatIndex()
+    return FlatIndex()
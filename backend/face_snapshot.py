@@ -0,0 +1,150 @@
+import os
+import json
+import time
+import numpy as np
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from dotenv import load_dotenv
+
+from embedding_codec import EMBEDDING_MODEL_VERSION, person_of
+from metrics import metrics
+from models import PERSON_TOMBSTONE_TTL_S, load_face_matrix, load_removed_face_ids
+
+load_dotenv()
+
+# On-disk snapshot of the face cache: <path>.npy (normalized embedding matrix,
+# memory-mapped on boot) and <path>.json (ids, names, high-water mark).
+# Empty disables snapshots.
+FACE_SNAPSHOT_PATH = os.getenv("FACE_SNAPSHOT_PATH", "face_cache")
+# Catch-up re-reads changes from slightly before the high-water mark, for
+# writes that were in flight while the snapshot's source was being read
+FACE_SNAPSHOT_OVERLAP_S = float(os.getenv("FACE_SNAPSHOT_OVERLAP_S", "60"))
+
+
+class FaceSnapshot:
+    """
+    Persists an EmbeddingCache as a memory-mapped matrix plus metadata, so a
+    restart maps the matrix instead of decoding every embedding from MongoDB
+    and then only reads the people changed since the snapshot.
+
+    `synced_at` is the high-water mark: the time of the last read from the
+    database. Everything updated before it is in the cache.
+    """
+
+    def __init__(self, path: str = FACE_SNAPSHOT_PATH):
+        self.path = path
+        self.synced_at: Optional[datetime] = None
+
+    @property
+    def matrix_path(self) -> str:
+        return f"{self.path}.npy"
+
+    @property
+    def meta_path(self) -> str:
+        return f"{self.path}.json"
+
+    def save(self, cache):
+        """Writes the cache atomically (temp files, then rename)."""
+        if not self.path or self.synced_at is None:
+            return
+        tmp = f".tmp{os.getpid()}"
+        try:
+            with open(self.matrix_path + tmp, "wb") as f:
+                np.save(f, np.ascontiguousarray(cache.matrix[: cache.size]))
+            meta = {
+                "model": EMBEDDING_MODEL_VERSION,
+                "dim": cache.dim,
+                "synced_at": self.synced_at.isoformat(),
+                "ids": list(cache.ids[: cache.size]),
+                "names": list(cache.names[: cache.size]),
+            }
+            with open(self.meta_path + tmp, "w") as f:
+                json.dump(meta, f)
+            # The matrix goes first: metadata never points at a shorter matrix
+            os.replace(self.matrix_path + tmp, self.matrix_path)
+            os.replace(self.meta_path + tmp, self.meta_path)
+        except Exception as e:
+            print(f"Error saving face cache snapshot to {self.path}: {e}")
+
+    def _map(self, cache) -> bool:
+        """Attaches the snapshot to `cache` if it fits the current model."""
+        if not self.path or not os.path.exists(self.meta_path):
+            return False
+        try:
+            with open(self.meta_path) as f:
+                meta = json.load(f)
+            if meta["model"] != EMBEDDING_MODEL_VERSION or meta["dim"] != cache.dim:
+                print(f"Face cache snapshot {self.path} is for another model; ignoring it.")
+                return False
+            # Copy-on-write: in-place cache updates never touch the file
+            matrix = np.load(self.matrix_path, mmap_mode="c")
+            if len(matrix) != len(meta["ids"]):
+                return False
+            synced_at = datetime.fromisoformat(meta["synced_at"])
+            if datetime.now(timezone.utc) - synced_at > timedelta(seconds=PERSON_TOMBSTONE_TTL_S):
+                # Tombstones of people deleted since then may have expired
+                print(f"Face cache snapshot {self.path} is too old to catch up; reloading.")
+                return False
+        except Exception as e:
+            print(f"Error loading face cache snapshot from {self.path}: {e}")
+            return False
+        cache.attach(meta["ids"], meta["names"], matrix)
+        self.synced_at = synced_at
+        return True
+
+    async def restore(self, cache):
+        """
+        Fills `cache` from the snapshot and catches up with the people added,
+        renamed or deleted since; falls back to a full load from MongoDB.
+        """
+        start = time.perf_counter()
+        if not self._map(cache):
+            await self.reload(cache)
+            elapsed = (time.perf_counter() - start) * 1000
+            metrics.record("startup.face_cache", elapsed)
+            print(f"Face cache loaded with {len(cache)} faces in {elapsed:.0f}ms.")
+            return
+
+        mapped = (time.perf_counter() - start) * 1000
+        changed, deleted = await self.catch_up(cache)
+        if changed or deleted:
+            self.save(cache)
+
+        elapsed = (time.perf_counter() - start) * 1000
+        metrics.record("startup.face_cache", elapsed)
+        print(
+            f"Face cache mapped from {self.matrix_path} in {mapped:.0f}ms and caught up "
+            f"({changed} changed, {deleted} deleted) in {elapsed:.0f}ms: {len(cache)} faces."
+        )
+
+    async def catch_up(self, cache):
+        """
+        Applies the people added, renamed or deleted since the high-water
+        mark to `cache` and advances the mark. Returns (changed, deleted).
+        Only the people changed or deleted since the mark are read.
+        """
+        synced_at = datetime.now(timezone.utc)
+        since = self.synced_at - timedelta(seconds=FACE_SNAPSHOT_OVERLAP_S)
+        keys, names, matrix = await load_face_matrix(cache.dim, since=since)
+        # Rows come per person: registration embedding, then gallery prototypes
+        changed = {}
+        for key, name, embedding in zip(keys, names, matrix):
+            changed.setdefault(person_of(key), (name, []))[1].append(embedding)
+        for person_id, (name, embeddings) in changed.items():
+            # Also drops gallery rows the person no longer has
+            cache.set_person(person_id, name, embeddings)
+        removed = await load_removed_face_ids(since)
+        deleted = sum(cache.delete_person(person_id) for person_id in removed - changed.keys())
+        self.synced_at = synced_at
+        return len(changed), deleted
+
+    async def reload(self, cache):
+        """Rebuilds `cache` from MongoDB and rewrites the snapshot."""
+        synced_at = datetime.now(timezone.utc)
+        cache.load(*await load_face_matrix(cache.dim))
+        self.synced_at = synced_at
+        self.save(cache)
+
+
+# Singleton instance
+face_snapshot = FaceSnapshot()
@@ -0,0 +1,129 @@
+import os
+import asyncio
+from pymongo.errors import PyMongoError
+from dotenv import load_dotenv
+
+from embedding_codec import is_current_model
+from face_snapshot import face_snapshot
+from models import db, face_embeddings_of, latest_memory_cache
+
+load_dotenv()
+
+# How often a follower tries to take over from a dead leader, and how often
+# the leader polls MongoDB when change streams are unavailable (standalone server)
+FACE_SYNC_POLL_S = float(os.getenv("FACE_SYNC_POLL_S", "30"))
+
+
+class FaceCacheSync:
+    """
+    Keeps a SharedEmbeddingCache in step with MongoDB across worker processes.
+
+    Every worker writes its own registrations and renames straight to the
+    shared store. One worker, the leader (elected with the store's leader
+    lock), additionally loads the store at startup and applies changes made
+    outside the app (other servers, scripts): from a change stream on the
+    people collection, or by polling with the snapshot catch-up when change
+    streams are unavailable. When the leader exits, a follower takes over.
+
+    Every worker also follows new memories from a change stream, so its
+    latest_memory_cache picks up memories stored by the other workers (with
+    no change stream, the cache's TTL bounds how stale it gets).
+    """
+
+    def __init__(self, cache, poll_s: float = FACE_SYNC_POLL_S):
+        self.cache = cache
+        self.poll_s = poll_s
+        self.task = None
+        self.memories_task = None
+
+    @property
+    def is_leader(self) -> bool:
+        return self.cache.store.is_leader
+
+    async def start(self):
+        self.memories_task = asyncio.create_task(self._follow_memories())
+        if self.cache.store.try_lead():
+            await face_snapshot.restore(self.cache)
+            self.task = asyncio.create_task(self._follow_changes())
+        else:
+            self.cache.refresh()
+            print(f"Face cache shared from {self.cache.store.path}: {len(self.cache)} faces.")
+            self.task = asyncio.create_task(self._stand_by())
+
+    async def stop(self):
+        for task in (self.task, self.memories_task):
+            if task:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self.cache.store.resign()
+
+    async def _stand_by(self):
+        while not self.cache.store.try_lead():
+            await asyncio.sleep(self.poll_s)
+        print(f"Face cache: took over as leader (pid {os.getpid()}).")
+        if face_snapshot.synced_at is None:
+            await face_snapshot.restore(self.cache)
+        await self._follow_changes()
+
+    async def _follow_changes(self):
+        pipeline = [{"$match": {"operationType": {"$in": ["insert", "update", "replace", "delete"]}}}]
+        try:
+            async with db.people.watch(pipeline, full_document="updateLookup") as stream:
+                # Changes made between the load and the stream opening
+                await face_snapshot.catch_up(self.cache)
+                async for change in stream:
+                    self._apply(change)
+        except PyMongoError as e:
+            print(f"Face cache: no change stream ({e}); polling every {self.poll_s:.0f}s.")
+        while True:
+            await asyncio.sleep(self.poll_s)
+            try:
+                generation = self.cache.store.generation
+                changed, deleted = await face_snapshot.catch_up(self.cache)
+                # Rows re-read from the overlap window are often unchanged
+                if self.cache.store.generation != generation:
+                    print(f"Face cache: caught up ({changed} changed, {deleted} deleted).")
+            except PyMongoError as e:
+                print(f"Face cache poll failed: {e}")
+
+    async def _follow_memories(self):
+        pipeline = [
+            {"$match": {"operationType": "insert"}},
+            {
+                "$project": {
+                    "fullDocument.person_id": 1,
+                    "fullDocument.summary": 1,
+                    "fullDocument.timestamp": 1,
+                }
+            },
+        ]
+        try:
+            async with db.memories.watch(pipeline) as stream:
+                async for change in stream:
+                    memory = change["fullDocument"]
+                    latest_memory_cache.offer(
+                        str(memory["person_id"]),
+                        {"summary": memory.get("summary"), "timestamp": memory["timestamp"]},
+                        replace_only=True,
+                    )
+        except PyMongoError as e:
+            print(
+                f"Latest memory cache: no change stream ({e}); entries expire "
+                f"after {latest_memory_cache.ttl_s:.0f}s."
+            )
+
+    def _apply(self, change: dict):
+        person_id = str(change["documentKey"]["_id"])
+        doc = change.get("fullDocument")
+        if change["operationType"] == "delete" or doc is None:
+            self.cache.delete_person(person_id)
+        elif not is_current_model(doc):
+            self.cache.delete_person(person_id)
+        else:
+            self.cache.set_person(person_id, doc["name"], face_embeddings_of(doc))
+        if "clusterTime" in change:
+            # Every change up to this one is applied
+            face_snapshot.synced_at = change["clusterTime"].as_datetime()
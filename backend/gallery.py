@@ -0,0 +1,190 @@
+import os
+import time
+import asyncio
+import numpy as np
+from collections import OrderedDict
+from typing import List
+from dotenv import load_dotenv
+
+from embedding_codec import GALLERY_MAX_PROTOTYPES, person_of, row_key
+from metrics import metrics
+from models import get_face_embeddings_of, update_person_gallery
+from recognition import face_cache
+
+load_dotenv()
+
+# Matches at or above this similarity are confident enough to learn from...
+GALLERY_MIN_SIMILARITY = float(os.getenv("GALLERY_MIN_SIMILARITY", "0.65"))
+# ... and below this one they show the face in a way the gallery doesn't cover yet
+GALLERY_MAX_SIMILARITY = float(os.getenv("GALLERY_MAX_SIMILARITY", "0.9"))
+# Samples and prototypes must also match the registration embedding itself
+# (the match threshold), so the gallery can't drift away from it step by step
+GALLERY_ANCHOR_SIMILARITY = float(os.getenv("GALLERY_ANCHOR_SIMILARITY", "0.55"))
+# ... and beat the next most similar person by this much (no look-alikes)
+GALLERY_MIN_MARGIN = float(os.getenv("GALLERY_MIN_MARGIN", "0.1"))
+# Samples collected per person before they are consolidated into prototypes
+GALLERY_BATCH = int(os.getenv("GALLERY_BATCH", "8"))
+# At most one sample per person every N seconds (consecutive frames look alike)
+GALLERY_SAMPLE_INTERVAL_S = float(os.getenv("GALLERY_SAMPLE_INTERVAL_S", "2"))
+# People with pending samples kept in memory (least recently sampled dropped)
+GALLERY_MAX_PENDING = int(os.getenv("GALLERY_MAX_PENDING", "1024"))
+
+
+def consolidate(
+    anchor: np.ndarray,
+    candidates: List[np.ndarray],
+    k: int,
+    min_similarity: float = GALLERY_ANCHOR_SIMILARITY,
+    iters: int = 10,
+) -> List[np.ndarray]:
+    """
+    Picks at most `k - 1` prototypes among `candidates` (previous prototypes
+    and new samples) with k-medoids on cosine distance, the registration
+    embedding `anchor` being a fixed medoid. Medoids are real samples, so a
+    prototype is always a face that was actually seen, and an outlier only
+    becomes one if nothing else covers it. Candidates less than
+    `min_similarity` similar to the anchor are dropped first.
+    """
+    points = np.asarray([anchor, *candidates], dtype=np.float32)
+    points /= np.maximum(np.linalg.norm(points, axis=1, keepdims=True), 1e-12)
+    points = points[np.concatenate(([True], points[1:] @ points[0] >= min_similarity))]
+    if len(points) <= k:
+        return list(points[1:])
+    dist = 1.0 - points @ points.T
+
+    # BUILD: greedily add the medoid that lowers the total distance the most
+    medoids = [0]
+    nearest = dist[:, 0].copy()
+    while len(medoids) < k:
+        gains = np.minimum(nearest[:, None], dist).sum(axis=0)
+        gains[medoids] = np.inf
+        best = int(np.argmin(gains))
+        medoids.append(best)
+        nearest = np.minimum(nearest, dist[:, best])
+
+    # Alternate: assign points to their closest medoid, then move each
+    # medoid (except the anchor) to the most central point of its cluster
+    for _ in range(iters):
+        clusters = np.argmin(dist[:, medoids], axis=1)
+        updated = [0]
+        for c in range(1, k):
+            members = np.flatnonzero(clusters == c)
+            if len(members) == 0:
+                updated.append(medoids[c])
+                continue
+            costs = dist[np.ix_(members, members)].sum(axis=1)
+            updated.append(int(members[np.argmin(costs)]))
+        if updated == medoids:
+            break
+        medoids = updated
+    return [points[m] for m in medoids[1:]]
+
+
+class GalleryBuilder:
+    """
+    Grows a small per-person gallery of embeddings from confident matches.
+
+    Live matches whose similarity shows a new look of a known person (new
+    lighting or angle) are sampled, at most one every few seconds per
+    person. A sample must also match the person's registration embedding
+    and clearly beat every other person: the matched row may be a
+    prototype, and learning from matches to prototypes alone would let the
+    gallery drift toward someone else. After `batch` samples they are
+    merged with the person's stored prototypes and reduced to at most
+    GALLERY_MAX_PROTOTYPES - 1 medoids. These are stored on the person and
+    loaded as extra face cache rows, so the matching matrix grows by a
+    bounded number of rows per person.
+
+    Workers consolidate independently: a gallery is only written if the
+    person wasn't updated since it was read, and merged again otherwise.
+    """
+
+    def __init__(
+        self,
+        cache,
+        max_prototypes: int = GALLERY_MAX_PROTOTYPES,
+        min_similarity: float = GALLERY_MIN_SIMILARITY,
+        max_similarity: float = GALLERY_MAX_SIMILARITY,
+        anchor_similarity: float = GALLERY_ANCHOR_SIMILARITY,
+        min_margin: float = GALLERY_MIN_MARGIN,
+        batch: int = GALLERY_BATCH,
+        interval_s: float = GALLERY_SAMPLE_INTERVAL_S,
+        max_pending: int = GALLERY_MAX_PENDING,
+    ):
+        self.cache = cache
+        self.max_prototypes = max_prototypes
+        self.min_similarity = min_similarity
+        self.max_similarity = max_similarity
+        self.anchor_similarity = anchor_similarity
+        self.min_margin = min_margin
+        self.batch = batch
+        self.interval_s = interval_s
+        self.max_pending = max_pending
+        self.pending = OrderedDict()  # person_id -> (last sample time, [embeddings])
+        self.consolidating = set()
+
+    def observe(self, person_id: str, embedding, similarity: float):
+        """Offers a freshly embedded face matched to `person_id`."""
+        if self.max_prototypes < 2 or not self.min_similarity <= similarity < self.max_similarity:
+            return
+        now = time.monotonic()
+        last, samples = self.pending.get(person_id, (0.0, []))
+        if now - last < self.interval_s or not self._is_safe(person_id, embedding):
+            return
+        samples.append(np.asarray(embedding, dtype=np.float32))
+        self.pending[person_id] = (now, samples)
+        self.pending.move_to_end(person_id)
+        while len(self.pending) > self.max_pending:
+            self.pending.popitem(last=False)
+        metrics.incr("gallery.samples")
+        if len(samples) >= self.batch and person_id not in self.consolidating:
+            asyncio.create_task(self.consolidate(person_id))
+
+    def _is_safe(self, person_id: str, embedding) -> bool:
+        """Whether a face matched to `person_id` is safe to learn from."""
+        anchor = self.cache.similarity(row_key(person_id), embedding)
+        if anchor is None or anchor < self.anchor_similarity:
+            return False
+        rows, sims = self.cache.search([embedding], top_k=2)
+        if rows.shape[1] == 0 or rows[0, 0] < 0 or person_of(self.cache.ids[rows[0, 0]]) != person_id:
+            return False
+        return rows.shape[1] < 2 or sims[0, 0] - sims[0, 1] >= self.min_margin
+
+    async def consolidate(self, person_id: str, attempts: int = 3):
+        """Merges a person's pending samples into their stored prototypes."""
+        self.consolidating.add(person_id)
+        try:
+            _, samples = self.pending.pop(person_id, (0.0, []))
+            for _ in range(attempts):
+                found = await get_face_embeddings_of(person_id)
+                if not samples or found is None:
+                    return
+                embeddings, updated_at = found
+                anchor, previous = embeddings[0], embeddings[1:]
+                with metrics.timer("gallery.consolidate"):
+                    prototypes = consolidate(
+                        anchor, previous + samples, self.max_prototypes, self.anchor_similarity
+                    )
+                if await update_person_gallery(person_id, prototypes, updated_at):
+                    break
+                # Changed since the read (another worker's gallery, a rename): merge again
+                metrics.incr("gallery.conflicts")
+            else:
+                print(f"Gallery of {person_id} kept changing; dropped {len(samples)} samples")
+                return
+            name = self.cache.get_name(person_id)
+            if name is not None:
+                self.cache.set_person(person_id, name, [anchor, *prototypes])
+            metrics.incr("gallery.consolidations")
+            print(
+                f"DEBUG: Gallery of {person_id} ({name}): {len(previous)} + "
+                f"{len(samples)} samples -> {len(prototypes)} prototypes"
+            )
+        except Exception as e:
+            print(f"Error consolidating gallery of {person_id}: {e}")
+        finally:
+            self.consolidating.discard(person_id)
+
+
+# Singleton instance
+gallery = GalleryBuilder(face_cache)
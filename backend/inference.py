@@ -0,0 +1,265 @@
+import os
+import time
+import struct
+import asyncio
+import cv2
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple, Union
+from dotenv import load_dotenv
+
+from recognition import (
+    decode_base64_image,
+    decode_image_bytes,
+    detect_regions_batch,
+    embed_faces_batch,
+    face_filter_reason,
+)
+from tracking import FaceTracker
+from detection_planner import DetectionPlanner
+from metrics import metrics
+
+load_dotenv()
+
+INFERENCE_MAX_BATCH = int(os.getenv("INFERENCE_MAX_BATCH", "8"))
+INFERENCE_MAX_WAIT_MS = float(os.getenv("INFERENCE_MAX_WAIT_MS", "15"))
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "1"))
+DECODE_WORKERS = int(os.getenv("DECODE_WORKERS", "2"))
+
+# Image decode/resize pool (OpenCV releases the GIL)
+decode_executor = ThreadPoolExecutor(
+    max_workers=DECODE_WORKERS, thread_name_prefix="decode"
+)
+
+
+class InferenceScheduler:
+    """
+    Central scheduler for one face inference stage.
+
+    Items submitted by every connected socket are collected into
+    micro-batches (up to `max_batch_size` items, waiting at most
+    `max_wait_ms` for a batch to fill) and passed to `batch_fn` in a worker
+    thread pool, so the event loop never blocks on ONNX inference. Results
+    are dispatched back to each caller's future.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        batch_fn: Callable[[list], list],
+        max_batch_size: int = INFERENCE_MAX_BATCH,
+        max_wait_ms: float = INFERENCE_MAX_WAIT_MS,
+        workers: int = INFERENCE_WORKERS,
+    ):
+        self.name = name
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.workers = workers
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix=name
+        )
+        self.queue: Optional[asyncio.Queue] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._collector: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._collector is None:
+            self.queue = asyncio.Queue()
+            self._slots = asyncio.Semaphore(self.workers)
+            self._collector = asyncio.create_task(self._collect())
+            print(
+                f"Inference scheduler '{self.name}' started (batch={self.max_batch_size}, "
+                f"wait={self.max_wait * 1000:.0f}ms, workers={self.workers})"
+            )
+
+    async def stop(self):
+        if self._collector is not None:
+            self._collector.cancel()
+            self._collector = None
+        self.executor.shutdown(wait=False)
+
+    async def submit(self, item):
+        """Queues one item and waits for its result."""
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((item, future, time.perf_counter()))
+        return await future
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            # Keep at most `workers` batches in flight
+            await self._slots.acquire()
+            asyncio.create_task(self._dispatch(batch))
+
+    async def _dispatch(self, batch):
+        loop = asyncio.get_running_loop()
+        items = [item for item, _, _ in batch]
+        now = time.perf_counter()
+        for _, _, queued_at in batch:
+            metrics.record(f"vision.{self.name}.queue_wait", (now - queued_at) * 1000)
+        metrics.incr(f"vision.{self.name}.batches")
+        metrics.incr(f"vision.{self.name}.batched_items", len(batch))
+        try:
+            results = await loop.run_in_executor(self.executor, self.batch_fn, items)
+            for (_, future, _), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+        except Exception as e:
+            print(f"Inference batch error ({self.name}): {e}")
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            self._slots.release()
+
+
+# Detection batches frames (whole or by region); recognition batches aligned face crops
+detection_scheduler = InferenceScheduler("detection", detect_regions_batch)
+recognition_scheduler = InferenceScheduler("recognition", embed_faces_batch)
+
+
+def start_schedulers():
+    detection_scheduler.start()
+    recognition_scheduler.start()
+
+
+async def stop_schedulers():
+    await detection_scheduler.stop()
+    await recognition_scheduler.stop()
+
+
+# Optional header of binary frames: magic, frame id, width, height, capture time (ms since epoch)
+FRAME_MAGIC = b"MLF1"
+FRAME_HEADER = struct.Struct("<4sIHHd")
+
+
+def parse_frame_header(buffer: bytes) -> Tuple[dict, int]:
+    """
+    Reads the optional binary frame header.
+    Returns (header, offset of the encoded image); frames without the
+    magic prefix are raw JPEG/WebP bytes with an empty header.
+    """
+    if len(buffer) >= FRAME_HEADER.size and buffer[:4] == FRAME_MAGIC:
+        _, frame_id, width, height, captured_at = FRAME_HEADER.unpack_from(buffer)
+        header = {
+            "frame_id": frame_id,
+            "width": width,
+            "height": height,
+            "captured_at": captured_at,
+        }
+        return header, FRAME_HEADER.size
+    return {}, 0
+
+
+def prepare_frame(
+    data: Union[str, bytes], max_width: Optional[int]
+) -> Tuple[np.ndarray, float]:
+    """
+    Decodes a frame and downsizes it to `max_width` (runs in decode_executor).
+    `data` is either a base64 text frame or a binary frame (optional header
+    followed by raw JPEG/WebP bytes, decoded in place from the buffer).
+    """
+    mode = "text" if isinstance(data, str) else "binary"
+    metrics.observe(f"frame.bytes.{mode}", len(data))
+    with metrics.timer(f"vision.decode.{mode}"):
+        if mode == "text":
+            img = decode_base64_image(data)
+        else:
+            _, offset = parse_frame_header(data)
+            img = decode_image_bytes(data, offset=offset)
+    if img is None:
+        raise ValueError("Could not decode image")
+
+    scale = 1.0
+    height, width = img.shape[:2]
+    if max_width and width > max_width:
+        with metrics.timer("vision.resize"):
+            scale = max_width / width
+            img = cv2.resize(img, (max_width, int(height * scale)))
+    return img, scale
+
+
+async def recognize_frame(
+    data: Union[str, bytes],
+    max_width: Optional[int] = 480,
+    tracker: Optional[FaceTracker] = None,
+    planner: Optional[DetectionPlanner] = None,
+) -> List[dict]:
+    """
+    Decodes, resizes and runs face inference on one frame (base64 text or
+    binary) without blocking the event loop. Returns {"embedding", "bbox",
+    "det_score"} dicts with bboxes in the coordinates of the original image.
+    Faces failing the size/score/blur filters have "rejected" (the reason)
+    instead of "embedding".
+
+    With a `tracker`, each face also carries its "track", and "embedding"
+    is only present for faces the tracker asked to re-embed; the others
+    keep the identity stored on their track. A `planner` (which needs the
+    tracker) restricts detection to regions around the tracked faces.
+    """
+    start = time.perf_counter()
+    loop = asyncio.get_running_loop()
+    img, scale = await loop.run_in_executor(decode_executor, prepare_frame, data, max_width)
+    regions = None
+    if planner and tracker:
+        boxes = [[int(v * scale) for v in track.bbox] for track in tracker.tracks]
+        regions = planner.plan(boxes, img.shape)
+    detections = await detection_scheduler.submit((img, regions))
+    if regions is not None:
+        detections = planner.merge(detections)
+    if planner and tracker:
+        planner.observe(regions, boxes, len(detections))
+
+    # Rescale bboxes back to original image size
+    bboxes = [[int(v / scale) for v in det["bbox"]] for det in detections]
+    tracks = tracker.update(bboxes) if tracker else [None] * len(detections)
+    # Tiny or low-confidence faces (e.g. in the background) are not embedded
+    rejected = {}
+    for i, det in enumerate(detections):
+        reason = face_filter_reason(det)
+        if reason:
+            rejected[i] = reason
+            metrics.incr(f"vision.filtered.{reason}")
+    selected = [
+        i
+        for i, track in enumerate(tracks)
+        if i not in rejected and (track is None or tracker.needs_embedding(track))
+    ]
+    metrics.incr("tracking.embedded", len(selected))
+    metrics.incr("tracking.skipped", len(detections) - len(selected) - len(rejected))
+
+    embeddings = {}
+    if selected:
+        job = (img, [detections[i]["kps"] for i in selected])
+        vectors = await recognition_scheduler.submit(job)
+        for i, vector in zip(selected, vectors):
+            if vector is None:
+                rejected[i] = "blur"
+            else:
+                embeddings[i] = vector
+
+    faces = []
+    for i, bbox in enumerate(bboxes):
+        face = {"bbox": bbox, "det_score": detections[i]["det_score"]}
+        if i in embeddings:
+            face["embedding"] = embeddings[i].tolist()
+        elif i in rejected:
+            face["rejected"] = rejected[i]
+        if tracker:
+            face["track"] = tracks[i]
+        faces.append(face)
+    metrics.record("vision.recognize_frame", (time.perf_counter() - start) * 1000)
+    return faces
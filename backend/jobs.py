@@ -0,0 +1,298 @@
+import os
+import uuid
+import asyncio
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, Optional, Set
+from bson import ObjectId
+from dotenv import load_dotenv
+from fastapi import WebSocket
+from pymongo import ReturnDocument
+from pymongo.errors import PyMongoError
+from starlette.websockets import WebSocketState
+
+from models import db
+
+load_dotenv()
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_LEASE_S = float(os.getenv("JOB_LEASE_S", "120"))
+JOB_RETRY_BACKOFF_S = float(os.getenv("JOB_RETRY_BACKOFF_S", "5"))
+JOB_POLL_S = float(os.getenv("JOB_POLL_S", "5"))
+# How often a process polls for jobs finished by other processes, for its
+# subscribed sockets, when MongoDB change streams are unavailable
+JOB_NOTIFY_POLL_S = float(os.getenv("JOB_NOTIFY_POLL_S", "1"))
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class JobQueue:
+    """
+    Durable background job queue backed by the MongoDB `jobs` collection.
+
+    A job is claimed by setting a lease with a fresh owner token; a worker
+    that dies (or a server restart) leaves the lease to expire and the job
+    is picked up again, so jobs resume after a restart. Handlers must be
+    idempotent per job id, since a job may run again after a crash. A
+    worker only records the outcome of a job while it still owns the lease.
+    Failed jobs are retried with exponential backoff up to `max_attempts`.
+
+    When a job finishes, the WebSocket clients subscribed with the job's
+    client_id are notified. Any process sharing the collection may run a
+    job, while the client's socket may be held by another one: the process
+    that ran it notifies its own subscribers, and every other process picks
+    the finished job up from a change stream on the collection (or by
+    polling) and notifies its subscribers.
+    """
+
+    def __init__(
+        self,
+        collection,
+        workers: int = JOB_WORKERS,
+        max_attempts: int = JOB_MAX_ATTEMPTS,
+        lease_seconds: float = JOB_LEASE_S,
+        retry_backoff: float = JOB_RETRY_BACKOFF_S,
+        poll_interval: float = JOB_POLL_S,
+        notify_poll_interval: float = JOB_NOTIFY_POLL_S,
+    ):
+        self.collection = collection
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.lease = timedelta(seconds=lease_seconds)
+        self.retry_backoff = retry_backoff
+        self.poll_interval = poll_interval
+        self.notify_poll_interval = notify_poll_interval
+        # Marks the jobs this process finished (and notified about itself)
+        self.process_id = uuid.uuid4().hex
+        self.handler: Optional[Callable[[dict], Awaitable[dict]]] = None
+        self.subscribers: Dict[Optional[str], Set[WebSocket]] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks = []
+
+    async def start(self, handler: Callable[[dict], Awaitable[dict]]):
+        """Starts the worker tasks; `handler(job)` returns the job result."""
+        self.handler = handler
+        self._wakeup = asyncio.Event()
+        await self.collection.create_index(
+            [("status", 1), ("run_after", 1)], name="status_run_after"
+        )
+        await self.collection.create_index(
+            [("client_id", 1), ("finished_at", 1)], name="client_id_finished_at"
+        )
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._deliver()))
+        print(f"Job queue started with {self.workers} workers.")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+
+    async def enqueue(
+        self, kind: str, payload: dict, client_id: Optional[str] = None
+    ) -> str:
+        now = _now()
+        result = await self.collection.insert_one(
+            {
+                "kind": kind,
+                "payload": payload,
+                "client_id": client_id,
+                "status": "pending",
+                "attempts": 0,
+                "run_after": now,
+                "created_at": now,
+            }
+        )
+        if self._wakeup:
+            self._wakeup.set()
+        return str(result.inserted_id)
+
+    async def get(self, job_id: str, client_id: Optional[str] = None) -> Optional[dict]:
+        """
+        A job, if it was queued by `client_id` (None if not found). A job
+        queued without a client_id reports its status but not its result.
+        """
+        if not ObjectId.is_valid(job_id):
+            return None
+        job = await self.collection.find_one(
+            {"_id": ObjectId(job_id), "client_id": client_id},
+            {"payload": 0, "lease_owner": 0, "finished_by": 0},
+        )
+        if job:
+            job["_id"] = str(job["_id"])
+            if client_id is None:
+                job.pop("result", None)
+        return job
+
+    def subscribe(self, client_id: Optional[str], websocket: WebSocket):
+        self.subscribers.setdefault(client_id, set()).add(websocket)
+
+    def unsubscribe(self, client_id: Optional[str], websocket: WebSocket):
+        sockets = self.subscribers.get(client_id)
+        if sockets:
+            sockets.discard(websocket)
+            if not sockets:
+                del self.subscribers[client_id]
+
+    async def _claim(self) -> Optional[dict]:
+        now = _now()
+        return await self.collection.find_one_and_update(
+            {
+                "$or": [
+                    {"status": "pending", "run_after": {"$lte": now}},
+                    # Lease expired: the worker died or the server restarted
+                    {"status": "running", "lease_until": {"$lt": now}},
+                ]
+            },
+            {
+                "$set": {
+                    "status": "running",
+                    "lease_until": now + self.lease,
+                    # Identifies this claim; a later claim of the job replaces it
+                    "lease_owner": uuid.uuid4().hex,
+                },
+                "$inc": {"attempts": 1},
+            },
+            sort=[("created_at", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def _worker(self):
+        while True:
+            try:
+                job = await self._claim()
+            except Exception as e:
+                print(f"Job queue claim error: {e}")
+                job = None
+
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            await self._run(job)
+
+    async def _finish(self, job: dict, update: dict) -> bool:
+        """
+        Records a job's outcome if this worker still owns its lease; False
+        if the lease expired and the job was claimed again meanwhile.
+        """
+        result = await self.collection.update_one(
+            {"_id": job["_id"], "lease_owner": job["lease_owner"]}, update
+        )
+        if result.matched_count == 0:
+            print(f"DEBUG: Job {job['_id']} lost its lease; outcome discarded")
+            return False
+        return True
+
+    async def _run(self, job: dict):
+        job_id = str(job["_id"])
+        try:
+            result = await self.handler(job)
+        except Exception as e:
+            print(f"DEBUG: Job {job_id} failed (attempt {job['attempts']}): {e}")
+            if job["attempts"] >= self.max_attempts:
+                failed = {"status": "failed", "error": str(e), "finished_at": _now()}
+                if await self._finish(job, {"$set": {**failed, "finished_by": self.process_id}}):
+                    await self._notify({**job, **failed})
+            else:
+                delay = self.retry_backoff * (2 ** (job["attempts"] - 1))
+                await self._finish(
+                    job,
+                    {
+                        "$set": {
+                            "status": "pending",
+                            "error": str(e),
+                            "run_after": _now() + timedelta(seconds=delay),
+                        }
+                    },
+                )
+            return
+
+        done = {"status": "done", "result": result, "finished_at": _now()}
+        if not await self._finish(
+            job,
+            {
+                "$set": {**done, "finished_by": self.process_id},
+                # The raw inputs are no longer needed once the memory is stored
+                "$unset": {"payload.image_base64": ""},
+            },
+        ):
+            return
+        print(f"DEBUG: Job {job_id} done")
+        await self._notify({**job, **done})
+
+    async def _deliver(self):
+        """Notifies this process's subscribers of jobs finished by other processes."""
+        pipeline = [
+            {
+                "$match": {
+                    "operationType": "update",
+                    "updateDescription.updatedFields.status": {"$in": ["done", "failed"]},
+                }
+            }
+        ]
+        try:
+            async with self.collection.watch(pipeline, full_document="updateLookup") as stream:
+                async for change in stream:
+                    job = change.get("fullDocument")
+                    if job and job.get("finished_by") != self.process_id:
+                        await self._notify(job)
+        except PyMongoError as e:
+            print(f"Job queue: no change stream ({e}); polling every {self.notify_poll_interval:.0f}s.")
+
+        # Polling: re-reads a window of one interval (for clock skew between
+        # processes) and skips the jobs already delivered
+        delivered = deque(maxlen=1024)
+        since = _now()
+        while True:
+            await asyncio.sleep(self.notify_poll_interval)
+            client_ids = [client_id for client_id in self.subscribers if client_id]
+            polled_at = _now()
+            if not client_ids:
+                since = polled_at
+                continue
+            try:
+                cursor = self.collection.find(
+                    {
+                        "client_id": {"$in": client_ids},
+                        "finished_at": {"$gt": since - timedelta(seconds=self.notify_poll_interval)},
+                        "finished_by": {"$ne": self.process_id},
+                    },
+                    {"payload": 0},
+                )
+                async for job in cursor:
+                    if job["_id"] not in delivered:
+                        delivered.append(job["_id"])
+                        await self._notify(job)
+                since = polled_at
+            except PyMongoError as e:
+                print(f"Job queue notification poll failed: {e}")
+
+    async def _notify(self, job: dict):
+        client_id = job.get("client_id")
+        if not client_id:
+            # Results are private to the client that queued the job
+            return
+        job_id = str(job["_id"])
+        if job["status"] == "done":
+            message = {"type": "job_done", "kind": job["kind"], "job_id": job_id, "result": job["result"]}
+        else:
+            message = {"type": "job_failed", "job_id": job_id, "error": job.get("error")}
+        for websocket in list(self.subscribers.get(client_id, set())):
+            try:
+                if websocket.client_state == WebSocketState.CONNECTED:
+                    await websocket.send_json(message)
+            except Exception:
+                # Ignore connection closed errors as they are expected on disconnect
+                pass
+
+
+# Singleton instance
+job_queue = JobQueue(db.jobs)
@@ -0,0 +1,86 @@
+import os
+import random
+import asyncio
+import hashlib
+import time
+from typing import Dict, Optional
+from dotenv import load_dotenv
+
+from metrics import metrics
+
+load_dotenv()
+
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+LLM_TIMEOUT_S = float(os.getenv("LLM_TIMEOUT_S", "20"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_BACKOFF_S = float(os.getenv("LLM_BACKOFF_S", "0.5"))
+
+
+def _is_retryable(error: Exception) -> bool:
+    """Bad keys and missing models won't fix themselves; everything else may."""
+    message = str(error).lower()
+    return not any(code in message for code in ("403", "404", "leaked", "api key"))
+
+
+class LLMClient:
+    """
+    Async, non-blocking wrapper around a Gemini model.
+
+    - At most `max_concurrency` requests are in flight at once.
+    - Each attempt is bounded by `timeout` seconds and failed attempts are
+      retried with exponential backoff and jitter.
+    - Identical prompts already in flight are coalesced onto one request.
+    """
+
+    def __init__(
+        self,
+        model,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        timeout: float = LLM_TIMEOUT_S,
+        max_retries: int = LLM_MAX_RETRIES,
+        backoff: float = LLM_BACKOFF_S,
+    ):
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    async def generate(self, prompt: str) -> str:
+        """Returns the model's text response for `prompt`."""
+        key = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        task = self._inflight.get(key)
+        if task is not None:
+            metrics.incr("llm.coalesced")
+        else:
+            task = asyncio.ensure_future(self._generate(prompt))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # Shielded so one caller giving up doesn't cancel the shared request
+        return await asyncio.shield(task)
+
+    async def _generate(self, prompt: str) -> str:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with self._semaphore:
+                    start = time.perf_counter()
+                    response = await asyncio.wait_for(
+                        self.model.generate_content_async(prompt), self.timeout
+                    )
+                    metrics.record("llm.request", (time.perf_counter() - start) * 1000)
+                return response.text
+            except Exception as e:
+                if isinstance(e, asyncio.TimeoutError):
+                    e = TimeoutError(f"Gemini request timed out after {self.timeout}s")
+                metrics.incr("llm.errors")
+                if attempt == self.max_retries or not _is_retryable(e):
+                    raise e
+                delay = self.backoff * (2**attempt) * (1 + random.random())
+                print(f"DEBUG: Gemini attempt {attempt + 1} failed ({e}), retrying in {delay:.1f}s")
+                metrics.incr("llm.retries")
+                await asyncio.sleep(delay)
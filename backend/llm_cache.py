@@ -0,0 +1,145 @@
+import os
+import re
+import hashlib
+from datetime import datetime, timezone
+from typing import Optional
+from dotenv import load_dotenv
+from pymongo import ReturnDocument
+
+from models import db
+
+load_dotenv()
+
+LLM_CACHE_TTL_S = int(os.getenv("LLM_CACHE_TTL_S", str(30 * 24 * 3600)))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "50000"))
+
+
+def template_hash(template: str) -> str:
+    return hashlib.sha256(template.encode("utf-8")).hexdigest()[:16]
+
+
+def normalize_transcript(transcript: str) -> str:
+    """Case- and whitespace-insensitive form of a transcript, used for keys."""
+    return re.sub(r"\s+", " ", transcript).strip().casefold()
+
+
+class LLMCache:
+    """
+    Content-addressed cache of parsed LLM responses in the MongoDB
+    `llm_cache` collection.
+
+    Keys hash the prompt template together with the normalized transcript,
+    so editing a prompt automatically stops serving old responses
+    (purge_stale() then deletes them). Entries expire through a TTL index
+    and the collection is kept under `max_entries` by evicting the least
+    recently used entries.
+    """
+
+    def __init__(
+        self,
+        collection,
+        ttl_seconds: int = LLM_CACHE_TTL_S,
+        max_entries: int = LLM_CACHE_MAX_ENTRIES,
+    ):
+        self.collection = collection
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.saved_ms = 0.0
+        self.templates = {}  # kind -> current template hash
+
+    def register(self, kind: str, template: str):
+        """Declares the current template of a prompt kind."""
+        self.templates[kind] = template_hash(template)
+
+    def key(self, kind: str, transcript: str) -> str:
+        content = f"{kind}\0{self.templates[kind]}\0{normalize_transcript(transcript)}"
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    async def ensure_indexes(self):
+        await self.collection.create_index(
+            "created_at", name="ttl", expireAfterSeconds=self.ttl_seconds
+        )
+        await self.collection.create_index("last_used_at", name="last_used_at")
+        await self.collection.create_index(
+            [("kind", 1), ("template_hash", 1)], name="kind_template"
+        )
+
+    async def get(self, kind: str, transcript: str) -> Optional[dict]:
+        try:
+            entry = await self.collection.find_one_and_update(
+                {"_id": self.key(kind, transcript)},
+                {"$set": {"last_used_at": datetime.now(timezone.utc)}, "$inc": {"hits": 1}},
+                return_document=ReturnDocument.AFTER,
+            )
+        except Exception as e:
+            print(f"LLM cache read error: {e}")
+            entry = None
+
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.saved_ms += entry.get("latency_ms", 0.0)
+        return entry["value"]
+
+    async def set(self, kind: str, transcript: str, value: dict, latency_ms: float):
+        now = datetime.now(timezone.utc)
+        try:
+            await self.collection.replace_one(
+                {"_id": self.key(kind, transcript)},
+                {
+                    "kind": kind,
+                    "template_hash": self.templates[kind],
+                    "value": value,
+                    "latency_ms": latency_ms,
+                    "hits": 0,
+                    "created_at": now,
+                    "last_used_at": now,
+                },
+                upsert=True,
+            )
+            await self._evict()
+        except Exception as e:
+            print(f"LLM cache write error: {e}")
+
+    async def _evict(self):
+        excess = await self.collection.estimated_document_count() - self.max_entries
+        if excess <= 0:
+            return
+        cursor = (
+            self.collection.find({}, {"_id": 1}).sort("last_used_at", 1).limit(excess)
+        )
+        ids = [doc["_id"] async for doc in cursor]
+        await self.collection.delete_many({"_id": {"$in": ids}})
+
+    async def purge_stale(self) -> int:
+        """Deletes entries produced by templates that are no longer current."""
+        result = await self.collection.delete_many(
+            {
+                "$or": [
+                    {"kind": kind, "template_hash": {"$ne": current}}
+                    for kind, current in self.templates.items()
+                ]
+            }
+        )
+        return result.deleted_count
+
+    async def invalidate(self, kind: Optional[str] = None) -> int:
+        """Explicitly drops cached responses (of one kind, or all)."""
+        result = await self.collection.delete_many({"kind": kind} if kind else {})
+        return result.deleted_count
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "saved_latency_ms": round(self.saved_ms, 1),
+        }
+
+
+# Singleton instance
+llm_cache = LLMCache(db.llm_cache)
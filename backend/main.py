@@ -1,5 +1,6 @@
-import cv2
 import asyncio
+import time
+import numpy as np
 from fastapi import (
     FastAPI,
     WebSocket,
@@ -8,6 +9,7 @@ from fastapi import (
     File,
     Form,
     HTTPException,
+    Query,
 )
 from starlette.websockets import WebSocketState
 from fastapi.middleware.cors import CORSMiddleware
@@ -17,15 +19,40 @@ from typing import Optional
 from models import (
     add_person,
     add_memory,
-    get_all_people,
-    get_latest_memory,
+    get_latest_memory_summary,
     get_all_people_with_latest_memory,
     get_person_memories,
     find_person_by_name,
+    latest_memory_cache,
+    ensure_indexes,
+    explain_hot_queries,
 )
-from recognition import decode_base64_image, get_face_embeddings, face_cache
-from speech import transcribe_audio
-from memory import summarize_conversation, extract_name_from_transcript
+from recognition import face_cache, load_face_models
+from face_snapshot import face_snapshot
+from face_sync import FaceCacheSync
+from shared_cache import FACE_SHARED_CACHE
+from inference import start_schedulers, stop_schedulers, recognize_frame
+from tracking import FaceTracker
+from detection_planner import DETECT_ADAPTIVE, DetectionPlanner
+from backpressure import LatestFrameMailbox, recognition_streams
+from sessions import Session, SeenFace, sessions
+from gallery import gallery
+from jobs import job_queue
+from llm_cache import llm_cache
+from metrics import metrics
+from speech import stt_backend, transcribe_audio, transcribe_stream
+from memory import (
+    summarize_conversation,
+    extract_name_from_transcript,
+    extract_name_regex_only,
+    correct_name,
+)
+
+# Process start, for the time-to-first-recognition log
+boot_started = time.perf_counter()
+first_recognition_logged = False
+# With FACE_SHARED_CACHE=1, worker processes share one face cache
+face_sync = FaceCacheSync(face_cache) if FACE_SHARED_CACHE else None
 
 app = FastAPI(title="MemoryLens Backend")
 
@@ -41,160 +68,350 @@ app.add_middleware(
 
 @app.on_event("startup")
 async def startup_event():
-    # Load all people from DB into face cache
-    people = await get_all_people()
-    face_cache.update(people)
-    print(f"Face cache loaded with {len(people)} people.")
+    await ensure_indexes()
+    await llm_cache.ensure_indexes()
+    purged = await llm_cache.purge_stale()
+    if purged:
+        print(f"LLM cache: purged {purged} entries from outdated prompts.")
+
+    # Face models load in the background while the face cache is restored
+    face_models = asyncio.get_running_loop().run_in_executor(None, load_face_models)
+    if face_sync:
+        # The leader worker fills the shared cache; the others map it
+        await face_sync.start()
+        if face_sync.is_leader:
+            print(
+                "Sessions are per worker: route both sockets "
+                "of a device to the same process (e.g. by client_id, see README)."
+            )
+    else:
+        # Map the face cache snapshot and catch up with changes since it was
+        # written (full load from the DB when there is no usable snapshot)
+        await face_snapshot.restore(face_cache)
+    start_schedulers()
+    stt_backend.warmup()
+    # Also resumes jobs left unfinished by a previous run
+    await job_queue.start(handler=run_memory_job)
+    # A model that can't load (missing weights, ONNX provider error) fails
+    # the startup here, not the first frame
+    await face_models
     # Database reload trigger 2
     # Database reload trigger
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    if face_sync is None or face_sync.is_leader:
+        # Persist the ANN index so the next startup doesn't retrain it
+        face_cache.save_index()
+        face_snapshot.save(face_cache)
+    if face_sync:
+        await face_sync.stop()
+    await stop_schedulers()
+    await job_queue.stop()
+    await stt_backend.close()
+
+
+@app.post("/face-cache/resync")
+async def resync_face_cache():
+    """Reloads the whole face cache from the database."""
+    try:
+        await face_snapshot.reload(face_cache)
+        print(f"Face cache resynced with {len(face_cache)} faces.")
+        return {"status": "success", "size": len(face_cache)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @app.post("/register-face")
 async def register_face(name: str = Form(...), image_base64: str = Form(...)):
     """Registers a new face with a name."""
     try:
-        img = decode_base64_image(image_base64)
-        faces = get_face_embeddings(img)
+        faces = await recognize_frame(image_base64, max_width=None)
 
         if not faces:
             raise HTTPException(status_code=400, detail="No face detected in image")
+        usable = [face for face in faces if "embedding" in face]
+        if not usable:
+            raise HTTPException(
+                status_code=400, detail="Face too small, uncertain or blurry"
+            )
 
-        # Take the first face detected
-        embedding = faces[0]["embedding"]
+        # Take the first usable face detected
+        embedding = usable[0]["embedding"]
         person_id = await add_person(name, embedding)
 
         # Update cache
-        people = await get_all_people()
-        face_cache.update(people)
+        face_cache.upsert(person_id, name, embedding)
 
         return {"status": "success", "person_id": person_id, "name": name}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.post("/add-memory")
-async def add_memory_endpoint(
-    person_id: Optional[str] = Form(None),
-    transcript: str = Form(...),
-    image_base64: Optional[str] = Form(None),
-):
-    """Saves a memory. If person_id is missing, tries to extract name and register face."""
-    try:
-        print("\n--- DEBUG: add_memory_endpoint CALLED ---")
-        print(
-            f"DEBUG: Input - person_id: '{person_id}', transcript: '{transcript[:100]}...', has_image: {bool(image_base64)}"
+class StageTimer:
+    """Collects per-stage durations (ms) of one request pipeline."""
+
+    def __init__(self, prefix: str):
+        self.prefix = prefix
+        self.start = time.perf_counter()
+        self.stages = {}
+
+    async def run(self, name: str, coro):
+        stage_start = time.perf_counter()
+        try:
+            return await coro
+        finally:
+            elapsed = (time.perf_counter() - stage_start) * 1000
+            self.stages[name] = {
+                "start_ms": round((stage_start - self.start) * 1000, 1),
+                "duration_ms": round(elapsed, 1),
+            }
+            metrics.record(f"{self.prefix}.{name}", elapsed)
+
+    def finish(self) -> dict:
+        total = (time.perf_counter() - self.start) * 1000
+        metrics.record(f"{self.prefix}.total", total)
+        return {"total_ms": round(total, 1), "stages": self.stages}
+
+
+async def process_memory(
+    person_id: Optional[str],
+    transcript: str,
+    image_base64: Optional[str],
+    debug: bool = False,
+    strict: bool = False,
+    job_id: Optional[str] = None,
+) -> dict:
+    """
+    Summarizes a conversation and stores it as a memory. If person_id is
+    missing, tries to extract a name and register (or link) the face.
+    With `strict`, a failed summarization raises instead of storing a
+    placeholder summary. With `job_id` (background jobs), a retry of the
+    same job doesn't store the memory twice.
+
+    Independent stages run concurrently: the Gemini summary, the face
+    embedding of the image and the name lookup of a regex-detected name
+    all start immediately and are only awaited where their result is needed.
+    """
+    print("\n--- DEBUG: add_memory_endpoint CALLED ---")
+    print(
+        f"DEBUG: Input - person_id: '{person_id}', transcript: '{transcript[:100]}...', has_image: {bool(image_base64)}"
+    )
+    timer = StageTimer("add_memory")
+    final_person_id = person_id if person_id and person_id != "" else None
+    wants_registration = not final_person_id and bool(image_base64)
+
+    # Fast regex name detection (no network), used to start the lookup early
+    regex_name = extract_name_regex_only(transcript)["name"]
+    if regex_name:
+        regex_name = correct_name(regex_name)
+
+    # 1. Summarize Conversation
+    # We send the transcript to Gemini to get a structured JSON summary (summary, tone, topics).
+    summary_task = asyncio.create_task(
+        timer.run("summarize", summarize_conversation(transcript, strict=strict))
+    )
+    faces_task = None
+    lookup_task = None
+    if wants_registration:
+        faces_task = asyncio.create_task(
+            timer.run("embed_face", recognize_frame(image_base64, max_width=None))
         )
+        if regex_name:
+            lookup_task = asyncio.create_task(
+                timer.run("find_person", find_person_by_name(regex_name))
+            )
 
-        # 1. Summarize Conversation
-        # We send the transcript to Gemini to get a structured JSON summary (summary, tone, topics).
-        summary_data = summarize_conversation(transcript)
+    try:
+        summary_data = await summary_task
         print(f"DEBUG: Gemini raw summary: {summary_data}")
 
-        final_person_id = person_id if person_id and person_id != "" else None
-
         # Try to find a name if Gemini didn't find one in the standard summary
-        extracted_name = summary_data.get("extracted_name")
+        extracted_name = summary_data.get("extracted_name") or regex_name
         if not extracted_name:
             print("DEBUG: No name in summary, checking extra extractor...")
-            extra_name_data = extract_name_from_transcript(transcript)
+            extra_name_data = await timer.run(
+                "extract_name", extract_name_from_transcript(transcript)
+            )
             extracted_name = extra_name_data.get("name")
             print(f"DEBUG: Second pass extracted name: {extracted_name}")
 
         # 3. Automated Registration Case
         # If we have NO person_id (i.e. face was "Unknown") AND we have an image AND we extracted a name:
         # We attempt to register this person as a NEW entry in the database.
-        if not final_person_id and image_base64 and extracted_name:
+        if wants_registration and extracted_name:
             print(f"DEBUG: ATTEMPTING AUTO-REGISTRATION for: {extracted_name}")
-            img = decode_base64_image(image_base64)
-            faces = get_face_embeddings(img)
+            faces = await faces_task
             print(f"DEBUG: Face detection found {len(faces)} faces")
 
-            if faces:
-                print(f"DEBUG: Face detection found {len(faces)} faces")
+            if len(faces) > 1:
+                print(
+                    "DEBUG: SKIPPING AUTO-REGISTRATION - Multiple faces detected, cannot confidently assign name."
+                )
+                # Optionally return partial success with specific message
+            elif faces:
+                # 4. Check if person already exists by name before registering
+                if lookup_task and extracted_name.lower() == regex_name.lower():
+                    existing_person = await lookup_task
+                else:
+                    existing_person = await timer.run(
+                        "find_person", find_person_by_name(extracted_name)
+                    )
 
-                if len(faces) > 1:
+                if existing_person:
+                    # Person exists! Link to them instead of creating duplicate
+                    final_person_id = str(existing_person.id)
                     print(
-                        "DEBUG: SKIPPING AUTO-REGISTRATION - Multiple faces detected, cannot confidently assign name."
+                        f"DEBUG: Found existing person via name match: {extracted_name} (ID: {final_person_id})"
                     )
-                    # Optionally return partial success with specific message
-                else:
-                    # 4. Check if person already exists by name before registering
-                    existing_person = await find_person_by_name(extracted_name)
-
-                    if existing_person:
-                        # Person exists! Link to them instead of creating duplicate
-                        final_person_id = str(existing_person.id)
-                        print(
-                            f"DEBUG: Found existing person via name match: {extracted_name} (ID: {final_person_id})"
-                        )
-                        # Optional: We could update their face embedding here if needed, but let's keep it simple.
-                    else:
-                        # Register as NEW person
-                        # We save the embedding and the extracted name to the `people` collection.
-                        embedding = faces[0]["embedding"]
-                        final_person_id = await add_person(extracted_name, embedding)
-                        print(
-                            f"DEBUG: New person added successfully. ID: {final_person_id}"
-                        )
-
-                    # Update cache so subsequent frames immediately recognize this person
-                    people = await get_all_people()
-                    face_cache.update(people)
+                    # Optional: We could update their face embedding here if needed, but let's keep it simple.
+                elif "embedding" not in faces[0]:
                     print(
-                        f"DEBUG: Face cache updated. New size: {len(face_cache.cache)}"
+                        f"DEBUG: FAILED - Face rejected for registration ({faces[0]['rejected']})"
                     )
-                    summary_data["name"] = (
-                        extracted_name  # Return name for frontend reflection
+                else:
+                    # Register as NEW person
+                    # We save the embedding and the extracted name to the `people` collection.
+                    embedding = faces[0]["embedding"]
+                    final_person_id = await timer.run(
+                        "add_person", add_person(extracted_name, embedding)
+                    )
+                    print(
+                        f"DEBUG: New person added successfully. ID: {final_person_id}"
                     )
+
+                    # Update cache so subsequent frames immediately recognize this person
+                    face_cache.upsert(final_person_id, extracted_name, embedding)
+                    print(f"DEBUG: Face cache updated. New size: {len(face_cache)}")
+
+                summary_data["name"] = (
+                    extracted_name  # Return name for frontend reflection
+                )
             else:
                 print(
                     "DEBUG: FAILED - No faces detected in image provided for registration"
                 )
-
-        if not final_person_id:
-            # DEBUG: If no person was identified or registered only (partial success)
-            # This happens if Gemini didn't find a name, or if the face was not distinguishable enough to register.
-            # We return the summary anyway so the UI could show "Conversation recorded but no person identified".
-            print("DEBUG: RESULT - Partial success (No profile linked)")
-            return {
-                "status": "partial_success",
-                "message": "No person identified or registered to link memory",
-                "summary": summary_data,
-            }
-
+    finally:
+        # Speculative stages whose result turned out not to be needed
+        for task in (faces_task, lookup_task):
+            if task is None:
+                continue
+            if not task.done():
+                task.cancel()
+            elif not task.cancelled():
+                task.exception()  # Mark a failed, unused stage as handled
+
+    if not final_person_id:
+        # DEBUG: If no person was identified or registered only (partial success)
+        # This happens if Gemini didn't find a name, or if the face was not distinguishable enough to register.
+        # We return the summary anyway so the UI could show "Conversation recorded but no person identified".
+        print("DEBUG: RESULT - Partial success (No profile linked)")
+        result = {
+            "status": "partial_success",
+            "message": "No person identified or registered to link memory",
+            "summary": summary_data,
+        }
+    else:
         print(f"DEBUG: Saving memory to DB for ID: {final_person_id}")
 
         # 5. Save the Full Memory
         # Now that we have a valid Person ID (either existing or newly registered),
         # we save the transcript, summary, topics, and tone into the `memories` collection.
-        memory_id = await add_memory(
-            final_person_id,
-            transcript,
-            summary_data["summary"],
-            summary_data["key_topics"],
-            summary_data["emotional_tone"],
-            summary_data.get("follow_up_suggestion"),
+        memory_id = await timer.run(
+            "add_memory",
+            add_memory(
+                final_person_id,
+                transcript,
+                summary_data["summary"],
+                summary_data["key_topics"],
+                summary_data["emotional_tone"],
+                summary_data.get("follow_up_suggestion"),
+                job_id=job_id,
+            ),
         )
         print(f"DEBUG: RESULT - Success. Memory ID: {memory_id}")
 
         # 6. Return Success
         # The frontend receives this and updates the UI bubbles/toasts.
-        return {
+        result = {
             "status": "success",
             "person_id": final_person_id,
             "memory_id": memory_id,
             "summary": summary_data,
         }
+
+    timings = timer.finish()
+    if debug:
+        result["timings"] = timings
+    return result
+
+
+async def run_memory_job(job: dict) -> dict:
+    """Background job handler for deferred /add-memory requests."""
+    payload = job["payload"]
+    return await process_memory(
+        payload.get("person_id"),
+        payload["transcript"],
+        payload.get("image_base64"),
+        strict=True,
+        job_id=str(job["_id"]),
+    )
+
+
+@app.post("/add-memory")
+async def add_memory_endpoint(
+    person_id: Optional[str] = Form(None),
+    transcript: str = Form(...),
+    image_base64: Optional[str] = Form(None),
+    debug: bool = Form(False),
+    background: bool = Form(False),
+    client_id: Optional[str] = Form(None),
+):
+    """
+    Saves a memory. If person_id is missing, tries to extract name and register face.
+    With background=true the transcript is persisted as a job and a job_id is
+    returned immediately; the result is pushed to the client's /ws/listen socket.
+    """
+    try:
+        if background:
+            job_id = await job_queue.enqueue(
+                "add_memory",
+                {
+                    "person_id": person_id,
+                    "transcript": transcript,
+                    "image_base64": image_base64,
+                },
+                client_id=client_id,
+            )
+            print(f"DEBUG: Queued add_memory job {job_id}")
+            return {"status": "queued", "job_id": job_id}
+
+        return await process_memory(person_id, transcript, image_base64, debug=debug)
     except Exception as e:
         print(f"DEBUG ERROR: add_memory_endpoint error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str, client_id: Optional[str] = None):
+    """
+    Returns the status (and result, once done) of a background job queued
+    by `client_id`; other clients get a 404.
+    """
+    job = await job_queue.get(job_id, client_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
 @app.get("/people")
-async def list_people():
-    """Returns all people with their latest summary."""
+async def list_people(skip: int = Query(0, ge=0), limit: Optional[int] = Query(None, ge=0)):
+    """Returns people (paginated with skip/limit, 0 = no limit) with their latest summary."""
     try:
-        results = await get_all_people_with_latest_memory()
+        results = await get_all_people_with_latest_memory(skip=skip, limit=limit)
         return results
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -210,6 +427,44 @@ async def person_history(person_id: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/debug/explain")
+async def explain_queries():
+    """Reports the query plans (stages and indexes) of the hot queries."""
+    try:
+        return await explain_hot_queries()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/metrics")
+async def get_metrics():
+    """Returns per-stage latency statistics, counters, per-socket frame stats and sessions."""
+    snapshot = metrics.snapshot()
+    snapshot["latest_memory_cache"] = latest_memory_cache.stats()
+    snapshot["llm_cache"] = llm_cache.stats()
+    snapshot["face_cache"] = {
+        "size": len(face_cache),
+        "shared": face_sync is not None,
+        "leader": face_sync.is_leader if face_sync else None,
+    }
+    snapshot["sessions"] = sessions.snapshot()
+    snapshot["recognition_streams"] = {
+        stream_id: mailbox.snapshot()
+        for stream_id, mailbox in recognition_streams.items()
+    }
+    return snapshot
+
+
+@app.delete("/llm-cache")
+async def invalidate_llm_cache(kind: Optional[str] = None):
+    """Drops cached LLM responses ("summary", "name", or all when kind is omitted)."""
+    try:
+        deleted = await llm_cache.invalidate(kind)
+        return {"status": "success", "deleted": deleted}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @app.post("/transcribe")
 async def transcribe_endpoint(audio: UploadFile = File(...)):
     """Transcribes an audio file."""
@@ -221,45 +476,152 @@ async def transcribe_endpoint(audio: UploadFile = File(...)):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.websocket("/ws/transcribe")
+async def websocket_transcribe(websocket: WebSocket):
+    """
+    Streaming counterpart of /transcribe: the client sends recorder chunks as
+    binary messages while recording and a text "end" message when it stops.
+    The upload to the STT backend starts with the first chunk, so only the
+    last chunk is left to upload once the user stops talking. Replies with
+    a "transcript" message, or an "error" one so the client can fall back
+    to POST /transcribe.
+    """
+    await websocket.accept()
+    chunks: asyncio.Queue = asyncio.Queue()
+
+    async def audio_chunks():
+        while True:
+            chunk = await chunks.get()
+            if chunk is None:
+                return
+            yield chunk
+
+    transcription = asyncio.create_task(transcribe_stream(audio_chunks()))
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            if message.get("bytes"):
+                metrics.observe("stt.chunk_bytes", len(message["bytes"]))
+                await chunks.put(message["bytes"])
+            elif message.get("text") == "end":
+                start = time.perf_counter()
+                await chunks.put(None)
+                try:
+                    transcript = await transcription
+                except Exception as e:
+                    await websocket.send_json({"type": "error", "message": str(e)})
+                    break
+                # Time from the end of the recording to the transcript
+                metrics.record("stt.stream.tail", (time.perf_counter() - start) * 1000)
+                await websocket.send_json({"type": "transcript", "text": transcript})
+                break
+    except WebSocketDisconnect:
+        pass
+    finally:
+        if not transcription.done():
+            transcription.cancel()
+        elif not transcription.cancelled():
+            # Failed while the client was gone: already logged
+            transcription.exception()
+
+
+def log_first_recognition():
+    """Logs the time from process start to the first recognition response."""
+    global first_recognition_logged
+    if first_recognition_logged:
+        return
+    first_recognition_logged = True
+    elapsed = (time.perf_counter() - boot_started) * 1000
+    metrics.record("startup.first_recognition", elapsed)
+    print(f"Time to first recognition: {elapsed:.0f}ms after start.")
+
+
 @app.websocket("/ws/recognition")
 async def websocket_recognition(websocket: WebSocket):
     await websocket.accept()
+    # Pairs this camera with the /ws/listen socket of the same device
+    session = sessions.join(
+        websocket.query_params.get("session") or websocket.query_params.get("client_id"),
+        "recognition",
+    )
+    # Follows faces across this connection's frames so steady faces skip re-embedding
+    tracker = FaceTracker()
+    # Adaptive mode: detect around tracked faces, with periodic full-frame scans
+    planner = DetectionPlanner() if DETECT_ADAPTIVE else None
+    # Frames arriving while one is being processed replace each other, so a
+    # slow inference drops stale frames instead of queueing them up
+    mailbox = LatestFrameMailbox()
+    recognition_streams[mailbox.stream_id] = mailbox
+
+    async def read_frames():
+        try:
+            while True:
+                # Frontend sends the webcam frame every ~300ms, either as raw
+                # JPEG/WebP bytes (binary mode) or as a Base64 string (text mode)
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    return
+                data = message.get("bytes")
+                if data is None:
+                    data = message.get("text")
+                mailbox.put(data)
+        except Exception as e:
+            print(f"WS frame reader error: {e}")
+        finally:
+            mailbox.close()
+
+    reader = asyncio.create_task(read_frames())
     try:
         while True:
-            # 1. Receive Frame
-            # Frontend sends a Base64 string of the webcam frame every ~1.5s
-            data = await websocket.receive_text()
+            # 1. Take the newest frame
+            frame = await mailbox.get()
+            if frame is None:
+                raise WebSocketDisconnect()
+            data, received_at = frame
             try:
-                img = decode_base64_image(data)
-                # Resize image for performance
-                height, width = img.shape[:2]
-                scale = 1.0
-                if width > 480:
-                    scale = 480 / width
-                    img = cv2.resize(img, (480, int(height * scale)))
-
-                faces = get_face_embeddings(img)
+                # Decode, resize (to 480px for performance) and inference run
+                # off the event loop, batched with frames from other cameras
+                faces = await recognize_frame(
+                    data, max_width=480, tracker=tracker, planner=planner
+                )
                 response_data = []
 
+                # Score every freshly embedded face with one matrix product
+                embedded = [face for face in faces if "embedding" in face]
+                matches = (
+                    face_cache.match_batch([face["embedding"] for face in embedded])
+                    if embedded
+                    else []
+                )
+                for face, match in zip(embedded, matches):
+                    face["track"].set_embedding(face["embedding"], match)
+                    if match:
+                        # Confident matches of new looks feed the person's gallery
+                        gallery.observe(match[0], face["embedding"], match[2])
+                # Faces named by voice since they were last matched
+                for face in faces:
+                    session.resolve(face["track"])
+                # What this wearer just saw, for names heard on their listen socket
+                session.record(faces)
+
                 for face in faces:
-                    # Rescale bbox back to original image size
-                    rescaled_bbox = [
-                        int(face["bbox"][0] / scale),  # top
-                        int(face["bbox"][1] / scale),  # right
-                        int(face["bbox"][2] / scale),  # bottom
-                        int(face["bbox"][3] / scale),  # left
-                    ]
-
-                    match = face_cache.match(face["embedding"])
+                    bbox = face["bbox"]  # [top, right, bottom, left], original size
+                    match = face["track"].match
+
                     if match:
-                        person_id, name, sim = match
-                        latest_memory = await get_latest_memory(person_id)
+                        person_id, _, sim = match
+                        # Picks up renames made since the track was recognized
+                        name = face_cache.get_name(person_id) or match[1]
+                        # In-process cache: no DB round trip for known faces
+                        latest_memory = await get_latest_memory_summary(person_id)
 
                         memory_summary = None
                         last_met = "No previous history"
                         if latest_memory:
-                            memory_summary = latest_memory.summary
-                            last_met = latest_memory.timestamp.strftime("%Y-%m-%d")
+                            memory_summary = latest_memory["summary"]
+                            last_met = latest_memory["timestamp"].strftime("%Y-%m-%d")
 
                         response_data.append(
                             {
@@ -267,14 +629,16 @@ async def websocket_recognition(websocket: WebSocket):
                                 "person_id": person_id,
                                 "last_met": last_met,
                                 "summary": memory_summary,
-                                "bbox": rescaled_bbox,
+                                "bbox": bbox,
                                 "similarity": float(sim),
                             }
                         )
                     else:
-                        response_data.append({"name": "Unknown", "bbox": rescaled_bbox})
+                        response_data.append({"name": "Unknown", "bbox": bbox})
 
                 await websocket.send_json(response_data)
+                mailbox.done(received_at)
+                log_first_recognition()
             except Exception as e:
                 print(f"WS processing error: {e}")
                 await websocket.send_json({"error": "Processing failed"})
@@ -283,12 +647,21 @@ async def websocket_recognition(websocket: WebSocket):
         print("Websocket disconnected")
     except Exception as e:
         print(f"Websocket error: {e}")
+    finally:
+        reader.cancel()
+        recognition_streams.pop(mailbox.stream_id, None)
+        sessions.leave(session, "recognition")
 
 
 @app.websocket("/ws/listen")
 async def websocket_listen(websocket: WebSocket):
     await websocket.accept()
     print("DEBUG: Client connected to /ws/listen")
+    # Background job results (e.g. deferred memories) are pushed on this socket
+    client_id = websocket.query_params.get("client_id")
+    job_queue.subscribe(client_id, websocket)
+    # Names heard here only apply to faces seen by the same device's camera
+    session = sessions.join(websocket.query_params.get("session") or client_id, "listen")
 
     try:
         # Define Deepgram callbacks
@@ -321,23 +694,22 @@ async def websocket_listen(websocket: WebSocket):
 
             if regex_result["name"]:
                 print(f"DEBUG: Regex detected: {regex_result['name']}")
-                loop.create_task(handle_identity(regex_result["name"], websocket))
+                loop.create_task(
+                    handle_identity(regex_result["name"], websocket, session)
+                )
 
             # 2. Parallel: Slow Path (High Accuracy with Gemini)
             # Use Gemini for correction logic: "No, it's not Connected, it's Vaidik"
             if len(sentence.split()) > 3:  # Only check longer sentences for context
-                loop.create_task(check_gemini_and_handle(sentence, websocket))
+                loop.create_task(check_gemini_and_handle(sentence, websocket, session))
 
         def on_error(error, **kwargs):
-            print(f"Deepgram Error: {error}")
-
-        # Connect to Deepgram
-        from speech import deepgram
+            print(f"STT ({stt_backend.name}) Error: {error}")
 
+        # Connect to the live STT engine (Deepgram, or VAD + local Whisper)
         # Connect using the Async Client Context Manager Pattern
         try:
-            # We use deepgram.listen.v1.connect since 'live' attribute is missing on this SDK version
-            async with deepgram.listen.v1.connect(
+            async with stt_backend.connect_live(
                 model="nova-2",
                 language="en-US",
                 smart_format="true",
@@ -346,7 +718,7 @@ async def websocket_listen(websocket: WebSocket):
                 socket.on("transcript", on_message)
                 socket.on("error", on_error)
 
-                print("DEBUG: Deepgram Live Connection Started via v1.connect")
+                print(f"DEBUG: {stt_backend.name} live connection started")
 
                 while True:
                     data = await websocket.receive_bytes()
@@ -361,45 +733,45 @@ async def websocket_listen(websocket: WebSocket):
 
     except Exception as e:
         print(f"WS Listen setup error: {e}")
+    finally:
+        job_queue.unsubscribe(client_id, websocket)
+        sessions.leave(session, "listen")
 
 
-async def check_gemini_and_handle(transcript: str, websocket: WebSocket):
+async def check_gemini_and_handle(transcript: str, websocket: WebSocket, session: Session):
     """Background task to check complex sentences with Gemini."""
     try:
         from memory import extract_name_from_transcript
 
-        # Run sync Gemini call in thread pool
-        import asyncio
-
-        result = await asyncio.to_thread(extract_name_from_transcript, transcript)
+        # Async Gemini call (bounded concurrency, timeout, retries)
+        result = await extract_name_from_transcript(transcript)
 
         if result and result.get("name"):
             print(f"DEBUG: Gemini Detected: {result['name']}")
-            await handle_identity(result["name"], websocket)
+            await handle_identity(result["name"], websocket, session)
     except Exception as e:
         print(f"Gemini background check failed: {e}")
 
 
-async def handle_identity(name: str, websocket: WebSocket):
+async def handle_identity(name: str, websocket: WebSocket, session: Session):
     """
     Decides whether to Register a new face or Rename an existing face
-    based on what was most recently seen.
+    based on what this session's camera saw most recently.
     """
     try:
-        from models import add_person, update_person_name, get_all_people
-        from recognition import face_cache
+        from models import update_person_name
 
         # A. Check for RECENT KNOWN face (Correction scenario)
         # "No my name is Vaidik" -> Updates 'Connected' to 'Vaidik'
-        known_id = face_cache.get_last_seen_known(ttl=10)  # 10s window to correct
+        known = session.last_known(ttl=10)  # 10s window to correct
 
-        if known_id:
+        if known:
+            known_id = known.match[0]
             print(f"DEBUG: Renaming person {known_id} to {name}")
             success = await update_person_name(known_id, name)
             if success:
                 # Update Cache
-                people = await get_all_people()
-                face_cache.update(people)
+                face_cache.rename(known_id, name)
 
                 # Notify UI to force refresh
                 await websocket.send_json(
@@ -413,35 +785,10 @@ async def handle_identity(name: str, websocket: WebSocket):
                 return
 
         # B. Check for RECENT UNKNOWN face (New Registration scenario)
-        unknown_embedding = face_cache.get_last_unknown(ttl=8)
-
-        if unknown_embedding is not None:
-            # Check if embedding is numpy
-            import numpy as np
-
-            if isinstance(unknown_embedding, np.ndarray):
-                embedding_list = unknown_embedding.tolist()
-            else:
-                embedding_list = unknown_embedding
+        unknown = session.last_unknown(ttl=8)
 
-            print(f"DEBUG: Registering NEW person {name}...")
-            person_id = await add_person(name, embedding_list)
-
-            # Update Cache
-            people = await get_all_people()
-            face_cache.update(people)
-
-            # Reset last unknown
-            face_cache.last_unknown_embedding = None
-
-            await websocket.send_json(
-                {
-                    "type": "identity_update",
-                    "name": name,
-                    "person_id": person_id,
-                    "mode": "new",
-                }
-            )
+        if unknown:
+            await register_and_notify(name, unknown, websocket, session)
         else:
             print(
                 f"DEBUG: Name '{name}' detected, but no recent face (known or unknown) to attach to."
@@ -451,39 +798,36 @@ async def handle_identity(name: str, websocket: WebSocket):
         print(f"Error in handle_identity: {e}")
 
 
-async def register_and_notify(name: str, embedding, websocket: WebSocket):
+async def register_and_notify(
+    name: str, face: SeenFace, websocket: WebSocket, session: Session
+):
     """
-    Helper to running async DB operations from the Deepgram callback.
+    Registers an unknown face seen by the session's camera under `name` and
+    tells the frontend.
     """
     try:
-        from models import add_person, get_all_people
-        from recognition import face_cache
+        from models import add_person
 
-        # 1. Add to DB
-        # Convert numpy array to list for JSON serialization if needed,
-        # but add_person expects list or numpy? models.py usually handles it.
-        # Let's clean it up.
-        # Check if embedding is numpy
-        import numpy as np
-
-        if isinstance(embedding, np.ndarray):
-            embedding_list = embedding.tolist()
-        else:
-            embedding_list = embedding
+        embedding_list = np.asarray(face.embedding, dtype=np.float32).tolist()
 
-        print(f"DEBUG: Registering {name}...")
+        # 1. Add to DB
+        print(f"DEBUG: Registering NEW person {name}...")
         person_id = await add_person(name, embedding_list)
 
         # 2. Update Cache
-        people = await get_all_people()
-        face_cache.update(people)
+        face_cache.upsert(person_id, name, embedding_list)
 
-        # 3. Reset last unknown so we don't register them again immediately
-        face_cache.last_unknown_embedding = None
+        # 3. Attach the name to the face's track so it isn't registered again
+        session.assign(face, person_id, name)
 
         # 4. Notify Frontend
         await websocket.send_json(
-            {"type": "identity_update", "name": name, "person_id": person_id}
+            {
+                "type": "identity_update",
+                "name": name,
+                "person_id": person_id,
+                "mode": "new",
+            }
         )
         print(f"DEBUG: Sent identity_update for {name}")
 
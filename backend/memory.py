@@ -1,52 +1,61 @@
 import os
 import json
 import re
+import time
 import google.generativeai as genai
 from dotenv import load_dotenv
 
+from llm import LLMClient
+from llm_cache import llm_cache
+from prompts import SUMMARY_PROMPT, NAME_EXTRACTION_PROMPT
+
 load_dotenv()
 
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 genai.configure(api_key=GOOGLE_API_KEY)
 model = genai.GenerativeModel("gemini-2.5-flash")
+llm = LLMClient(model)
 
+llm_cache.register("summary", SUMMARY_PROMPT)
+llm_cache.register("name", NAME_EXTRACTION_PROMPT)
+
+
+def _parse_json_response(text: str) -> dict:
+    """Extracts the JSON object from a model response (with or without ``` fences)."""
+    text = text.strip()
+    if "```json" in text:
+        text = text.split("```json")[1].split("```")[0].strip()
+    elif "```" in text:
+        text = text.split("```")[1].split("```")[0].strip()
+    return json.loads(text)
 
-def summarize_conversation(transcript: str) -> dict:
-    """Uses Gemini to summarize a conversation transcript into structured JSON."""
-    prompt = f"""
-    You are a memory compression engine for MemoryLens.
-    Given a conversation transcript, return structured JSON:
-    {{
-        "summary": "1 sentence concise memory of the interaction",
-        "key_topics": ["topic1", "topic2"],
-        "emotional_tone": "Positive/Neutral/Negative",
-        "follow_up_suggestion": "Short suggestion",
-        "extracted_name": "Name of the person mentioned if they introduced themselves, else null"
-    }}
-    Rules:
-    - If someone says "I am Alex" or "My name is Sarah", capture "Alex" or "Sarah" in "extracted_name".
-    - If no name is clearly stated by the person, set "extracted_name" to null.
-    - Keep the summary factual and concise.
-    
-    Transcript:
-    {transcript}
-    
-    Return valid JSON only.
-    """
 
+async def _generate_json(kind: str, template: str, transcript: str) -> dict:
+    """Fills a prompt template and returns the parsed JSON, served from llm_cache when possible."""
+    cached = await llm_cache.get(kind, transcript)
+    if cached is not None:
+        return cached
+
+    start = time.perf_counter()
+    text = await llm.generate(template.format(transcript=transcript))
+    result = _parse_json_response(text)
+    await llm_cache.set(kind, transcript, result, (time.perf_counter() - start) * 1000)
+    return result
+
+
+async def summarize_conversation(transcript: str, strict: bool = False) -> dict:
+    """
+    Uses Gemini to summarize a conversation transcript into structured JSON.
+    On failure a placeholder summary is returned, or the error is raised
+    when `strict` is set (so background jobs can retry).
+    """
     try:
-        response = model.generate_content(prompt)
-        # Clean up the response to extract JSON
-        text = response.text.strip()
-        if "```json" in text:
-            text = text.split("```json")[1].split("```")[0].strip()
-        elif "```" in text:
-            text = text.split("```")[1].split("```")[0].strip()
-
-        return json.loads(text)
+        return await _generate_json("summary", SUMMARY_PROMPT, transcript)
     except Exception as e:
         error_msg = str(e)
         print(f"Error in Gemini summarization: {error_msg}")
+        if strict:
+            raise
         if "403" in error_msg or "leaked" in error_msg.lower():
             summary_text = (
                 "API Key Error: Key is invalid or leaked. Please update GOOGLE_API_KEY."
@@ -131,71 +140,42 @@ def extract_name_regex_only(transcript: str) -> dict:
     return {"name": None}
 
 
-def extract_name_from_transcript(transcript: str) -> dict:
+# Common Speech-to-Text corrections
+NAME_CORRECTIONS = {
+    "veic": "Vaidik",
+    "vedic": "Vaidik",  # User prefers Vaidik
+    "vedik": "Vaidik",
+    "vedic solei": "Vaidik Sule",
+    "sydney": "Siddhi",
+    "sidney": "Siddhi",
+    "sidi": "Siddhi",
+    "siddhi": "Siddhi",
+    "cd": "Siddhi",  # Sometimes heard as C.D.
+    "solei": "Sule",
+}
+
+
+def correct_name(name: str) -> str:
+    """Applies the rudimentary speech-to-text name corrections."""
+    return NAME_CORRECTIONS.get(name.lower(), name)
+
+
+async def extract_name_from_transcript(transcript: str) -> dict:
     """Specialized prompt including regex fallback for name detection."""
 
     # 1. Try Regex first for speed and determinism
     regex_result = extract_name_regex_only(transcript)
 
-    # Common Speech-to-Text corrections
-    # Common Speech-to-Text corrections
-    name_corrections = {
-        "veic": "Vaidik",
-        "vedic": "Vaidik",  # User prefers Vaidik
-        "vedik": "Vaidik",
-        "vedic solei": "Vaidik Sule",
-        "sydney": "Siddhi",
-        "sidney": "Siddhi",
-        "sidi": "Siddhi",
-        "siddhi": "Siddhi",
-        "cd": "Siddhi",  # Sometimes heard as C.D.
-        "solei": "Sule",
-    }
-
     if regex_result["name"]:
-        extracted = regex_result["name"]
-        # rudimentary correction
-        if extracted.lower() in name_corrections:
-            extracted = name_corrections[extracted.lower()]
-
+        extracted = correct_name(regex_result["name"])
         print(f"DEBUG: Regex extracted name: {extracted}")
         return {"name": extracted}
 
     # 2. Fallback to Gemini
-    prompt = f"""
-    Analyze this transcript and extract the speaker's name if they are introducing themselves.
-    Common patterns: "It's me [Name]", "I am [Name]", "My name is [Name]", "I'm [Name]".
-    
-    Transcript: "{transcript}"
-    
-    Return ONLY a JSON object: {{"name": "ExtractedName" or null}}
-    """
     try:
-        response = model.generate_content(prompt)
-        text = response.text.strip()
-        if "```json" in text:
-            text = text.split("```json")[1].split("```")[0].strip()
-        elif "```" in text:
-            text = text.split("```")[1].split("```")[0].strip()
-
-        result = json.loads(text)
+        result = dict(await _generate_json("name", NAME_EXTRACTION_PROMPT, transcript))
         if result.get("name"):
-            name = result["name"]
-            # rudimentary correction
-            name_corrections = {
-                "veic": "Vaidik",
-                "vedic": "Vaidik",  # User prefers Vaidik
-                "vedik": "Vaidik",
-                "vedic solei": "Vaidik Sule",
-                "sydney": "Siddhi",
-                "sidney": "Siddhi",
-                "sidi": "Siddhi",
-                "siddhi": "Siddhi",
-                "cd": "Siddhi",
-                "solei": "Sule",
-            }
-            if name.lower() in name_corrections:
-                result["name"] = name_corrections[name.lower()]
+            result["name"] = correct_name(result["name"])
         return result
     except Exception as e:
         print(f"Error extracting name with Gemini: {e}")
@@ -0,0 +1,81 @@
+import time
+import threading
+from contextlib import contextmanager
+
+
+class RunningStats:
+    """Running statistics for one measured quantity (a stage latency, a size, ...)."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = 0.0
+
+    def record(self, value: float):
+        self.count += 1
+        self.total += value
+        self.last = value
+        if value > self.max:
+            self.max = value
+
+    def snapshot(self) -> dict:
+        return {
+            "count": self.count,
+            "avg": round(self.total / self.count, 3) if self.count else 0.0,
+            "max": round(self.max, 3),
+            "last": round(self.last, 3),
+        }
+
+
+class Metrics:
+    """Process-wide latency, value and counter registry, safe to use from worker threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = {}
+        self.values = {}
+        self.counters = {}
+
+    def _record(self, registry: dict, name: str, value: float):
+        with self._lock:
+            stats = registry.get(name)
+            if stats is None:
+                stats = registry[name] = RunningStats()
+            stats.record(value)
+
+    def record(self, name: str, ms: float):
+        """Records a latency in milliseconds."""
+        self._record(self.latencies, name, ms)
+
+    def observe(self, name: str, value: float):
+        """Records any other measured value (bytes, queue depth, ...)."""
+        self._record(self.values, name, value)
+
+    def incr(self, name: str, value: float = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    @contextmanager
+    def timer(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, (time.perf_counter() - start) * 1000)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "latency_ms": {
+                    name: stats.snapshot() for name, stats in self.latencies.items()
+                },
+                "values": {
+                    name: stats.snapshot() for name, stats in self.values.items()
+                },
+                "counters": dict(self.counters),
+            }
+
+
+# Singleton instance
+metrics = Metrics()
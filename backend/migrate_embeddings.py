@@ -0,0 +1,66 @@
+import argparse
+import asyncio
+from datetime import datetime, timezone
+from pymongo import UpdateOne
+
+from embedding_codec import DTYPES, EMBEDDING_DTYPE, EMBEDDING_MODEL_VERSION, pack_embedding, pack_gallery
+from models import db, face_embeddings_of
+
+
+async def migrate(dtype: str, model: str, batch_size: int, dry_run: bool) -> int:
+    """
+    Rewrites face embeddings stored as arrays of doubles (or packed with
+    another dtype) as packed binary. Untagged embeddings are tagged with `model`.
+    """
+    query = {
+        "$or": [
+            {"face_embedding": {"$type": "array"}},
+            {"embedding_dtype": {"$ne": dtype}},
+            {"embedding_model": {"$exists": False}},
+        ]
+    }
+    total = await db.people.count_documents(query)
+    print(f"{total} people to migrate to {dtype} (dry run)" if dry_run else f"{total} people to migrate to {dtype}")
+    if dry_run or not total:
+        return total
+
+    done = 0
+    updates = []
+    projection = {"face_embedding": 1, "gallery": 1, "embedding_dtype": 1, "embedding_model": 1}
+    async for doc in db.people.find(query, projection):
+        embedding, *prototypes = face_embeddings_of(doc)
+        fields = pack_embedding(embedding, dtype)
+        if prototypes:
+            fields["gallery"] = pack_gallery(prototypes, dtype)
+        fields["embedding_model"] = doc.get("embedding_model", model)
+        fields["updated_at"] = datetime.now(timezone.utc)
+        updates.append(UpdateOne({"_id": doc["_id"]}, {"$set": fields}))
+        if len(updates) == batch_size:
+            await db.people.bulk_write(updates, ordered=False)
+            done += len(updates)
+            updates = []
+            print(f"  {done}/{total}")
+    if updates:
+        await db.people.bulk_write(updates, ordered=False)
+        done += len(updates)
+    print(f"Migrated {done} people.")
+    return done
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Converts stored face embeddings to packed binary with a model version tag."
+    )
+    parser.add_argument("--dtype", choices=sorted(DTYPES), default=EMBEDDING_DTYPE)
+    parser.add_argument("--model", default=EMBEDDING_MODEL_VERSION,
+                        help="Model version to tag untagged (legacy) embeddings with")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    asyncio.run(migrate(args.dtype, args.model, args.batch_size, args.dry_run))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
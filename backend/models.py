@@ -1,12 +1,34 @@
 import os
+import time
+import numpy as np
+from collections import OrderedDict
 from motor.motor_asyncio import AsyncIOMotorClient
-from pydantic import BaseModel, Field, GetCoreSchemaHandler, ConfigDict
+from pydantic import (
+    BaseModel,
+    Field,
+    GetCoreSchemaHandler,
+    ConfigDict,
+    ValidationInfo,
+    field_validator,
+)
 from pydantic_core import core_schema
-from typing import List, Optional, Any
+from typing import List, Optional, Any, Tuple
 from datetime import datetime, timezone
 from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.collation import Collation
 from dotenv import load_dotenv
 
+from embedding_codec import (
+    EMBEDDING_MODEL_VERSION,
+    is_current_model,
+    pack_embedding,
+    pack_gallery,
+    row_key,
+    unpack_embedding,
+)
+from shared_cache import FACE_SHARED_CACHE
+
 load_dotenv()
 
 MONGODB_URI = os.getenv("MONGODB_URI")
@@ -51,7 +73,38 @@ class Person(BaseModel):
     )
     id: Optional[PyObjectId] = Field(alias="_id", default=None)
     name: str
+    embedding_dtype: str = "float32"
+    embedding_model: Optional[str] = None
     face_embedding: List[float]
+    # Prototypes consolidated from confident matches (see gallery.py)
+    gallery: List[List[float]] = []
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    updated_at: Optional[datetime] = None
+
+    @field_validator("face_embedding", mode="before")
+    @classmethod
+    def _unpack_embedding(cls, value, info: ValidationInfo):
+        # Stored as packed binary; legacy documents hold a list of doubles
+        if isinstance(value, bytes):
+            return unpack_embedding(value, info.data.get("embedding_dtype", "float32")).tolist()
+        return value
+
+    @field_validator("gallery", mode="before")
+    @classmethod
+    def _unpack_gallery(cls, value, info: ValidationInfo):
+        dtype = info.data.get("embedding_dtype", "float32")
+        return [unpack_embedding(e, dtype).tolist() if isinstance(e, bytes) else e for e in value or []]
+
+
+class PersonSummary(BaseModel):
+    """Person without the face embedding, for list views."""
+
+    model_config = ConfigDict(
+        populate_by_name=True,
+        arbitrary_types_allowed=True,
+    )
+    id: Optional[PyObjectId] = Field(alias="_id", default=None)
+    name: str
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 
@@ -71,16 +124,166 @@ class Memory(BaseModel):
 
 
 # Database helpers
+# Case-insensitive comparison for person names (matches the name index)
+NAME_COLLATION = Collation(locale="en", strength=2)
+# Deleted people are remembered (deleted_people collection) this long, so
+# face cache catch-up finds deletions without listing every person
+PERSON_TOMBSTONE_TTL_S = int(os.getenv("PERSON_TOMBSTONE_TTL_S", str(30 * 24 * 3600)))
+
+
+async def ensure_indexes():
+    """Creates the indexes the hot queries rely on (no-op if they exist)."""
+    # Latest/all memories of a person: equality on person_id, sort on timestamp
+    await db.memories.create_index(
+        [("person_id", 1), ("timestamp", -1)], name="person_id_timestamp"
+    )
+    # One memory per background job, however often the job is retried
+    await db.memories.create_index(
+        [("job_id", 1)],
+        name="job_id_unique",
+        unique=True,
+        partialFilterExpression={"job_id": {"$exists": True}},
+    )
+    # Case-insensitive exact name lookups (find_person_by_name)
+    await db.people.create_index(
+        [("name", 1)], name="name_ci", collation=NAME_COLLATION
+    )
+    # Face cache catch-up: people changed, and tombstones of people deleted, since a time
+    await db.people.create_index([("updated_at", 1)], name="updated_at")
+    await db.deleted_people.create_index(
+        [("deleted_at", 1)], name="ttl", expireAfterSeconds=PERSON_TOMBSTONE_TTL_S
+    )
+    print("Database indexes ensured.")
+
+
 async def get_all_people():
     people_cursor = db.people.find()
     return [Person(**p) async for p in people_cursor]
 
 
+async def load_face_matrix(
+    dim: int = 512, since: Optional[datetime] = None
+) -> Tuple[List[str], List[str], np.ndarray]:
+    """
+    Reads every person's embeddings straight into one (n, dim) float32
+    matrix with parallel face cache key (see row_key) and name lists,
+    skipping per-element Pydantic validation: one row for the registration
+    embedding plus one per gallery prototype. Embeddings tagged with another
+    model version are skipped. With `since`, only people added or changed
+    at or after that time are read.
+    """
+    projection = {
+        "name": 1,
+        "face_embedding": 1,
+        "gallery": 1,
+        "embedding_dtype": 1,
+        "embedding_model": 1,
+    }
+    query = {"updated_at": {"$gte": since}} if since else {}
+    expected = await db.people.count_documents(query) if since else await db.people.estimated_document_count()
+    matrix = np.empty((expected, dim), dtype=np.float32)
+    ids, names, skipped = [], [], 0
+    async for doc in db.people.find(query, projection, batch_size=1000):
+        if not is_current_model(doc):
+            skipped += 1
+            continue
+        embeddings = face_embeddings_of(doc)
+        row = len(ids)
+        if row + len(embeddings) > len(matrix):
+            # Gallery rows, or people added since the count was taken
+            matrix = np.resize(matrix, (max(2 * len(matrix), row + len(embeddings), 64), dim))
+        for k, embedding in enumerate(embeddings):
+            matrix[row + k] = embedding
+            ids.append(row_key(doc["_id"], k))
+            names.append(doc["name"])
+    if skipped:
+        print(f"Skipped {skipped} faces embedded by another model version (re-register them).")
+    return ids, names, matrix[: len(ids)]
+
+
+def face_embeddings_of(doc: dict) -> List[np.ndarray]:
+    """A person document's registration embedding followed by its gallery prototypes."""
+    dtype = doc.get("embedding_dtype", "float32")
+    return [unpack_embedding(e, dtype) for e in [doc["face_embedding"], *doc.get("gallery", [])]]
+
+
+async def get_face_embeddings_of(
+    person_id: str,
+) -> Optional[Tuple[List[np.ndarray], Optional[datetime]]]:
+    """
+    Registration embedding and gallery prototypes of one person, with the
+    document's updated_at for update_person_gallery (None if the person is gone).
+    """
+    doc = await db.people.find_one(
+        {"_id": ObjectId(person_id)},
+        {"face_embedding": 1, "gallery": 1, "embedding_dtype": 1, "updated_at": 1},
+    )
+    return (face_embeddings_of(doc), doc.get("updated_at")) if doc else None
+
+
+async def update_person_gallery(
+    person_id: str, prototypes: List[np.ndarray], updated_at: Optional[datetime]
+) -> bool:
+    """
+    Replaces a person's gallery prototypes (stored like face_embedding), only
+    if the document is still at `updated_at`. False if it changed since it
+    was read (e.g. another worker consolidated first) or is gone.
+    """
+    doc = await db.people.find_one({"_id": ObjectId(person_id)}, {"embedding_dtype": 1})
+    if not doc:
+        return False
+    result = await db.people.update_one(
+        # None also matches documents written before updated_at existed
+        {"_id": ObjectId(person_id), "updated_at": updated_at},
+        {
+            "$set": {
+                "gallery": pack_gallery(prototypes, doc.get("embedding_dtype", "float32")),
+                "updated_at": datetime.now(timezone.utc),
+            }
+        },
+    )
+    return result.modified_count == 1
+
+
+async def load_removed_face_ids(since: datetime) -> set:
+    """
+    Ids of the people to drop from the face cache since `since`: deleted
+    (tombstones in deleted_people) or re-embedded by another model version.
+    """
+    tombstones = db.deleted_people.find({"deleted_at": {"$gte": since}}, {"person_id": 1})
+    removed = {str(doc["person_id"]) async for doc in tombstones}
+    query = {
+        "updated_at": {"$gte": since},
+        "embedding_model": {"$nin": [EMBEDDING_MODEL_VERSION, None]},
+    }
+    removed |= {str(doc["_id"]) async for doc in db.people.find(query, {"_id": 1})}
+    return removed
+
+
+async def delete_people(query: dict) -> int:
+    """
+    Deletes people, leaving tombstones so running servers and face cache
+    snapshots drop them on their next catch-up. Returns the number deleted.
+    """
+    ids = [doc["_id"] async for doc in db.people.find(query, {"_id": 1})]
+    if not ids:
+        return 0
+    now = datetime.now(timezone.utc)
+    await db.deleted_people.insert_many(
+        [{"person_id": person_id, "deleted_at": now} for person_id in ids]
+    )
+    result = await db.people.delete_many({"_id": {"$in": ids}})
+    return result.deleted_count
+
+
 async def add_person(name: str, embedding: List[float]):
+    now = datetime.now(timezone.utc)
     person = {
         "name": name,
-        "face_embedding": embedding,
-        "created_at": datetime.now(timezone.utc),
+        **pack_embedding(embedding),
+        "created_at": now,
+        # Lets the face cache snapshot catch up on changes (see face_snapshot)
+        "updated_at": now,
     }
     print(f"DEBUG: Adding person {name} to DB...")
     result = await db.people.insert_one(person)
@@ -91,7 +294,8 @@ async def update_person_name(person_id: str, new_name: str):
     """Updates the name of an existing person."""
     try:
         await db.people.update_one(
-            {"_id": ObjectId(person_id)}, {"$set": {"name": new_name}}
+            {"_id": ObjectId(person_id)},
+            {"$set": {"name": new_name, "updated_at": datetime.now(timezone.utc)}},
         )
         print(f"DEBUG: Updated person {person_id} name to {new_name}")
         return True
@@ -107,8 +311,10 @@ async def add_memory(
     topics: List[str],
     tone: str,
     follow_up: str = None,
+    job_id: Optional[str] = None,
 ):
     memory = {
+        "_id": ObjectId(),
         "person_id": ObjectId(person_id),
         "transcript": transcript,
         "summary": summary,
@@ -118,8 +324,118 @@ async def add_memory(
         "timestamp": datetime.now(timezone.utc),
     }
     print(f"DEBUG: Adding memory for person {person_id}...")
-    result = await db.memories.insert_one(memory)
-    return str(result.inserted_id)
+    inserted = True
+    if job_id:
+        # A background job retried after a crash stores its memory only once
+        memory["job_id"] = job_id
+        stored = await db.memories.find_one_and_update(
+            {"job_id": job_id},
+            {"$setOnInsert": memory},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        # An earlier attempt's memory: not necessarily the latest any more
+        inserted = stored["_id"] == memory["_id"]
+        memory = stored
+    else:
+        await db.memories.insert_one(memory)
+    latest_memory_cache.offer(
+        str(memory["person_id"]),
+        {"summary": memory["summary"], "timestamp": memory["timestamp"]},
+        replace_only=not inserted,
+    )
+    return str(memory["_id"])
+
+
+def _as_utc(value: datetime) -> datetime:
+    """Datetimes read back from MongoDB are naive UTC."""
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+class LatestMemoryCache:
+    """
+    LRU cache of each person's latest memory summary and timestamp, keyed
+    by person id. Negative results (no memories yet) are cached too, and
+    add_memory writes through, so entries are never stale in a single process.
+    With several worker processes, memories stored by the others arrive
+    through face_sync (a change stream on memories), and `ttl_s` bounds how
+    long an entry can be stale where change streams are unavailable.
+    """
+
+    def __init__(self, max_size: int = 2048, ttl_s: float = 0):
+        self.max_size = max_size
+        self.ttl_s = ttl_s  # 0: entries don't expire
+        self.entries = OrderedDict()  # person_id -> {"summary", "timestamp"} or None
+        self.expires = {}  # person_id -> monotonic deadline (with a TTL)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, person_id: str):
+        """Returns (found, entry)."""
+        if person_id in self.entries and self.expires.get(person_id, float("inf")) < time.monotonic():
+            del self.entries[person_id], self.expires[person_id]
+        if person_id in self.entries:
+            self.entries.move_to_end(person_id)
+            self.hits += 1
+            return True, self.entries[person_id]
+        self.misses += 1
+        return False, None
+
+    def set(self, person_id: str, entry: Optional[dict]):
+        self.entries[person_id] = entry
+        self.entries.move_to_end(person_id)
+        if self.ttl_s:
+            self.expires[person_id] = time.monotonic() + self.ttl_s
+        while len(self.entries) > self.max_size:
+            evicted, _ = self.entries.popitem(last=False)
+            self.expires.pop(evicted, None)
+
+    def offer(self, person_id: str, entry: dict, replace_only: bool = False):
+        """
+        Caches a stored memory's entry unless the cached one is newer. With
+        `replace_only`, a person who isn't cached is left to the next lookup
+        (the memory may not be their latest).
+        """
+        if person_id not in self.entries:
+            if not replace_only:
+                self.set(person_id, entry)
+            return
+        current = self.entries[person_id]
+        if current is None or _as_utc(current["timestamp"]) < _as_utc(entry["timestamp"]):
+            self.set(person_id, entry)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
+
+
+latest_memory_cache = LatestMemoryCache(
+    max_size=int(os.getenv("LATEST_MEMORY_CACHE_SIZE", "2048")),
+    # Only needed when other worker processes store memories too
+    ttl_s=float(os.getenv("LATEST_MEMORY_CACHE_TTL_S") or (10 if FACE_SHARED_CACHE else 0)),
+)
+
+
+async def get_latest_memory_summary(person_id: str) -> Optional[dict]:
+    """
+    Returns {"summary", "timestamp"} of the person's latest memory (or None),
+    served from latest_memory_cache after the first lookup.
+    """
+    found, entry = latest_memory_cache.get(person_id)
+    if found:
+        return entry
+
+    memory = await get_latest_memory(person_id)
+    entry = {"summary": memory.summary, "timestamp": memory.timestamp} if memory else None
+    # add_memory may have written a newer entry while we were querying
+    if person_id not in latest_memory_cache.entries:
+        latest_memory_cache.set(person_id, entry)
+    return entry
 
 
 async def get_latest_memory(person_id: str):
@@ -139,24 +455,117 @@ async def get_person_memories(person_id: str):
 
 
 async def find_person_by_name(name: str):
-    """Finds a person by name (case-insensitive)."""
+    """Finds a person by name (case-insensitive, exact match on the name index)."""
     person = await db.people.find_one(
-        {"name": {"$regex": f"^{name}$", "$options": "i"}}
+        {"name": name.strip()}, collation=NAME_COLLATION
     )
     if person:
         return Person(**person)
     return None
 
 
-async def get_all_people_with_latest_memory():
-    people = await get_all_people()
+def _people_with_latest_memory_pipeline(skip: int = 0, limit: Optional[int] = None):
+    # $lookup with localField/foreignField and a pipeline needs MongoDB 5.0+
+    pipeline = [{"$sort": {"_id": 1}}]
+    if skip:
+        pipeline.append({"$skip": skip})
+    if limit:
+        pipeline.append({"$limit": limit})
+    pipeline += [
+        {"$project": {"face_embedding": 0, "gallery": 0}},
+        {
+            "$lookup": {
+                "from": "memories",
+                "localField": "_id",
+                "foreignField": "person_id",
+                "pipeline": [{"$sort": {"timestamp": -1}}, {"$limit": 1}],
+                "as": "latest_memory",
+            }
+        },
+    ]
+    return pipeline
+
+
+async def get_all_people_with_latest_memory(skip: int = 0, limit: Optional[int] = None):
+    """
+    Returns people (without embeddings) with their latest memory in a single
+    aggregation. The per-person lookup is served by the
+    (person_id, timestamp desc) index on memories.
+    """
     results = []
-    for person in people:
-        latest = await get_latest_memory(str(person.id))
+    pipeline = _people_with_latest_memory_pipeline(skip, limit)
+    async for doc in db.people.aggregate(pipeline):
+        latest = doc.pop("latest_memory")
         results.append(
             {
-                "person": person,
-                "latest_memory": latest,
+                "person": PersonSummary(**doc),
+                "latest_memory": Memory(**latest[0]) if latest else None,
             }
         )
     return results
+
+
+def _plan_summary(plan: dict) -> dict:
+    """Reduces a winning plan to its stage chain and the indexes it uses."""
+    stages, indexes = [], []
+
+    def walk(node):
+        if not isinstance(node, dict):
+            return
+        if "stage" in node:
+            stages.append(node["stage"])
+        if "indexName" in node:
+            indexes.append(node["indexName"])
+        for key in ("inputStage", "queryPlan"):
+            walk(node.get(key))
+        for child in node.get("inputStages", []):
+            walk(child)
+
+    walk(plan)
+    return {"stages": stages, "indexes": indexes}
+
+
+async def explain_hot_queries() -> dict:
+    """Returns the winning query plans of the hot queries, for diagnostics."""
+    sample = await db.people.find_one({}, {"_id": 1, "name": 1})
+    if not sample:
+        return {"error": "No people in the database to explain queries with"}
+    person_id, name = sample["_id"], sample["name"]
+
+    explains = {
+        "get_latest_memory": await db.memories.find({"person_id": person_id})
+        .sort("timestamp", -1)
+        .limit(1)
+        .explain(),
+        "get_person_memories": await db.memories.find({"person_id": person_id})
+        .sort("timestamp", -1)
+        .explain(),
+        "find_person_by_name": await db.people.find({"name": name})
+        .collation(NAME_COLLATION)
+        .limit(1)
+        .explain(),
+    }
+    plans = {
+        query: _plan_summary(explain.get("queryPlanner", {}).get("winningPlan", {}))
+        for query, explain in explains.items()
+    }
+
+    aggregate = await db.command(
+        "explain",
+        {
+            "aggregate": "people",
+            "pipeline": _people_with_latest_memory_pipeline(limit=1),
+            "cursor": {},
+        },
+        verbosity="queryPlanner",
+    )
+    if "stages" in aggregate:
+        plans["get_all_people_with_latest_memory"] = {
+            "stages": [next(iter(stage)) for stage in aggregate["stages"]]
+        }
+    else:
+        # Whole pipeline pushed down to the query engine
+        plans["get_all_people_with_latest_memory"] = _plan_summary(
+            aggregate.get("queryPlanner", {}).get("winningPlan", {})
+        )
+    return plans
@@ -0,0 +1,63 @@
+import os
+import onnxruntime
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Threads per ONNX session. By default (unset or empty) the cores are split
+# between the inference workers so parallel batches don't oversubscribe the CPU.
+ONNX_INTRA_OP_THREADS = int(
+    os.getenv("ONNX_INTRA_OP_THREADS")
+    or max(1, (os.cpu_count() or 1) // int(os.getenv("INFERENCE_WORKERS", "1")))
+)
+# Threads for running independent graph branches (only used in parallel mode)
+ONNX_INTER_OP_THREADS = int(os.getenv("ONNX_INTER_OP_THREADS", "1"))
+ONNX_EXECUTION_MODE = os.getenv("ONNX_EXECUTION_MODE", "sequential")
+# Graph optimizations: disable, basic, extended or all
+ONNX_GRAPH_OPTIMIZATION = os.getenv("ONNX_GRAPH_OPTIMIZATION", "all")
+# Model precision per stage: fp32, or int8 (made by quantize_models.py)
+DETECTION_PRECISION = os.getenv("DETECTION_PRECISION", "fp32")
+RECOGNITION_PRECISION = os.getenv("RECOGNITION_PRECISION", "fp32")
+
+GRAPH_OPTIMIZATION_LEVELS = {
+    "disable": onnxruntime.GraphOptimizationLevel.ORT_DISABLE_ALL,
+    "basic": onnxruntime.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+    "extended": onnxruntime.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+    "all": onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL,
+}
+EXECUTION_MODES = {
+    "sequential": onnxruntime.ExecutionMode.ORT_SEQUENTIAL,
+    "parallel": onnxruntime.ExecutionMode.ORT_PARALLEL,
+}
+
+
+def session_options() -> onnxruntime.SessionOptions:
+    """SessionOptions built from the ONNX_* settings."""
+    options = onnxruntime.SessionOptions()
+    options.intra_op_num_threads = ONNX_INTRA_OP_THREADS
+    options.inter_op_num_threads = ONNX_INTER_OP_THREADS
+    options.execution_mode = EXECUTION_MODES[ONNX_EXECUTION_MODE]
+    options.graph_optimization_level = GRAPH_OPTIMIZATION_LEVELS[ONNX_GRAPH_OPTIMIZATION]
+    return options
+
+
+def quantized_path(model_file: str) -> str:
+    """Where quantize_models.py writes the INT8 copy of a pack model (<pack>-int8/<file>)."""
+    pack_dir, name = os.path.split(model_file)
+    return os.path.join(pack_dir.rstrip(os.sep) + "-int8", name)
+
+
+def create_session(model_file: str, precision: str = "fp32") -> onnxruntime.InferenceSession:
+    """
+    Opens an ONNX session for `model_file` with the configured options, using
+    its INT8 copy when `precision` is "int8" and the copy exists.
+    """
+    if precision == "int8":
+        int8_file = quantized_path(model_file)
+        if os.path.exists(int8_file):
+            model_file = int8_file
+        else:
+            print(f"INT8 model {int8_file} not found (run quantize_models.py); using fp32.")
+    return onnxruntime.InferenceSession(
+        model_file, sess_options=session_options(), providers=["CPUExecutionProvider"]
+    )
@@ -0,0 +1,33 @@
+# Prompt templates for Gemini. Fill with .format(transcript=...).
+# Any edit here changes the template hash, so cached responses produced by
+# the old wording are no longer served (see llm_cache.py).
+
+SUMMARY_PROMPT = """
+    You are a memory compression engine for MemoryLens.
+    Given a conversation transcript, return structured JSON:
+    {{
+        "summary": "1 sentence concise memory of the interaction",
+        "key_topics": ["topic1", "topic2"],
+        "emotional_tone": "Positive/Neutral/Negative",
+        "follow_up_suggestion": "Short suggestion",
+        "extracted_name": "Name of the person mentioned if they introduced themselves, else null"
+    }}
+    Rules:
+    - If someone says "I am Alex" or "My name is Sarah", capture "Alex" or "Sarah" in "extracted_name".
+    - If no name is clearly stated by the person, set "extracted_name" to null.
+    - Keep the summary factual and concise.
+    
+    Transcript:
+    {transcript}
+    
+    Return valid JSON only.
+    """
+
+NAME_EXTRACTION_PROMPT = """
+    Analyze this transcript and extract the speaker's name if they are introducing themselves.
+    Common patterns: "It's me [Name]", "I am [Name]", "My name is [Name]", "I'm [Name]".
+    
+    Transcript: "{transcript}"
+    
+    Return ONLY a JSON object: {{"name": "ExtractedName" or null}}
+    """
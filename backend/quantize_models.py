@@ -0,0 +1,126 @@
+import argparse
+import glob
+import os
+import tempfile
+import cv2
+import numpy as np
+from onnxruntime.quantization import (
+    CalibrationDataReader,
+    QuantFormat,
+    QuantType,
+    quantize_dynamic,
+    quantize_static,
+)
+from onnxruntime.quantization.shape_inference import quant_pre_process
+
+from onnx_config import quantized_path
+from detection_planner import DET_SIZE
+from recognition import (
+    DETECTION_MODEL_PACK,
+    RECOGNITION_MODEL_PACK,
+    align_face,
+    detect_faces,
+    load_stage_model,
+)
+
+IMAGE_PATTERNS = ("*.jpg", "*.jpeg", "*.png", "*.webp")
+
+
+def load_images(directory: str, limit: int):
+    paths = sorted(
+        path
+        for pattern in IMAGE_PATTERNS
+        for path in glob.glob(os.path.join(directory, "**", pattern), recursive=True)
+    )
+    images = (cv2.imread(path) for path in paths[:limit])
+    return [image for image in images if image is not None]
+
+
+def detector_blob(model, image: np.ndarray) -> np.ndarray:
+    """The letterboxed input SCRFD builds in detect()."""
+    width, height = model.input_size
+    if image.shape[0] / image.shape[1] > height / width:
+        new_h, new_w = height, int(height * image.shape[1] / image.shape[0])
+    else:
+        new_w, new_h = width, int(width * image.shape[0] / image.shape[1])
+    canvas = np.zeros((height, width, 3), dtype=np.uint8)
+    canvas[:new_h, :new_w] = cv2.resize(image, (new_w, new_h))
+    return cv2.dnn.blobFromImage(
+        canvas, 1.0 / model.input_std, (width, height), (model.input_mean,) * 3, swapRB=True
+    )
+
+
+def recognizer_blobs(model, images):
+    """Aligned crops of every detected face, preprocessed like ArcFaceONNX.get_feat()."""
+    for image in images:
+        crops = [align_face(image, face["kps"]) for face in detect_faces(image)]
+        for crop in crops:
+            yield cv2.dnn.blobFromImage(
+                crop, 1.0 / model.input_std, model.input_size, (model.input_mean,) * 3, swapRB=True
+            )
+
+
+class BlobReader(CalibrationDataReader):
+    def __init__(self, input_name: str, blobs):
+        self.input_name = input_name
+        self.blobs = iter(blobs)
+
+    def get_next(self):
+        blob = next(self.blobs, None)
+        return None if blob is None else {self.input_name: blob}
+
+
+def quantize(model, blobs, mode: str):
+    source = model.model_file
+    target = quantized_path(source)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    with tempfile.TemporaryDirectory() as tmp:
+        prepared = os.path.join(tmp, "prepared.onnx")
+        quant_pre_process(source, prepared)
+        if mode == "static":
+            quantize_static(
+                prepared,
+                target,
+                BlobReader(model.input_name, blobs),
+                quant_format=QuantFormat.QDQ,
+                activation_type=QuantType.QUInt8,
+                weight_type=QuantType.QInt8,
+                per_channel=True,
+            )
+        else:
+            quantize_dynamic(prepared, target, weight_type=QuantType.QUInt8)
+    before, after = os.path.getsize(source), os.path.getsize(target)
+    print(f"{model.taskname}: {source} -> {target} ({before / 1e6:.1f} MB -> {after / 1e6:.1f} MB, {mode})")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Writes INT8 copies of the detector and recognizer (used with *_PRECISION=int8)."
+    )
+    parser.add_argument("--calibration", default="", help="Directory of face photos for static quantization")
+    parser.add_argument("--max-images", type=int, default=200)
+    parser.add_argument("--mode", choices=("static", "dynamic"), default=None,
+                        help="static (calibrated, default with --calibration) or dynamic (weights only)")
+    parser.add_argument("--stages", default="detection,recognition")
+    args = parser.parse_args()
+
+    mode = args.mode or ("static" if args.calibration else "dynamic")
+    images = load_images(args.calibration, args.max_images) if mode == "static" else []
+    if mode == "static" and not images:
+        print(f"No calibration images in '{args.calibration}'.")
+        return 1
+
+    stages = args.stages.split(",")
+    if "detection" in stages:
+        det = load_stage_model(DETECTION_MODEL_PACK, "detection")
+        det.prepare(ctx_id=0, input_size=DET_SIZE)
+        quantize(det, (detector_blob(det, image) for image in images), mode)
+    if "recognition" in stages:
+        rec = load_stage_model(RECOGNITION_MODEL_PACK, "recognition")
+        rec.prepare(ctx_id=0)
+        quantize(rec, recognizer_blobs(rec, images), mode)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
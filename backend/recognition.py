@@ -1,13 +1,94 @@
+import os
+import glob
+import time
+import threading
 import cv2
 import numpy as np
 import base64
-from insightface.app import FaceAnalysis
+from insightface import model_zoo
+from insightface.utils import ensure_available, face_align
 from typing import List, Tuple, Optional
+from face_index import FlatIndex, create_index
+from metrics import metrics
+from detection_planner import DET_SIZE, Region, detector_cost
+from onnx_config import DETECTION_PRECISION, RECOGNITION_PRECISION, create_session
+from embedding_codec import GALLERY_MAX_PROTOTYPES, person_of, row_key
+from shared_cache import (
+    FACE_SHARED_CACHE,
+    FACE_SHARED_PATH,
+    SharedFaceStore,
+    decode_name,
+    encode_name,
+)
 
-# Initialize FaceAnalysis
-# Use 'buffalo_l' for best accuracy or 'buffalo_s' for speed
-app = FaceAnalysis(name="buffalo_sc", providers=["CPUExecutionProvider"])
-app.prepare(ctx_id=0, det_size=(640, 640))
+# InsightFace model pack per stage: "buffalo_sc" (fast) or "buffalo_l" (accurate).
+# Embeddings from different recognition packs are not comparable.
+DETECTION_MODEL_PACK = os.getenv("DETECTION_MODEL_PACK", "buffalo_sc")
+RECOGNITION_MODEL_PACK = os.getenv("RECOGNITION_MODEL_PACK", "buffalo_sc")
+INSIGHTFACE_ROOT = os.getenv("INSIGHTFACE_ROOT", "~/.insightface")
+
+# Faces failing these checks are detected (and tracked) but never embedded
+FACE_MIN_SIZE = int(os.getenv("FACE_MIN_SIZE", "32"))  # px, shorter box side
+FACE_MIN_DET_SCORE = float(os.getenv("FACE_MIN_DET_SCORE", "0.6"))
+# Variance of the Laplacian of the aligned crop; lower is blurrier
+FACE_MIN_SHARPNESS = float(os.getenv("FACE_MIN_SHARPNESS", "20"))
+
+
+def load_stage_model(pack: str, task: str):
+    """
+    Loads the `task` ("detection" or "recognition") model of an InsightFace
+    model pack, downloading the pack on first use.
+    """
+    model_dir = ensure_available("models", pack, root=INSIGHTFACE_ROOT)
+    for model_file in sorted(glob.glob(os.path.join(model_dir, "*.onnx"))):
+        model = model_zoo.get_model(model_file, providers=["CPUExecutionProvider"])
+        if model is not None and model.taskname == task:
+            return model
+    raise RuntimeError(f"No {task} model in InsightFace pack '{pack}'")
+
+
+def configure_session(model, precision: str = "fp32"):
+    """
+    Recreates a model's ONNX session with the onnx_config settings (threads,
+    graph optimization, precision); InsightFace builds its own with defaults.
+    """
+    model.session = create_session(model.model_file, precision)
+    return model
+
+
+# Detection and recognition are separate stages, each from its own pack.
+# They are loaded on first use (or by load_face_models at startup, off the
+# event loop), so importing this module stays cheap.
+_face_models = None
+_face_models_lock = threading.Lock()
+
+
+def load_face_models():
+    """Returns (det_model, rec_model), loading and preparing them once."""
+    global _face_models
+    with _face_models_lock:
+        if _face_models is None:
+            start = time.perf_counter()
+            det = load_stage_model(DETECTION_MODEL_PACK, "detection")
+            det.prepare(ctx_id=0, input_size=DET_SIZE)
+            configure_session(det, DETECTION_PRECISION)
+            rec = load_stage_model(RECOGNITION_MODEL_PACK, "recognition")
+            rec.prepare(ctx_id=0)
+            configure_session(rec, RECOGNITION_PRECISION)
+            _face_models = (det, rec)
+            elapsed = (time.perf_counter() - start) * 1000
+            metrics.record("startup.face_models", elapsed)
+            print(f"Face models loaded in {elapsed:.0f}ms.")
+        return _face_models
+
+
+def decode_image_bytes(buffer, offset: int = 0) -> np.ndarray:
+    """
+    Decodes encoded image bytes (JPEG/WebP/PNG) into a numpy array (OpenCV format).
+    The encoded data is read in place from `buffer` starting at `offset`.
+    """
+    nparr = np.frombuffer(buffer, np.uint8, offset=offset)
+    return cv2.imdecode(nparr, cv2.IMREAD_COLOR)
 
 
 def decode_base64_image(base64_string: str) -> np.ndarray:
@@ -16,29 +97,170 @@ def decode_base64_image(base64_string: str) -> np.ndarray:
         base64_string = base64_string.split("base64,")[1]
 
     img_data = base64.b64decode(base64_string)
-    nparr = np.frombuffer(img_data, np.uint8)
-    img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-    return img
+    return decode_image_bytes(img_data)
 
 
-def get_face_embeddings(image: np.ndarray) -> List[dict]:
+def detect_faces(
+    image: np.ndarray,
+    input_size: Optional[Tuple[int, int]] = None,
+    offset: Tuple[int, int] = (0, 0),
+) -> List[dict]:
     """
-    Extracts face embeddings and bounding boxes from an image.
-    Returns a list of dicts: {"embedding": [], "bbox": [top, right, bottom, left]}
+    Runs only the detection model, at `input_size` (width, height; default
+    DET_SIZE). Coordinates are shifted by `offset` (x, y) when `image` is a
+    crop of a larger frame.
+    Returns a list of dicts: {"bbox": [top, right, bottom, left], "kps": landmarks, "det_score": float}
     """
-    faces = app.get(image)
+    input_size = input_size or DET_SIZE
+    start = time.perf_counter()
+    det_model, _ = load_face_models()
+    bboxes, kpss = det_model.detect(
+        image, input_size=input_size, max_num=0, metric="default"
+    )
+    detector_cost.record(input_size[0] * input_size[1], time.perf_counter() - start)
+    ox, oy = offset
     results = []
-    for face in faces:
+    for i in range(bboxes.shape[0]):
         # InsightFace bbox is [x1, y1, x2, y2]
-        bbox = face.bbox.astype(int).tolist()
+        bbox = bboxes[i, 0:4].astype(int).tolist()
         # Convert to [top, right, bottom, left] for compatibility with spec
         # x1, y1, x2, y2 -> y1, x2, y2, x1
-        standard_bbox = [bbox[1], bbox[2], bbox[3], bbox[0]]
+        standard_bbox = [bbox[1] + oy, bbox[2] + ox, bbox[3] + oy, bbox[0] + ox]
+        results.append(
+            {
+                "bbox": standard_bbox,
+                "kps": kpss[i] + (ox, oy) if kpss is not None else None,
+                "det_score": float(bboxes[i, 4]),
+            }
+        )
+    return results
+
 
-        results.append({"embedding": face.embedding.tolist(), "bbox": standard_bbox})
+def detect_faces_in_regions(image: np.ndarray, regions: List[Region]) -> List[dict]:
+    """Runs detection on crops of `image`, each at its own input size (see DetectionPlanner)."""
+    results = []
+    for x1, y1, x2, y2, input_size in regions:
+        results.extend(detect_faces(image[y1:y2, x1:x2], input_size, offset=(x1, y1)))
     return results
 
 
+def embed_faces(crops: List[np.ndarray]) -> np.ndarray:
+    """Runs the recognition model once on a batch of aligned face crops."""
+    if not crops:
+        return np.zeros((0, 512), dtype=np.float32)
+    _, rec_model = load_face_models()
+    return rec_model.get_feat(crops)
+
+
+def align_face(image: np.ndarray, kps: np.ndarray) -> np.ndarray:
+    """Returns the aligned crop the recognition model expects for one face."""
+    _, rec_model = load_face_models()
+    return face_align.norm_crop(image, landmark=kps, image_size=rec_model.input_size[0])
+
+
+def face_filter_reason(face: dict) -> Optional[str]:
+    """Why a detected face is not worth embedding ("size", "score"), or None."""
+    top, right, bottom, left = face["bbox"]
+    if min(bottom - top, right - left) < FACE_MIN_SIZE:
+        return "size"
+    if face["det_score"] < FACE_MIN_DET_SCORE:
+        return "score"
+    return None
+
+
+def sharpness(crop: np.ndarray) -> float:
+    """Variance of the Laplacian of a face crop (focus/motion-blur measure)."""
+    return float(cv2.Laplacian(cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY), cv2.CV_64F).var())
+
+
+def detect_faces_batch(images: List[np.ndarray]) -> List[List[dict]]:
+    """Runs detection on several images (see detect_faces)."""
+    with metrics.timer("vision.detect"):
+        return [detect_faces(image) for image in images]
+
+
+def detect_regions_batch(
+    jobs: List[Tuple[np.ndarray, Optional[List[Region]]]]
+) -> List[List[dict]]:
+    """
+    Runs detection on several images, each either whole (regions None) or
+    only in the given regions (see detect_faces_in_regions).
+    """
+    with metrics.timer("vision.detect"):
+        return [
+            detect_faces(image) if regions is None else detect_faces_in_regions(image, regions)
+            for image, regions in jobs
+        ]
+
+
+def embed_faces_batch(
+    jobs: List[Tuple[np.ndarray, List[np.ndarray]]]
+) -> List[List[Optional[np.ndarray]]]:
+    """
+    Embeds selected faces of several images with a single recognition call.
+    Each job is (image, [landmarks of the faces to embed]); returns one list
+    of 512-d embeddings per job, with None for faces whose aligned crop is
+    too blurry to embed.
+    """
+    with metrics.timer("vision.align"):
+        crops = [align_face(image, kps) for image, kpss in jobs for kps in kpss]
+    sharp = [sharpness(crop) >= FACE_MIN_SHARPNESS for crop in crops]
+    metrics.incr("vision.filtered.blur", len(sharp) - sum(sharp))
+    with metrics.timer("vision.embed"):
+        embeddings = iter(embed_faces([crop for crop, ok in zip(crops, sharp) if ok]))
+    flat = [next(embeddings) if ok else None for ok in sharp]
+
+    results = []
+    i = 0
+    for _, kpss in jobs:
+        results.append(flat[i : i + len(kpss)])
+        i += len(kpss)
+    return results
+
+
+def get_face_embeddings_batch(
+    images: List[np.ndarray], embed: bool = True
+) -> List[List[dict]]:
+    """
+    Extracts bounding boxes and, with `embed`, face embeddings from several
+    images. Detection runs per image; every face across all images that
+    passes the size/score/blur filters is then embedded with a single
+    recognition call. Filtered faces are returned without "embedding".
+    """
+    detections = detect_faces_batch(images)
+    faces = [
+        [{"bbox": face["bbox"], "det_score": face["det_score"]} for face in image_faces]
+        for image_faces in detections
+    ]
+    if not embed:
+        return faces
+
+    selected = [
+        [i for i, face in enumerate(image_faces) if face_filter_reason(face) is None]
+        for image_faces in detections
+    ]
+    embeddings = embed_faces_batch(
+        [
+            (image, [image_faces[i]["kps"] for i in indexes])
+            for image, image_faces, indexes in zip(images, detections, selected)
+        ]
+    )
+    for image_faces, indexes, vectors in zip(faces, selected, embeddings):
+        for i, vector in zip(indexes, vectors):
+            if vector is not None:
+                image_faces[i]["embedding"] = vector.tolist()
+    return faces
+
+
+def get_face_embeddings(image: np.ndarray, embed: bool = True) -> List[dict]:
+    """
+    Extracts face embeddings and bounding boxes from an image.
+    Returns a list of dicts: {"embedding": [], "bbox": [top, right, bottom, left], "det_score": float}
+    With embed=False only detection runs and "embedding" is omitted.
+    """
+    return get_face_embeddings_batch([image], embed=embed)[0]
+
+
 def cosine_similarity(emb1: np.ndarray, emb2: np.ndarray) -> float:
     """Computes cosine similarity between two embeddings."""
     dot_product = np.dot(emb1, emb2)
@@ -48,55 +270,286 @@ def cosine_similarity(emb1: np.ndarray, emb2: np.ndarray) -> float:
 
 
 class EmbeddingCache:
-    """In-memory cache for face embeddings to avoid frequent DB queries."""
+    """
+    In-memory cache for face embeddings to avoid frequent DB queries.
+
+    Embeddings are kept as one contiguous, L2-normalized float32 matrix with
+    parallel id/name arrays, so a batch of faces is scored with a single
+    matrix product. Rows can be added, removed and renamed in place.
+    """
+
+    def __init__(
+        self,
+        dim: int = 512,
+        initial_capacity: int = 64,
+        index: Optional[FlatIndex] = None,
+    ):
+        self.dim = dim
+        self.index = index if index is not None else create_index()
+        self.size = 0
+        self.matrix = np.zeros((initial_capacity, dim), dtype=np.float32)
+        self.ids = np.empty(initial_capacity, dtype=object)
+        self.names = np.empty(initial_capacity, dtype=object)
+        self.row_of = {}  # person_id -> row index
 
-    def __init__(self):
-        self.cache = []  # List of (person_id, name, embedding_np)
-        self.last_unknown_embedding = None  # (embedding_np, timestamp)
-        self.last_unknown_timestamp = 0
-        self.last_seen_known_id = None
-        self.last_seen_known_timestamp = 0
+    def __len__(self):
+        return self.size
+
+    def get_name(self, person_id: str) -> Optional[str]:
+        row = self.row_of.get(str(person_id))
+        return self.names[row] if row is not None else None
+
+    def similarity(self, key: str, embedding) -> Optional[float]:
+        """Cosine similarity of `embedding` to the cached row `key` (None if not cached)."""
+        row = self.row_of.get(str(key))
+        if row is None:
+            return None
+        return float(self.matrix[row] @ self._normalize(embedding)[0])
+
+    @staticmethod
+    def _normalize(embeddings) -> np.ndarray:
+        """Returns L2-normalized float32 rows (accepts a single vector or a batch)."""
+        arr = np.asarray(embeddings, dtype=np.float32)
+        if arr.ndim == 1:
+            arr = arr[None, :]
+        norms = np.linalg.norm(arr, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return arr / norms
+
+    def _reserve(self, capacity: int):
+        """Grows the backing arrays (doubling) so at least `capacity` rows fit."""
+        if capacity <= len(self.matrix):
+            return
+        new_capacity = max(capacity, 2 * len(self.matrix))
+        matrix = np.zeros((new_capacity, self.dim), dtype=np.float32)
+        matrix[: self.size] = self.matrix[: self.size]
+        ids = np.empty(new_capacity, dtype=object)
+        ids[: self.size] = self.ids[: self.size]
+        names = np.empty(new_capacity, dtype=object)
+        names[: self.size] = self.names[: self.size]
+        self.matrix, self.ids, self.names = matrix, ids, names
 
     def update(self, people_list):
-        self.cache = [
-            (str(p.id), p.name, np.array(p.face_embedding)) for p in people_list
+        """
+        Rebuilds the whole cache from a list of Person models.
+        Only used at startup or on an explicit resync; single changes go
+        through upsert/rename/delete.
+        """
+        rows = [
+            (row_key(p.id, k), p.name, embedding)
+            for p in people_list
+            for k, embedding in enumerate([p.face_embedding, *getattr(p, "gallery", [])])
         ]
+        self.load(
+            [key for key, _, _ in rows],
+            [name for _, name, _ in rows],
+            [embedding for _, _, embedding in rows] or np.zeros((0, self.dim)),
+        )
+
+    def load(self, ids: List[str], names: List[str], embeddings):
+        """
+        Rebuilds the whole cache from parallel id/name lists and an (n, dim)
+        embedding matrix, e.g. as decoded by models.load_face_matrix.
+        """
+        count = len(ids)
+        self.size = 0
+        self.row_of = {}
+        self._reserve(count)
+        if count:
+            self.matrix[:count] = self._normalize(embeddings)
+        self.ids[:count] = ids
+        self.names[:count] = names
+        self.row_of = {person_id: row for row, person_id in enumerate(ids)}
+        self.size = count
+        self.index.build(self.matrix[: self.size], list(self.ids[: self.size]))
+
+    def attach(self, ids: List[str], names: List[str], matrix: np.ndarray):
+        """
+        Like load, but uses an already normalized (n, dim) matrix as backing
+        storage without copying it, e.g. a memory-mapped snapshot (see
+        face_snapshot). The matrix is only copied once the cache grows.
+        """
+        count = len(ids)
+        self.matrix = matrix
+        self.ids = np.empty(count, dtype=object)
+        self.names = np.empty(count, dtype=object)
+        self.ids[:] = ids
+        self.names[:] = names
+        self.row_of = {person_id: row for row, person_id in enumerate(ids)}
+        self.size = count
+        self.index.build(self.matrix[: self.size], list(self.ids[: self.size]))
+
+    def save_index(self):
+        """Persists the ANN index so a restart doesn't retrain it."""
+        self.index.save(list(self.ids[: self.size]))
+
+    def upsert(self, person_id: str, name: str, embedding):
+        """Adds a row, or replaces the embedding and name if the person is cached."""
+        person_id = str(person_id)
+        row = self.row_of.get(person_id)
+        if row is None:
+            self._reserve(self.size + 1)
+            row = self.size
+            self.size += 1
+            self.ids[row] = person_id
+            self.row_of[person_id] = row
+        self.matrix[row] = self._normalize(embedding)[0]
+        self.names[row] = name
+        self.index.add(row, self.matrix[row])
+
+    def delete(self, person_id: str) -> bool:
+        """Removes a row by moving the last row into its slot."""
+        row = self.row_of.pop(str(person_id), None)
+        if row is None:
+            return False
+        last = self.size - 1
+        if row != last:
+            self.matrix[row] = self.matrix[last]
+            self.ids[row] = self.ids[last]
+            self.names[row] = self.names[last]
+            self.row_of[self.ids[row]] = row
+            self.index.move(last, row)
+        self.ids[last] = None
+        self.names[last] = None
+        self.size = last
+        self.index.truncate(last)
+        return True
+
+    def set_person(self, person_id: str, name: str, embeddings):
+        """
+        Replaces all rows of a person: the registration embedding followed
+        by their gallery prototypes (see row_key).
+        """
+        for k, embedding in enumerate(embeddings):
+            self.upsert(row_key(person_id, k), name, embedding)
+        k = len(embeddings)
+        while self.delete(row_key(person_id, k)):
+            k += 1
 
-    def set_last_unknown(self, embedding: np.ndarray):
-        """Updates the most recently seen unknown face."""
-        self.last_unknown_embedding = embedding
-        import time
+    def delete_person(self, person_id: str) -> bool:
+        """Removes every row of a person."""
+        k = 0
+        while self.delete(row_key(person_id, k)):
+            k += 1
+        return k > 0
 
-        self.last_unknown_timestamp = time.time()
+    def rename(self, person_id: str, name: str) -> bool:
+        """Renames a cached person (all rows) without touching the embedding matrix."""
+        k = 0
+        while self._rename_row(row_key(person_id, k), name):
+            k += 1
+        return k > 0
 
-    def set_last_seen_known(self, person_id: str):
-        """Updates the most recently seen known person."""
-        self.last_seen_known_id = person_id
-        import time
+    def _rename_row(self, key: str, name: str) -> bool:
+        row = self.row_of.get(key)
+        if row is None:
+            return False
+        self.names[row] = name
+        return True
 
-        self.last_seen_known_timestamp = time.time()
+    def search(
+        self, target_embeddings, top_k: int = 1
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Scores a batch of embeddings against the cache with one matrix product.
+        Returns (rows, sims), each of shape (n_targets, k) sorted by similarity,
+        where k = min(top_k, cache size).
+        A person with several rows (gallery prototypes) is listed once, by
+        their best row.
+        When the ANN index is active, only its candidate rows are scored and
+        missing slots are padded with row -1 / similarity -inf.
+        """
+        if top_k == 1:
+            # The best row is the best person
+            return self._search_rows(target_embeddings, 1)
+        rows, sims = self._search_rows(target_embeddings, top_k * GALLERY_MAX_PROTOTYPES)
+        k = min(top_k, rows.shape[1])
+        out_rows = np.full((len(rows), k), -1, dtype=np.int64)
+        out_sims = np.full((len(rows), k), -np.inf, dtype=np.float32)
+        for i in range(len(rows)):
+            seen = set()
+            for row, sim in zip(rows[i], sims[i]):
+                if row < 0 or len(seen) == k:
+                    break
+                person_id = person_of(self.ids[row])
+                if person_id not in seen:
+                    out_rows[i, len(seen)], out_sims[i, len(seen)] = row, sim
+                    seen.add(person_id)
+        return out_rows, out_sims
+
+    def _search_rows(
+        self, target_embeddings, top_k: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """search() without merging the rows of a person."""
+        targets = self._normalize(target_embeddings)
+        k = min(top_k, self.size)
+        if k == 0:
+            empty = np.empty((len(targets), 0))
+            return empty.astype(np.int64), empty.astype(np.float32)
+
+        if self.index.needs_build(self.size):
+            self.index.build(self.matrix[: self.size], list(self.ids[: self.size]))
+        if self.index.trained:
+            return self._search_candidates(targets, k)
 
-    def get_last_unknown(self, ttl: int = 5) -> Optional[np.ndarray]:
-        """Returns the last unknown embedding if seen within TTL seconds."""
-        import time
+        sims = targets @ self.matrix[: self.size].T
+        if k < self.size:
+            rows = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+        else:
+            rows = np.broadcast_to(np.arange(self.size), sims.shape).copy()
+        top_sims = np.take_along_axis(sims, rows, axis=1)
+        order = np.argsort(-top_sims, axis=1)
+        return (
+            np.take_along_axis(rows, order, axis=1),
+            np.take_along_axis(top_sims, order, axis=1),
+        )
 
-        if (
-            self.last_unknown_embedding is not None
-            and (time.time() - self.last_unknown_timestamp) < ttl
-        ):
-            return self.last_unknown_embedding
-        return None
+    def _search_candidates(
+        self, targets: np.ndarray, k: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Exact re-ranking of the rows proposed by the ANN index."""
+        rows = np.full((len(targets), k), -1, dtype=np.int64)
+        sims = np.full((len(targets), k), -np.inf, dtype=np.float32)
+        for i, target in enumerate(targets):
+            candidates = self.index.candidates(target, self.size)
+            if len(candidates) == 0:
+                continue
+            cand_sims = self.matrix[candidates] @ target
+            top = np.argsort(-cand_sims)[:k]
+            rows[i, : len(top)] = candidates[top]
+            sims[i, : len(top)] = cand_sims[top]
+        return rows, sims
+
+    def match_batch(
+        self, target_embeddings, threshold: float = 0.55
+    ) -> List[Optional[Tuple[str, str, float]]]:
+        """
+        Matches a batch of target embeddings against the cache.
+        Returns one (person_id, name, similarity) or None per target.
+        """
+        targets = self._normalize(target_embeddings)
+        rows, sims = self.search(targets, top_k=1)
 
-    def get_last_seen_known(self, ttl: int = 5) -> Optional[str]:
-        """Returns the last known person_id if seen within TTL seconds."""
-        import time
+        results = []
+        for i in range(len(targets)):
+            if rows.shape[1] == 0 or rows[i, 0] < 0:
+                # Cache is empty (or no candidates), so the face is unknown
+                results.append(None)
+                continue
 
-        if (
-            self.last_seen_known_id is not None
-            and (time.time() - self.last_seen_known_timestamp) < ttl
-        ):
-            return self.last_seen_known_id
-        return None
+            row, sim = int(rows[i, 0]), float(sims[i, 0])
+            person_id, name = person_of(self.ids[row]), self.names[row]
+            if sim >= threshold:
+                print(f"DEBUG: MATCH FOUND: {name} with sim={sim:.3f}")
+                results.append((person_id, name, sim))
+                continue
+
+            if sim > 0.3:
+                print(f"DEBUG: No match found. Best sim was {sim:.3f} for {name}")
+
+            # No match found -> It's unknown
+            results.append(None)
+        return results
 
     def match(
         self, target_embedding: List[float], threshold: float = 0.55
@@ -105,38 +558,209 @@ class EmbeddingCache:
         Matches a target embedding against the cache.
         Returns (person_id, name, similarity) if match found.
         """
-        target_emb_np = np.array(target_embedding)
+        return self.match_batch([target_embedding], threshold=threshold)[0]
+
+
+class SharedEmbeddingCache(EmbeddingCache):
+    """
+    EmbeddingCache backed by a SharedFaceStore, so every worker process
+    scores against the same memory-mapped matrix instead of its own copy.
+
+    Each process keeps only its id/name lists and row map, brought up to
+    date row by row when the store's generation changes (checked before
+    every lookup). Writes from
+    any process go straight to the store under its file lock, so a face
+    registered in one worker is recognized by all of them on their next frame.
+    """
+
+    def __init__(self, store: SharedFaceStore, index: Optional[FlatIndex] = None):
+        super().__init__(dim=store.dim, initial_capacity=0, index=index)
+        self.store = store
+        self.generation = -1
+        self.refresh()
+
+    def refresh(self, force: bool = False, locked: bool = False) -> bool:
+        """
+        Catches up with writes from other processes. Only the rows whose
+        version is newer than the last generation read are re-read and
+        re-indexed; the whole view is rebuilt on the first read, with
+        `force`, or when most rows changed (a full load).
+        Pass `locked=True` when the caller already holds the store lock.
+        """
+        store = self.store
+        generation = store.generation
+        if generation == self.generation and not force:
+            return False
+        store.sync()
+        while True:
+            generation = store.generation
+            if generation % 2:
+                # A write is in progress (or its writer died): wait it out
+                if locked:
+                    store.repair()
+                else:
+                    with store.lock():
+                        store.repair()
+                continue
+            size = store.size
+            changed = np.flatnonzero(store.versions[:size] > self.generation)
+            full = force or self.generation < 0 or 2 * len(changed) > size
+            if full:
+                changed = np.arange(size)
+            ids = [store.ids[row].decode() for row in changed]
+            names = [decode_name(store.names[row]) for row in changed]
+            if store.generation == generation:
+                break
+        self.matrix = store.matrix
+        self.generation = generation
+        if full:
+            self.ids, self.names, self.size = ids, names, size
+            self.row_of = {person_id: row for row, person_id in enumerate(ids)}
+            self.index.build(self.matrix[:size], ids)
+            return True
+
+        # Rows cut off the end (deleted, or moved into a freed row)
+        for row in range(size, self.size):
+            if self.row_of.get(self.ids[row]) == row:
+                del self.row_of[self.ids[row]]
+        del self.ids[size:], self.names[size:]
+        self.ids.extend([""] * (size - len(self.ids)))
+        self.names.extend([""] * (size - len(self.names)))
+        for row, person_id, name in zip(changed.tolist(), ids, names):
+            if self.row_of.get(self.ids[row]) == row:
+                del self.row_of[self.ids[row]]
+            self.ids[row], self.names[row] = person_id, name
+            self.row_of[person_id] = row
+            self.index.add(row, self.matrix[row])
+        self.size = size
+        self.index.truncate(size)
+        return True
+
+    def _written(self):
+        """Marks the local view current after this process's own write."""
+        self.matrix = self.store.matrix
+        self.generation = self.store.generation
+
+    def __len__(self):
+        self.refresh()
+        return self.size
+
+    def get_name(self, person_id: str) -> Optional[str]:
+        self.refresh()
+        return super().get_name(person_id)
+
+    def similarity(self, key: str, embedding) -> Optional[float]:
+        self.refresh()
+        return super().similarity(key, embedding)
+
+    def load(self, ids: List[str], names: List[str], embeddings):
+        count = len(ids)
+        store = self.store
+        with store.lock():
+            store.reserve(count)
+            with store.writing():
+                if count:
+                    store.matrix[:count] = self._normalize(embeddings)
+                store.ids[:count] = [person_id.encode() for person_id in ids]
+                store.names[:count] = [encode_name(name) for name in names]
+                store.touch(slice(0, count))
+                store.set_size(count)
+            self._written()
+        self.ids, self.names, self.size = list(ids), list(names), count
+        self.row_of = {person_id: row for row, person_id in enumerate(ids)}
+        self.index.build(self.matrix[:count], self.ids)
+
+    # The store is the only copy: a snapshot is loaded into it
+    attach = load
 
-        if not self.cache:
-            # If cache is empty, this is technically an unknown face (or first face)
-            # We don't return here immediately, we let it fall through to 'return None'
-            pass
+    def upsert(self, person_id: str, name: str, embedding):
+        person_id = str(person_id)
+        store = self.store
+        with store.lock():
+            self.refresh(locked=True)
+            row = self.row_of.get(person_id)
+            vector = self._normalize(embedding)[0]
+            if row is None:
+                row = self.size
+                store.reserve(row + 1)
+            elif self.names[row] == name and np.array_equal(store.matrix[row], vector):
+                # Re-applied change (catch-up overlap): don't wake the readers
+                return
+            with store.writing():
+                store.matrix[row] = vector
+                store.names[row] = encode_name(name)
+                store.touch(row)
+                if row == self.size:
+                    store.ids[row] = person_id.encode()
+                    store.set_size(row + 1)
+            self._written()
+        if row == self.size:
+            self.ids.append(person_id)
+            self.names.append(name)
+            self.row_of[person_id] = row
+            self.size += 1
+        else:
+            self.names[row] = name
+        self.index.add(row, self.matrix[row])
 
-        best_match = None
-        max_sim = -1
+    def delete(self, person_id: str) -> bool:
+        store = self.store
+        with store.lock():
+            self.refresh(locked=True)
+            row = self.row_of.get(str(person_id))
+            if row is None:
+                return False
+            last = self.size - 1
+            with store.writing():
+                if row != last:
+                    store.matrix[row] = store.matrix[last]
+                    store.ids[row] = store.ids[last]
+                    store.names[row] = store.names[last]
+                    store.touch(row)
+                store.set_size(last)
+            self._written()
+        del self.row_of[str(person_id)]
+        if row != last:
+            self.ids[row], self.names[row] = self.ids[last], self.names[last]
+            self.row_of[self.ids[row]] = row
+            self.index.move(last, row)
+        self.ids.pop()
+        self.names.pop()
+        self.size = last
+        self.index.truncate(last)
+        return True
 
-        for person_id, name, cached_emb in self.cache:
-            sim = cosine_similarity(target_emb_np, cached_emb)
-            # print(f"DEBUG: Comparing with {name} ({person_id}): sim={sim:.3f}")
-            if sim > max_sim:
-                max_sim = sim
-                best_match = (person_id, name)
+    def _rename_row(self, key: str, name: str) -> bool:
+        store = self.store
+        with store.lock():
+            self.refresh(locked=True)
+            row = self.row_of.get(key)
+            if row is None:
+                return False
+            with store.writing():
+                store.names[row] = encode_name(name)
+                store.touch(row)
+            self._written()
+        self.names[row] = name
+        return True
 
-        if max_sim >= threshold:
-            # We found a match, update simple tracking
-            self.set_last_seen_known(best_match[0])
-            print(f"DEBUG: MATCH FOUND: {best_match[1]} with sim={max_sim:.3f}")
-            return (*best_match, max_sim)
+    def search(self, target_embeddings, top_k: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+        # Retried if another process wrote to the store while scoring
+        for _ in range(3):
+            self.refresh()
+            generation = self.generation
+            result = super().search(target_embeddings, top_k)
+            if self.store.generation == generation:
+                break
+        return result
 
-        if max_sim > 0.3:
-            print(
-                f"DEBUG: No match found. Best sim was {max_sim:.3f} for {best_match[1] if best_match else 'None'}"
-            )
 
-        # No match found -> It's unknown
-        self.set_last_unknown(target_emb_np)
-        return None
+def create_face_cache() -> EmbeddingCache:
+    """The per-process cache, or the cross-process one with FACE_SHARED_CACHE=1."""
+    if FACE_SHARED_CACHE:
+        return SharedEmbeddingCache(SharedFaceStore(FACE_SHARED_PATH))
+    return EmbeddingCache()
 
 
 # Singleton instance
-face_cache = EmbeddingCache()
+face_cache = create_face_cache()
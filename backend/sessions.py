@@ -0,0 +1,143 @@
+import os
+import time
+import uuid
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Faces remembered per session (a few seconds of frames)
+SESSION_RECENT_FACES = int(os.getenv("SESSION_RECENT_FACES", "64"))
+
+
+class SeenFace:
+    """One face in one processed frame of a session."""
+
+    def __init__(self, seen_at: float, bbox: List[int], track_id: int, match, embedding):
+        self.seen_at = seen_at
+        self.bbox = bbox  # [top, right, bottom, left]
+        self.track_id = track_id
+        self.match: Optional[Tuple[str, str, float]] = match  # (person_id, name, sim)
+        self.embedding = embedding  # None for known faces
+
+    @property
+    def area(self) -> int:
+        top, right, bottom, left = self.bbox
+        return (bottom - top) * (right - left)
+
+
+class Session:
+    """
+    Identity context of one wearer: binds a /ws/recognition socket (what the
+    camera sees) to a /ws/listen socket (what is being said), so a name heard
+    on one device is only ever attached to faces seen by the same device.
+
+    Faces are kept in a bounded ring buffer with timestamps and boxes. Each
+    session is only touched from its own sockets' handlers on the event
+    loop, so sessions need no locking and share no state.
+    """
+
+    def __init__(self, session_id: str, max_faces: int = SESSION_RECENT_FACES):
+        self.session_id = session_id
+        self.recent = deque(maxlen=max_faces)
+        self.sockets: Dict[str, int] = {}  # open sockets by kind ("recognition", "listen")
+        # Identities assigned by voice to tracks the matcher saw as unknown
+        self.assigned: Dict[int, Tuple[str, str, float]] = {}
+
+    def record(self, faces: List[dict]):
+        """Remembers the faces of a processed frame (with their "track")."""
+        seen_at = time.time()
+        for face in faces:
+            track = face["track"]
+            self.recent.append(
+                SeenFace(
+                    seen_at,
+                    face["bbox"],
+                    track.track_id,
+                    track.match,
+                    None if track.match else track.embedding,
+                )
+            )
+
+    def resolve(self, track):
+        """Applies an identity assigned by voice to a still-unmatched track."""
+        if track.match is None and track.track_id in self.assigned:
+            track.match = self.assigned[track.track_id]
+
+    def _latest(self, ttl: float, known: bool) -> Optional[SeenFace]:
+        """
+        The most recent known (or unknown, embedded) face seen within `ttl`
+        seconds; among faces of the same frame, the largest (closest) one.
+        """
+        cutoff = time.time() - ttl
+        best = None
+        for face in reversed(self.recent):
+            if face.seen_at < cutoff or (best and face.seen_at < best.seen_at):
+                break
+            if known != (face.match is not None):
+                continue
+            if not known and (face.embedding is None or face.track_id in self.assigned):
+                continue
+            if best is None or face.area > best.area:
+                best = face
+        return best
+
+    def last_known(self, ttl: float = 5) -> Optional[SeenFace]:
+        return self._latest(ttl, known=True)
+
+    def last_unknown(self, ttl: float = 5) -> Optional[SeenFace]:
+        return self._latest(ttl, known=False)
+
+    def assign(self, face: SeenFace, person_id: str, name: str):
+        """Marks an unknown face as registered, so it isn't registered twice."""
+        self.assigned[face.track_id] = (person_id, name, 1.0)
+        if len(self.assigned) > self.recent.maxlen:
+            self.assigned.pop(next(iter(self.assigned)))
+
+    def snapshot(self) -> dict:
+        return {
+            "sockets": dict(self.sockets),
+            "recent_faces": len(self.recent),
+            "assigned": len(self.assigned),
+        }
+
+
+class SessionRegistry:
+    """
+    Open sessions by id. Both sockets of a device join the same session by
+    passing the same `session` (or `client_id`) query parameter; a socket
+    without one gets a session of its own. A session ends when its last
+    socket leaves.
+
+    Sessions live in the process holding the sockets: with several worker
+    processes, both sockets of a device must be routed to the same one
+    (see the README).
+    """
+
+    def __init__(self):
+        self.sessions: Dict[str, Session] = {}
+
+    def join(self, session_id: Optional[str], socket: str) -> Session:
+        session_id = session_id or f"anonymous-{uuid.uuid4().hex}"
+        session = self.sessions.get(session_id)
+        if session is None:
+            session = self.sessions[session_id] = Session(session_id)
+        session.sockets[socket] = session.sockets.get(socket, 0) + 1
+        return session
+
+    def leave(self, session: Session, socket: str):
+        remaining = session.sockets.get(socket, 0) - 1
+        if remaining > 0:
+            session.sockets[socket] = remaining
+        else:
+            session.sockets.pop(socket, None)
+        if not session.sockets and self.sessions.get(session.session_id) is session:
+            del self.sessions[session.session_id]
+
+    def snapshot(self) -> dict:
+        return {session_id: session.snapshot() for session_id, session in self.sessions.items()}
+
+
+# Singleton instance
+sessions = SessionRegistry()
@@ -0,0 +1,209 @@
+import os
+import mmap
+import tempfile
+import numpy as np
+from contextlib import contextmanager
+from dotenv import load_dotenv
+
+try:
+    import fcntl
+except ImportError:  # Windows: no shared cache, the per-process one still works
+    fcntl = None
+
+load_dotenv()
+
+# Share one face cache between uvicorn worker processes (uvicorn --workers N)
+FACE_SHARED_CACHE = os.getenv("FACE_SHARED_CACHE", "0") == "1"
+# Memory-mapped file holding the shared cache (tmpfs keeps it in RAM)
+FACE_SHARED_PATH = os.getenv(
+    "FACE_SHARED_PATH",
+    os.path.join("/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir(), "memorylens_faces"),
+)
+
+MAGIC = 0x4D4C4633  # "MLF3"
+HEADER_BYTES = 64
+ID_BYTES = 32  # face cache key (ObjectId hex, ":<k>" for gallery rows)
+NAME_BYTES = 128  # UTF-8, truncated
+VERSION_BYTES = 8  # generation of the write that last changed the row
+# Header slots (uint64)
+_MAGIC, _DIM, _GENERATION, _SIZE, _CAPACITY = range(5)
+
+
+class SharedFaceStore:
+    """
+    Face cache rows (ids, names and the normalized embedding matrix) in one
+    memory-mapped file that every worker process maps.
+
+    Layout: a 64-byte header (magic, dim, generation, size, capacity), then
+    `capacity` fixed-width ids, names, row versions and float32 embedding
+    rows. A row's version is the generation of the write that last changed
+    it (see `touch`), so a reader can apply only the rows changed since the
+    generation it last read.
+
+    Writers hold an exclusive lock on `<path>.lock` and bump the generation
+    before and after each change (seqlock): an odd generation means a write
+    is in progress, and a reader whose generation changed while it was
+    reading retries. Readers never lock. When the store grows, a larger
+    file replaces `path` and the old file's generation is bumped, so readers
+    notice and remap.
+
+    The process holding `<path>.leader` is the leader: it loads the cache
+    from the database and applies changes made outside the app (see face_sync).
+    """
+
+    def __init__(self, path: str = FACE_SHARED_PATH, dim: int = 512, initial_capacity: int = 1024):
+        if fcntl is None:
+            raise RuntimeError("FACE_SHARED_CACHE=1 needs fcntl file locks (Linux or macOS)")
+        self.path = path
+        self.dim = dim
+        self._lock_fd = os.open(f"{path}.lock", os.O_RDWR | os.O_CREAT, 0o600)
+        self._leader_fd = None
+        self._inode = None
+        with self.lock():
+            if not self._map() or self.header[_DIM] != dim:
+                self._create(path, initial_capacity)
+                self._map()
+
+    @property
+    def generation(self) -> int:
+        return int(self.header[_GENERATION])
+
+    @property
+    def size(self) -> int:
+        return int(self.header[_SIZE])
+
+    @property
+    def capacity(self) -> int:
+        return int(self.header[_CAPACITY])
+
+    def _offsets(self, capacity: int):
+        names = HEADER_BYTES + capacity * ID_BYTES
+        versions = names + capacity * NAME_BYTES
+        matrix = versions + capacity * VERSION_BYTES
+        matrix += -matrix % 64  # Row data aligned for SIMD loads
+        return names, versions, matrix, matrix + capacity * self.dim * 4
+
+    def _create(self, path: str, capacity: int, generation: int = 0):
+        """Writes an empty store of `capacity` rows to `path` (atomically)."""
+        tmp = f"{path}.tmp{os.getpid()}"
+        with open(tmp, "wb") as f:
+            f.truncate(self._offsets(capacity)[3])
+            header = np.zeros(HEADER_BYTES // 8, dtype=np.uint64)
+            header[[_MAGIC, _DIM, _GENERATION, _CAPACITY]] = (MAGIC, self.dim, generation, capacity)
+            f.write(header.tobytes())
+        os.replace(tmp, path)
+
+    def _map(self) -> bool:
+        """(Re)maps the file at `path`; False if it is missing or not a store."""
+        try:
+            with open(self.path, "r+b") as f:
+                stat = os.fstat(f.fileno())
+                if stat.st_size < HEADER_BYTES:
+                    return False
+                mm = mmap.mmap(f.fileno(), 0)
+        except FileNotFoundError:
+            return False
+        header = np.frombuffer(mm, dtype=np.uint64, count=HEADER_BYTES // 8)
+        if header[_MAGIC] != MAGIC:
+            return False
+        capacity = int(header[_CAPACITY])
+        names, versions, matrix, _ = self._offsets(capacity)
+        # Views keep the mapping alive; a replaced mapping is freed with its views
+        self.header = header
+        self.ids = np.frombuffer(mm, dtype=f"S{ID_BYTES}", count=capacity, offset=HEADER_BYTES)
+        self.names = np.frombuffer(mm, dtype=f"S{NAME_BYTES}", count=capacity, offset=names)
+        self.versions = np.frombuffer(mm, dtype=np.uint64, count=capacity, offset=versions)
+        self.matrix = np.frombuffer(mm, dtype=np.float32, count=capacity * self.dim, offset=matrix).reshape(
+            capacity, self.dim
+        )
+        self._inode = stat.st_ino
+        return True
+
+    def sync(self):
+        """Remaps if another process replaced the file with a larger one."""
+        try:
+            if os.stat(self.path).st_ino != self._inode:
+                self._map()
+        except FileNotFoundError:
+            pass
+
+    @contextmanager
+    def lock(self):
+        """Exclusive write lock across processes."""
+        fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+        try:
+            self.sync()
+            yield
+        finally:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+    @contextmanager
+    def writing(self):
+        """Marks a write in progress (odd generation); call with lock() held."""
+        self.header[_GENERATION] += 1
+        try:
+            yield
+        finally:
+            self.header[_GENERATION] += 1
+
+    def touch(self, rows):
+        """Marks `rows` (an index or slice) changed by the write in progress."""
+        self.versions[rows] = self.header[_GENERATION]
+
+    def repair(self):
+        """Ends a write left unfinished by a dead process; call with lock() held."""
+        if self.generation % 2:
+            self.header[_GENERATION] += 1
+
+    def set_size(self, size: int):
+        self.header[_SIZE] = size
+
+    def reserve(self, capacity: int):
+        """Grows the store (doubling) so `capacity` rows fit; call with lock() held."""
+        if capacity <= self.capacity:
+            return
+        new_capacity = max(capacity, 2 * self.capacity)
+        size, generation = self.size, self.generation
+        old = (self.header, self.ids, self.names, self.versions, self.matrix)
+        # Odd generation: readers that already map the new file wait for the copy
+        self._create(self.path, new_capacity, generation=generation + 1)
+        self._map()
+        self.ids[:size] = old[1][:size]
+        self.names[:size] = old[2][:size]
+        self.versions[:size] = old[3][:size]
+        self.matrix[:size] = old[4][:size]
+        self.set_size(size)
+        self.header[_GENERATION] = generation + 2
+        # Readers of the old file see a new generation and remap
+        old[0][_GENERATION] = generation + 2
+
+    def try_lead(self) -> bool:
+        """Becomes the leader unless another live process is (non-blocking)."""
+        if self._leader_fd is not None:
+            return True
+        fd = os.open(f"{self.path}.leader", os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        self._leader_fd = fd
+        return True
+
+    @property
+    def is_leader(self) -> bool:
+        return self._leader_fd is not None
+
+    def resign(self):
+        if self._leader_fd is not None:
+            os.close(self._leader_fd)  # Releases the lock
+            self._leader_fd = None
+
+
+def encode_name(name: str) -> bytes:
+    return name.encode("utf-8")[:NAME_BYTES]
+
+
+def decode_name(raw: bytes) -> str:
+    # Truncation may have split a multi-byte character
+    return raw.decode("utf-8", errors="ignore")
@@ -1,39 +1,97 @@
 import os
+import asyncio
 import httpx
+from abc import ABC, abstractmethod
+from typing import AsyncIterator, Optional
 
 # import json
-# import asyncio
 from dotenv import load_dotenv
 from deepgram import AsyncDeepgramClient
 
+from metrics import metrics
+
 load_dotenv()
 
 DEEPGRAM_API_KEY = os.getenv("DEEPGRAM_API_KEY")
+# Speech-to-text engine: "deepgram", "local" (faster-whisper on CPU) or "mock"
+STT_BACKEND = os.getenv("STT_BACKEND", "deepgram")
 
 # Initialize Deepgram Client
 # Passing api_key as keyword argument to satisfy BaseClient.__init__ signature
 deepgram = AsyncDeepgramClient(api_key=DEEPGRAM_API_KEY)
 
 
-async def transcribe_audio(audio_bytes: bytes) -> str:
+class STTBackend(ABC):
     """
-    Transcribes audio using Deepgram API via HTTP requests (Legacy/File based).
+    Interface of a speech-to-text engine: whole recordings (/transcribe),
+    recordings uploaded while recording (/ws/transcribe), and live PCM
+    audio (/ws/listen) through a socket with Deepgram's live interface.
     """
-    try:
-        url = "https://api.deepgram.com/v1/listen?model=nova-2&smart_format=true"
-        headers = {
-            "Authorization": f"Token {DEEPGRAM_API_KEY}",
-            "Content-Type": "audio/webm",
-        }
 
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                url, headers=headers, content=audio_bytes, timeout=30.0
+    name = "base"
+
+    @abstractmethod
+    async def transcribe(self, audio: bytes, content_type: str = "audio/webm") -> str:
+        """Transcribes a complete recording."""
+
+    @abstractmethod
+    async def transcribe_stream(
+        self, chunks: AsyncIterator[bytes], content_type: str = "audio/webm"
+    ) -> str:
+        """Transcribes a recording uploaded while it is still being produced."""
+
+    @abstractmethod
+    def connect_live(self, **options):
+        """
+        Async context manager yielding a live socket with `on(event, callback)`
+        and `send_media(pcm_bytes)` for 16 kHz mono int16 audio. "transcript"
+        callbacks receive results shaped like Deepgram's
+        (`result.channel.alternatives[0].transcript`).
+        """
+
+    def warmup(self):
+        pass
+
+    async def close(self):
+        pass
+
+
+class DeepgramBackend(STTBackend):
+    """
+    Deepgram pre-recorded API over one pooled, long-lived HTTP client.
+    Streaming uploads use chunked transfer encoding, so Deepgram receives
+    the audio as it is recorded instead of after the silence timer fires.
+    That only overlaps the upload with the recording: the pre-recorded API
+    starts transcribing once the request body is complete. (Transcription
+    that keeps up with the audio is what connect_live is for.)
+    """
+
+    name = "deepgram"
+    url = "https://api.deepgram.com/v1/listen?model=nova-2&smart_format=true"
+
+    def __init__(self, api_key: str, timeout: float = 30.0):
+        self.api_key = api_key
+        self.timeout = timeout
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(max_keepalive_connections=10, keepalive_expiry=60),
             )
+        return self._client
+
+    async def _post(self, content, content_type: str) -> str:
+        headers = {
+            "Authorization": f"Token {self.api_key}",
+            "Content-Type": content_type,
+        }
+        response = await self.client.post(self.url, headers=headers, content=content)
 
         if response.status_code != 200:
-            print(f"Deepgram API error: {response.text}")
-            return ""
+            raise RuntimeError(f"Deepgram API error {response.status_code}: {response.text}")
 
         data = response.json()
         transcript = (
@@ -44,6 +102,116 @@ async def transcribe_audio(audio_bytes: bytes) -> str:
         )
         return transcript
 
+    async def transcribe(self, audio: bytes, content_type: str = "audio/webm") -> str:
+        return await self._post(audio, content_type)
+
+    async def transcribe_stream(
+        self, chunks: AsyncIterator[bytes], content_type: str = "audio/webm"
+    ) -> str:
+        return await self._post(chunks, content_type)
+
+    def connect_live(self, **options):
+        # We use deepgram.listen.v1.connect since 'live' attribute is missing on this SDK version
+        return deepgram.listen.v1.connect(**options)
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+
+
+class MockSTTBackend(STTBackend):
+    """
+    Offline stand-in that returns a fixed transcript with a simulated cost
+    model (upload bandwidth, fixed latency, real-time factor), so the
+    record -> transcript -> summary chain can be benchmarked locally.
+    Like Deepgram's pre-recorded API, streaming only overlaps the upload
+    with the recording: the whole recording is processed once it ends.
+    """
+
+    name = "mock"
+
+    def __init__(
+        self,
+        transcript: str = os.getenv("MOCK_STT_TRANSCRIPT", "Hi, my name is Alex."),
+        base_latency_s: float = 0.15,
+        realtime_factor: float = 0.1,
+        bytes_per_second: float = 4000,  # ~32 kbps Opus webm
+        upload_bytes_per_s: float = 250_000,
+    ):
+        self.transcript = transcript
+        self.base_latency_s = base_latency_s
+        self.realtime_factor = realtime_factor
+        self.bytes_per_second = bytes_per_second
+        self.upload_bytes_per_s = upload_bytes_per_s
+
+    def _processing(self, size: int) -> float:
+        return size / self.bytes_per_second * self.realtime_factor
+
+    async def transcribe(self, audio: bytes, content_type: str = "audio/webm") -> str:
+        await asyncio.sleep(
+            len(audio) / self.upload_bytes_per_s
+            + self.base_latency_s
+            + self._processing(len(audio))
+        )
+        return self.transcript
+
+    async def transcribe_stream(
+        self, chunks: AsyncIterator[bytes], content_type: str = "audio/webm"
+    ) -> str:
+        size = 0
+        async for chunk in chunks:
+            await asyncio.sleep(len(chunk) / self.upload_bytes_per_s)
+            size += len(chunk)
+        await asyncio.sleep(self.base_latency_s + self._processing(size))
+        return self.transcript
+
+    def connect_live(self, **options):
+        from vad import VADLiveSession
+
+        async def transcribe_segment(segment):
+            # segment: one utterance as 16 kHz float32 samples
+            await asyncio.sleep(self.base_latency_s + len(segment) / 16000 * self.realtime_factor)
+            return self.transcript
+
+        return VADLiveSession(transcribe_segment)
+
+
+def create_stt_backend(name: str = STT_BACKEND) -> STTBackend:
+    if name == "mock":
+        return MockSTTBackend()
+    if name == "local":
+        # Optional dependency: pip install faster-whisper
+        from stt_local import LocalWhisperBackend
+
+        return LocalWhisperBackend()
+    return DeepgramBackend(DEEPGRAM_API_KEY)
+
+
+# Singleton instance
+stt_backend = create_stt_backend()
+
+
+async def transcribe_audio(audio_bytes: bytes) -> str:
+    """
+    Transcribes a complete recording with the configured STT backend.
+    """
+    try:
+        with metrics.timer(f"stt.{stt_backend.name}.batch"):
+            return await stt_backend.transcribe(audio_bytes)
     except Exception as e:
-        print(f"Error in Deepgram transcription: {e}")
+        metrics.incr("stt.errors")
+        print(f"Error in {stt_backend.name} transcription: {e}")
         return ""
+
+
+async def transcribe_stream(chunks: AsyncIterator[bytes]) -> str:
+    """
+    Transcribes audio chunks as they arrive (upload starts with the first chunk).
+    Errors are raised, so the client can fall back to uploading the recording.
+    """
+    try:
+        return await stt_backend.transcribe_stream(chunks)
+    except Exception as e:
+        metrics.incr("stt.errors")
+        print(f"Error in {stt_backend.name} streaming transcription: {e}")
+        raise
@@ -0,0 +1,112 @@
+import io
+import os
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import AsyncIterator, Optional, Union
+import numpy as np
+from dotenv import load_dotenv
+
+from speech import STTBackend
+from vad import VADLiveSession
+
+load_dotenv()
+
+# faster-whisper model size or path (tiny.en, base.en, small.en, ...)
+LOCAL_STT_MODEL = os.getenv("LOCAL_STT_MODEL", "base.en")
+LOCAL_STT_COMPUTE_TYPE = os.getenv("LOCAL_STT_COMPUTE_TYPE", "int8")
+LOCAL_STT_WORKERS = int(os.getenv("LOCAL_STT_WORKERS", "1"))
+# CPU threads per process; unset or empty: split the cores between the workers
+LOCAL_STT_THREADS = int(
+    os.getenv("LOCAL_STT_THREADS") or max(1, (os.cpu_count() or 1) // max(1, LOCAL_STT_WORKERS) // 2)
+)
+
+# Per worker process
+_model = None
+
+
+def _init_worker(model_name: str, compute_type: str, cpu_threads: int):
+    global _model
+    from faster_whisper import WhisperModel
+
+    _model = WhisperModel(
+        model_name, device="cpu", compute_type=compute_type, cpu_threads=cpu_threads
+    )
+
+
+def _transcribe(audio: Union[bytes, np.ndarray], vad_filter: bool) -> str:
+    # Encoded recordings (webm/wav) are decoded by faster-whisper; live
+    # utterances arrive as 16 kHz float32 samples already cut by our VAD.
+    source = io.BytesIO(audio) if isinstance(audio, bytes) else audio
+    segments, _ = _model.transcribe(
+        source,
+        language="en",
+        beam_size=1,
+        vad_filter=vad_filter,
+        condition_on_previous_text=False,
+    )
+    return " ".join(segment.text.strip() for segment in segments).strip()
+
+
+class LocalWhisperBackend(STTBackend):
+    """
+    On-device transcription with faster-whisper (CTranslate2, CPU). Models run
+    in a pool of worker processes so decoding never blocks the event loop or
+    competes with the face-recognition threads for the GIL. Recordings are
+    split on silence by Whisper's VAD filter; live audio is cut into
+    utterances by VADSegmenter before it reaches the pool.
+    """
+
+    name = "local"
+
+    def __init__(
+        self,
+        model_name: str = LOCAL_STT_MODEL,
+        compute_type: str = LOCAL_STT_COMPUTE_TYPE,
+        workers: int = LOCAL_STT_WORKERS,
+        cpu_threads: int = LOCAL_STT_THREADS,
+    ):
+        self.model_name = model_name
+        self.compute_type = compute_type
+        self.workers = workers
+        self.cpu_threads = cpu_threads
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: don't fork a process that already holds ONNX sessions and an event loop
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self.model_name, self.compute_type, self.cpu_threads),
+            )
+        return self._executor
+
+    async def _run(self, audio, vad_filter: bool) -> str:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, _transcribe, audio, vad_filter)
+
+    async def transcribe(self, audio: bytes, content_type: str = "audio/webm") -> str:
+        return await self._run(audio, vad_filter=True)
+
+    async def transcribe_stream(
+        self, chunks: AsyncIterator[bytes], content_type: str = "audio/webm"
+    ) -> str:
+        # A webm stream can't be decoded piecewise; there is no upload to overlap either
+        audio = b"".join([chunk async for chunk in chunks])
+        return await self.transcribe(audio, content_type)
+
+    def connect_live(self, **options) -> VADLiveSession:
+        return VADLiveSession(lambda segment: self._run(segment, vad_filter=False))
+
+    def warmup(self):
+        """Starts the worker processes (and loads the model) ahead of the first utterance."""
+        for _ in range(self.workers):
+            self.executor.submit(_transcribe, np.zeros(1600, dtype=np.float32), False)
+
+    async def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,137 @@
+import os
+import itertools
+import numpy as np
+from typing import List, Optional, Tuple
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Re-run recognition on a track at least every N frames
+TRACK_REEMBED_EVERY = int(os.getenv("TRACK_REEMBED_EVERY", "10"))
+# ... or when its box moved by more than this fraction of its size
+TRACK_MOVE_THRESHOLD = float(os.getenv("TRACK_MOVE_THRESHOLD", "0.35"))
+# ... or when its decayed confidence drops below this value
+TRACK_MIN_CONFIDENCE = float(os.getenv("TRACK_MIN_CONFIDENCE", "0.45"))
+
+_track_ids = itertools.count(1)
+
+
+def bbox_iou(a: List[int], b: List[int]) -> float:
+    """IoU of two [top, right, bottom, left] boxes."""
+    top, bottom = max(a[0], b[0]), min(a[2], b[2])
+    left, right = max(a[3], b[3]), min(a[1], b[1])
+    inter = max(0, bottom - top) * max(0, right - left)
+    area_a = (a[2] - a[0]) * (a[1] - a[3])
+    area_b = (b[2] - b[0]) * (b[1] - b[3])
+    union = area_a + area_b - inter
+    return inter / union if union > 0 else 0.0
+
+
+def bbox_shift(a: List[int], b: List[int]) -> float:
+    """Centre displacement plus size change between two boxes, relative to the size of `a`."""
+    size = max(a[2] - a[0], a[1] - a[3], 1)
+    centre_a = ((a[0] + a[2]) / 2, (a[1] + a[3]) / 2)
+    centre_b = ((b[0] + b[2]) / 2, (b[1] + b[3]) / 2)
+    distance = np.hypot(centre_a[0] - centre_b[0], centre_a[1] - centre_b[1])
+    size_change = abs(max(b[2] - b[0], b[1] - b[3]) - size)
+    return (distance + size_change) / size
+
+
+class Track:
+    """One face followed across frames, with the identity from its last embedding."""
+
+    def __init__(self, bbox: List[int]):
+        self.track_id = next(_track_ids)
+        self.bbox = bbox
+        self.missed = 0
+        self.frames_since_embed = 0
+        self.embedded_bbox = None  # bbox when recognition last ran
+        self.embedding = None
+        self.match: Optional[Tuple[str, str, float]] = None  # (person_id, name, sim)
+        self.confidence = 0.0
+
+    def set_embedding(self, embedding, match: Optional[Tuple[str, str, float]]):
+        self.embedding = embedding
+        self.match = match
+        self.confidence = float(match[2]) if match else 1.0
+        self.embedded_bbox = list(self.bbox)
+        self.frames_since_embed = 0
+
+
+class FaceTracker:
+    """
+    Per-connection tracker matching detections to tracks by IoU (with a
+    centroid-distance fallback). A track keeps its identity between frames
+    and is only re-embedded every `reembed_every` frames, when its box
+    moves significantly, or when its confidence decays.
+    """
+
+    def __init__(
+        self,
+        iou_threshold: float = 0.3,
+        max_centroid_shift: float = 0.5,
+        max_missed: int = 2,
+        reembed_every: int = TRACK_REEMBED_EVERY,
+        move_threshold: float = TRACK_MOVE_THRESHOLD,
+        min_confidence: float = TRACK_MIN_CONFIDENCE,
+        confidence_decay: float = 0.97,
+    ):
+        self.iou_threshold = iou_threshold
+        self.max_centroid_shift = max_centroid_shift
+        self.max_missed = max_missed
+        self.reembed_every = reembed_every
+        self.move_threshold = move_threshold
+        self.min_confidence = min_confidence
+        self.confidence_decay = confidence_decay
+        self.tracks: List[Track] = []
+
+    def update(self, bboxes: List[List[int]]) -> List[Track]:
+        """Assigns this frame's boxes to tracks; returns one track per box."""
+        pairs = []
+        for ti, track in enumerate(self.tracks):
+            for di, bbox in enumerate(bboxes):
+                iou = bbox_iou(track.bbox, bbox)
+                if iou >= self.iou_threshold:
+                    pairs.append((iou, ti, di))
+                elif bbox_shift(track.bbox, bbox) <= self.max_centroid_shift:
+                    pairs.append((0.0, ti, di))
+        pairs.sort(key=lambda p: p[0], reverse=True)
+
+        assigned: List[Optional[Track]] = [None] * len(bboxes)
+        used = set()
+        for _, ti, di in pairs:
+            if ti in used or assigned[di] is not None:
+                continue
+            used.add(ti)
+            assigned[di] = self.tracks[ti]
+
+        survivors = []
+        for ti, track in enumerate(self.tracks):
+            if ti not in used:
+                track.missed += 1
+                if track.missed <= self.max_missed:
+                    survivors.append(track)
+
+        for di, bbox in enumerate(bboxes):
+            track = assigned[di]
+            if track is None:
+                track = assigned[di] = Track(bbox)
+            else:
+                track.bbox = bbox
+                track.missed = 0
+                track.frames_since_embed += 1
+                track.confidence *= self.confidence_decay
+            survivors.append(track)
+
+        self.tracks = survivors
+        return assigned
+
+    def needs_embedding(self, track: Track) -> bool:
+        # Unknown faces are re-checked more often so a fresh registration shows up quickly
+        every = self.reembed_every if track.match else max(1, self.reembed_every // 3)
+        return (
+            track.embedded_bbox is None
+            or track.frames_since_embed >= every
+            or track.confidence < self.min_confidence
+            or bbox_shift(track.embedded_bbox, track.bbox) > self.move_threshold
+        )
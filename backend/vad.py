@@ -0,0 +1,156 @@
+import os
+import asyncio
+from types import SimpleNamespace
+from typing import Awaitable, Callable, Dict, List, Optional
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Frames quieter than this (dBFS) count as silence
+VAD_THRESHOLD_DB = float(os.getenv("VAD_THRESHOLD_DB", "-42"))
+# An utterance ends after this much silence ...
+VAD_MIN_SILENCE_MS = int(os.getenv("VAD_MIN_SILENCE_MS", "600"))
+# ... or when it reaches this length
+VAD_MAX_SEGMENT_S = float(os.getenv("VAD_MAX_SEGMENT_S", "15"))
+
+
+class VADSegmenter:
+    """
+    Energy-based voice activity detector that cuts a 16-bit mono PCM stream
+    into utterances. Frames above `threshold_db` are speech; an utterance is
+    closed after `min_silence_ms` of silence and keeps `pad_ms` of context on
+    both sides so word onsets aren't clipped.
+    """
+
+    def __init__(
+        self,
+        sample_rate: int = 16000,
+        frame_ms: int = 30,
+        threshold_db: float = VAD_THRESHOLD_DB,
+        min_silence_ms: int = VAD_MIN_SILENCE_MS,
+        max_segment_s: float = VAD_MAX_SEGMENT_S,
+        min_speech_ms: int = 150,
+        pad_ms: int = 200,
+    ):
+        self.sample_rate = sample_rate
+        self.frame = sample_rate * frame_ms // 1000
+        self.threshold = 32768 * 10 ** (threshold_db / 20)
+        self.silence_frames = max(1, min_silence_ms // frame_ms)
+        self.max_frames = int(max_segment_s * 1000 / frame_ms)
+        self.min_speech_frames = max(1, min_speech_ms // frame_ms)
+        self.pad_frames = pad_ms // frame_ms
+        self._pending = np.zeros(0, dtype=np.int16)
+        self._history: List[np.ndarray] = []  # silent frames before speech
+        self._segment: List[np.ndarray] = []
+        self._speech = 0
+        self._silence = 0
+
+    def feed(self, pcm: bytes) -> List[np.ndarray]:
+        """Adds PCM bytes; returns the utterances completed by them (float32 in [-1, 1])."""
+        samples = np.concatenate([self._pending, np.frombuffer(pcm, dtype=np.int16)])
+        usable = len(samples) - len(samples) % self.frame
+        self._pending = samples[usable:]
+        frames = samples[:usable].reshape(-1, self.frame)
+        if not len(frames):
+            return []
+        rms = np.sqrt(np.mean(frames.astype(np.float32) ** 2, axis=1))
+
+        done = []
+        for frame, loud in zip(frames, rms >= self.threshold):
+            if not self._segment:
+                if loud:
+                    self._segment = self._history + [frame]
+                    self._history = []
+                    self._speech, self._silence = 1, 0
+                else:
+                    self._history = (self._history + [frame])[-self.pad_frames :] if self.pad_frames else []
+                continue
+
+            self._segment.append(frame)
+            if loud:
+                self._speech += 1
+                self._silence = 0
+            else:
+                self._silence += 1
+            if self._silence >= self.silence_frames or len(self._segment) >= self.max_frames:
+                segment = self._close()
+                if segment is not None:
+                    done.append(segment)
+        return done
+
+    def flush(self) -> Optional[np.ndarray]:
+        """Closes the utterance in progress, if any (end of stream)."""
+        return self._close() if self._segment else None
+
+    def _close(self) -> Optional[np.ndarray]:
+        keep = len(self._segment) - max(0, self._silence - self.pad_frames)
+        segment, speech = self._segment[:keep], self._speech
+        self._segment, self._speech, self._silence = [], 0, 0
+        if speech < self.min_speech_frames:
+            return None  # a click or a cough
+        return np.concatenate(segment).astype(np.float32) / 32768.0
+
+
+def live_result(transcript: str):
+    """A transcript event shaped like Deepgram's live results (`result.channel.alternatives[0].transcript`)."""
+    return SimpleNamespace(
+        channel=SimpleNamespace(alternatives=[SimpleNamespace(transcript=transcript)])
+    )
+
+
+class VADLiveSession:
+    """
+    Live transcription socket for engines without a streaming API: PCM sent
+    with `send_media` is cut into utterances by a VADSegmenter and each one
+    is transcribed as soon as it ends. Exposes the same `on(event, callback)`
+    / `send_media(bytes)` interface as the Deepgram live socket.
+    """
+
+    def __init__(
+        self,
+        transcribe_segment: Callable[[np.ndarray], Awaitable[str]],
+        sample_rate: int = 16000,
+    ):
+        self.transcribe_segment = transcribe_segment
+        self.segmenter = VADSegmenter(sample_rate=sample_rate)
+        self.callbacks: Dict[str, List[Callable]] = {}
+        self._tasks = set()
+        self._order = asyncio.Lock()
+
+    def on(self, event: str, callback: Callable):
+        self.callbacks.setdefault(event, []).append(callback)
+
+    def _emit(self, event: str, payload):
+        for callback in self.callbacks.get(event, []):
+            callback(payload)
+
+    async def send_media(self, data: bytes):
+        for segment in self.segmenter.feed(data):
+            self._start(segment)
+
+    def _start(self, segment: np.ndarray):
+        task = asyncio.create_task(self._transcribe(segment))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _transcribe(self, segment: np.ndarray):
+        # Transcripts are emitted in utterance order
+        async with self._order:
+            try:
+                transcript = await self.transcribe_segment(segment)
+            except Exception as e:
+                self._emit("error", e)
+                return
+        if transcript:
+            self._emit("transcript", live_result(transcript))
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        segment = self.segmenter.flush()
+        if segment is not None:
+            self._start(segment)
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
@@ -0,0 +1,113 @@
+import argparse
+import asyncio
+import time
+import numpy as np
+
+from embedding_codec import person_of
+from face_index import IVFFlatIndex, FlatIndex, FACE_INDEX_NLIST, FACE_INDEX_NPROBE
+from recognition import EmbeddingCache
+
+
+class _Row:
+    def __init__(self, person_id, name, embedding):
+        self.id = person_id
+        self.name = name
+        self.face_embedding = embedding
+
+
+def synthetic_people(count: int, dim: int, seed: int, groups: int = 500):
+    """Random identities scattered around shared group centres, like real face embeddings."""
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(size=(groups, dim))
+    embeddings = centres[rng.integers(0, groups, count)] + rng.normal(size=(count, dim))
+    embeddings = embeddings.astype(np.float32)
+    return [_Row(f"{i:024x}", f"person-{i}", embeddings[i]) for i in range(count)]
+
+
+async def load_people():
+    from models import get_all_people
+
+    return await get_all_people()
+
+
+def make_queries(people, count: int, noise: float, seed: int):
+    """Noisy captures of enrolled people (should match) mixed with strangers."""
+    rng = np.random.default_rng(seed + 1)
+    dim = len(people[0].face_embedding)
+    picks = rng.integers(0, len(people), count // 2)
+    known = np.asarray([people[i].face_embedding for i in picks], dtype=np.float32)
+    known /= np.linalg.norm(known, axis=1, keepdims=True)
+    known += rng.normal(scale=noise / np.sqrt(dim), size=known.shape)
+    strangers = rng.normal(size=(count - len(known), dim)).astype(np.float32)
+    return np.vstack([known, strangers])
+
+
+def decisions(cache: EmbeddingCache, queries: np.ndarray, threshold: float):
+    """Match decisions one face at a time, as the recognition loop issues them."""
+    out = []
+    start = time.perf_counter()
+    for query in queries:
+        rows, sims = cache.search(query, top_k=1)
+        row, sim = rows[0, 0], sims[0, 0]
+        out.append(person_of(cache.ids[row]) if row >= 0 and sim >= threshold else None)
+    return out, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Checks that the IVF face index makes the same match decisions as brute force."
+    )
+    parser.add_argument("--synthetic", type=int, default=0, help="Use N random people instead of the DB")
+    parser.add_argument("--dim", type=int, default=512)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--noise", type=float, default=0.8)
+    parser.add_argument("--threshold", type=float, default=0.55)
+    parser.add_argument("--nlist", type=int, default=FACE_INDEX_NLIST)
+    parser.add_argument("--nprobe", type=int, default=FACE_INDEX_NPROBE)
+    parser.add_argument("--min-agreement", type=float, default=0.999)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.synthetic:
+        people = synthetic_people(args.synthetic, args.dim, args.seed)
+    else:
+        people = asyncio.run(load_people())
+    if not people:
+        print("No people to index.")
+        return 1
+
+    exact = EmbeddingCache(dim=len(people[0].face_embedding), index=FlatIndex())
+    exact.update(people)
+    ivf_index = IVFFlatIndex(nlist=args.nlist, nprobe=args.nprobe, min_rows=0, path=None)
+    approx = EmbeddingCache(dim=exact.dim, index=ivf_index)
+    start = time.perf_counter()
+    approx.update(people)
+    build_time = time.perf_counter() - start
+
+    queries = make_queries(people, args.queries, args.noise, args.seed)
+    expected, exact_time = decisions(exact, queries, args.threshold)
+    got, approx_time = decisions(approx, queries, args.threshold)
+
+    agree = sum(e == g for e, g in zip(expected, got))
+    matches = [(e, g) for e, g in zip(expected, got) if e is not None]
+    recall = sum(e == g for e, g in matches) / len(matches) if matches else 1.0
+    agreement = agree / len(queries)
+
+    print(f"People: {len(people)}  Queries: {len(queries)}  Matches (exact): {len(matches)}")
+    print(f"IVF nlist={args.nlist} nprobe={args.nprobe} build={build_time:.2f}s")
+    print(f"Decision agreement @ {args.threshold}: {agreement:.4f}")
+    print(f"Recall of exact matches: {recall:.4f}")
+    print(
+        f"Latency per query: exact={exact_time / len(queries) * 1e3:.3f}ms "
+        f"ivf={approx_time / len(queries) * 1e3:.3f}ms"
+    )
+
+    if agreement < args.min_agreement:
+        print("FAILED: IVF decisions diverge from brute force. Raise --nprobe.")
+        return 1
+    print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
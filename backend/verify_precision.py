@@ -0,0 +1,155 @@
+import argparse
+import copy
+import os
+import time
+from pathlib import Path
+import cv2
+import numpy as np
+from insightface.utils import face_align
+
+from detection_planner import DET_SIZE
+from face_index import FlatIndex
+from onnx_config import quantized_path
+from recognition import (
+    DETECTION_MODEL_PACK,
+    RECOGNITION_MODEL_PACK,
+    EmbeddingCache,
+    configure_session,
+    load_stage_model,
+)
+from verify_index import _Row, decisions
+
+IMAGE_SUFFIXES = (".jpg", ".jpeg", ".png", ".webp")
+
+
+def load_fixtures(directory: str):
+    """{person: [images]} from <directory>/<person>/*.jpg."""
+    people = {}
+    for folder in sorted(Path(directory).iterdir()):
+        if folder.is_dir():
+            images = [cv2.imread(str(p)) for p in sorted(folder.iterdir()) if p.suffix.lower() in IMAGE_SUFFIXES]
+            images = [image for image in images if image is not None]
+            if images:
+                people[folder.name] = images
+    return people
+
+
+def largest_face(det_model, image):
+    """(bbox [x1, y1, x2, y2], landmarks) of the largest detected face, or None."""
+    bboxes, kpss = det_model.detect(image, max_num=0, metric="default")
+    if bboxes.shape[0] == 0:
+        return None
+    areas = (bboxes[:, 2] - bboxes[:, 0]) * (bboxes[:, 3] - bboxes[:, 1])
+    i = int(np.argmax(areas))
+    return bboxes[i, :4], kpss[i]
+
+
+def box_iou(a, b) -> float:
+    w = max(0.0, min(a[2], b[2]) - max(a[0], b[0]))
+    h = max(0.0, min(a[3], b[3]) - max(a[1], b[1]))
+    inter = w * h
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def embed(rec_model, image, kps) -> np.ndarray:
+    crop = face_align.norm_crop(image, landmark=kps, image_size=rec_model.input_size[0])
+    return rec_model.get_feat([crop])[0]
+
+
+def pipeline_decisions(people, det_model, rec_model, threshold):
+    """
+    Enrolls the first image of every other person, then matches their other
+    images (should match) and all images of the remaining people (should be
+    unknown). Returns (decision per query image, expected, face per image,
+    seconds); images without a detected face decide "no face".
+    """
+    enrolled, vectors, expected, faces = [], {}, {}, []
+    start = time.perf_counter()
+    for n, (person, images) in enumerate(people.items()):
+        for k, image in enumerate(images):
+            face = largest_face(det_model, image)
+            faces.append(face)
+            vector = embed(rec_model, image, face[1]) if face is not None else None
+            if n % 2 == 0 and k == 0:
+                if vector is not None:
+                    enrolled.append(_Row(person, person, vector))
+                continue
+            expected[len(faces) - 1] = person if n % 2 == 0 else None
+            if vector is not None:
+                vectors[len(faces) - 1] = vector
+    seconds = time.perf_counter() - start
+
+    cache = EmbeddingCache(index=FlatIndex())
+    cache.update(enrolled)
+    got, _ = decisions(cache, np.asarray(list(vectors.values())), threshold)
+    decided = dict(zip(vectors, got))
+    queries = sorted(expected)
+    return (
+        [decided.get(i, "no face") for i in queries],
+        [expected[i] for i in queries],
+        faces,
+        seconds,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Checks that INT8 models make the same 0.55-threshold match decisions as fp32."
+    )
+    parser.add_argument("--fixtures", default="fixtures/faces", help="Directory of <person>/<image> files")
+    parser.add_argument("--threshold", type=float, default=0.55)
+    parser.add_argument("--min-agreement", type=float, default=0.99)
+    args = parser.parse_args()
+
+    people = load_fixtures(args.fixtures)
+    if len(people) < 2:
+        print(f"Need at least two people in {args.fixtures} (<person>/<image>).")
+        return 1
+
+    det = load_stage_model(DETECTION_MODEL_PACK, "detection")
+    det.prepare(ctx_id=0, input_size=DET_SIZE)
+    rec = load_stage_model(RECOGNITION_MODEL_PACK, "recognition")
+    rec.prepare(ctx_id=0)
+    for model in (det, rec):
+        if not os.path.exists(quantized_path(model.model_file)):
+            print(f"Missing {quantized_path(model.model_file)}; run quantize_models.py first.")
+            return 1
+    det32, rec32 = configure_session(det, "fp32"), configure_session(rec, "fp32")
+    det8 = configure_session(copy.copy(det), "int8")
+    rec8 = configure_session(copy.copy(rec), "int8")
+
+    fp32, expected, faces32, time32 = pipeline_decisions(people, det32, rec32, args.threshold)
+    int8, _, faces8, time8 = pipeline_decisions(people, det8, rec8, args.threshold)
+
+    found = [(a, b) for a, b in zip(faces32, faces8) if a is not None and b is not None]
+    det_agreement = sum(box_iou(a[0], b[0]) >= 0.8 for a, b in found) / max(1, len(found))
+    # Recognizer alone: both models on the same fp32 crops
+    all_images = [image for images in people.values() for image in images]
+    drift = []
+    for image, face in zip(all_images, faces32):
+        if face is not None:
+            e32, e8 = embed(rec32, image, face[1]), embed(rec8, image, face[1])
+            drift.append(float(np.dot(e32, e8) / (np.linalg.norm(e32) * np.linalg.norm(e8))))
+
+    agreement = sum(a == b for a, b in zip(fp32, int8)) / len(fp32)
+    accuracy32 = sum(a == e for a, e in zip(fp32, expected)) / len(fp32)
+    accuracy8 = sum(a == e for a, e in zip(int8, expected)) / len(int8)
+    images = len(all_images)
+
+    print(f"People: {len(people)}  Images: {images}  Queries: {len(fp32)}")
+    print(f"Detector box agreement (IoU >= 0.8): {det_agreement:.4f}")
+    print(f"Embedding cosine fp32 vs int8: mean={np.mean(drift):.4f} min={np.min(drift):.4f}")
+    print(f"Decision agreement @ {args.threshold}: {agreement:.4f}")
+    print(f"Accuracy: fp32={accuracy32:.4f} int8={accuracy8:.4f}")
+    print(f"Time per image: fp32={time32 / images * 1e3:.1f}ms int8={time8 / images * 1e3:.1f}ms")
+
+    if agreement < args.min_agreement:
+        print("FAILED: INT8 match decisions diverge from fp32.")
+        return 1
+    print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
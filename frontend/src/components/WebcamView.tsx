@@ -3,8 +3,9 @@
 
 import React, { useRef, useState, useEffect, useCallback } from 'react';
 import Webcam from 'react-webcam';
-import { RecognitionWebSocket } from '@/lib/websocket';
+import { RecognitionWebSocket, TranscriptionStream } from '@/lib/websocket';
 import { registerFace, transcribeAudio, addMemory } from '@/lib/api';
+import { randomId } from '@/lib/utils';
 import OverlayBox from './OverlayBox';
 import MemoryCard from './MemoryCard';
 import { Button } from '@/components/ui/button';
@@ -21,6 +22,10 @@ export default function WebcamView() {
     const [mediaRecorder, setMediaRecorder] = useState<MediaRecorder | null>(null);
     const [audioStream, setAudioStream] = useState<MediaStream | null>(null);
     const silenceTimer = useRef<NodeJS.Timeout | null>(null);
+    const frameId = useRef(0);
+    // Pairs this tab's sockets into one session; created once, not per render
+    const clientId = useRef('');
+    if (!clientId.current) clientId.current = randomId();
     const [transcript, setTranscript] = useState("");
     const [showTranscript, setShowTranscript] = useState(true);
 
@@ -30,7 +35,7 @@ export default function WebcamView() {
             if (Array.isArray(data)) {
                 setFaces(data);
             }
-        });
+        }, clientId.current);
         setSocket(ws);
         return () => ws.close();
     }, []);
@@ -41,9 +46,14 @@ export default function WebcamView() {
         if (isRecognitionActive && socket) {
             socket.connect();
             interval = setInterval(() => {
-                const imageSrc = webcamRef.current?.getScreenshot();
-                if (imageSrc) {
-                    socket.sendFrame(imageSrc);
+                // Send raw JPEG bytes (binary mode) instead of a Base64 data URL
+                const canvas = webcamRef.current?.getCanvas();
+                if (canvas) {
+                    canvas.toBlob((blob) => {
+                        if (blob) {
+                            socket.sendFrameBlob(blob, frameId.current++, canvas.width, canvas.height);
+                        }
+                    }, 'image/jpeg', 0.92);
                 }
             }, 300); // Increased to ~3fps for smoother tracking
         } else {
@@ -69,7 +79,7 @@ export default function WebcamView() {
                 // Determine WS URL
                 const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
                 const host = window.location.host;
-                const wsUrl = `ws://${window.location.hostname}:8000/ws/listen`;
+                const wsUrl = `ws://${window.location.hostname}:8000/ws/listen?client_id=${clientId.current}`;
 
                 audioWs = new WebSocket(wsUrl);
                 audioWs.binaryType = 'arraybuffer';
@@ -123,6 +133,11 @@ export default function WebcamView() {
                         console.log("Real-time Identity Update:", data);
                     } else if (data.type === 'transcript') {
                         setTranscript(data.text);
+                    } else if (data.type === 'job_done' && data.kind === 'add_memory') {
+                        const name = data.result?.summary?.name;
+                        toast.success(name ? `Memory stored for ${name}` : 'Memory stored');
+                    } else if (data.type === 'job_failed') {
+                        toast.error('Failed to store memory');
                     }
                 };
 
@@ -162,10 +177,13 @@ export default function WebcamView() {
             setAudioStream(stream);
             const recorder = new MediaRecorder(stream);
             const chunks: Blob[] = [];
+            // Upload chunks as they are recorded; the full blob is the fallback
+            const transcription = new TranscriptionStream();
 
             recorder.ondataavailable = (e) => {
                 if (e.data.size > 0) {
                     chunks.push(e.data);
+                    transcription.sendChunk(e.data);
                     if (silenceTimer.current) clearTimeout(silenceTimer.current);
                     silenceTimer.current = setTimeout(() => {
                         console.log("Silence detected, stopping recording...");
@@ -179,22 +197,31 @@ export default function WebcamView() {
                 const audioBlob = new Blob(chunks, { type: 'audio/webm' });
                 if (audioBlob.size > 1000) {
                     try {
-                        const { transcript } = await transcribeAudio(audioBlob);
+                        let transcript: string;
+                        try {
+                            transcript = await transcription.finish();
+                        } catch {
+                            ({ transcript } = await transcribeAudio(audioBlob));
+                        }
                         if (transcript) {
                             // Only link to a person if exactly ONE face is visible to avoid misattribution.
                             // If multiple people are present, let the backend try to identify by voice/context or store as generic.
                             const unambiguousPersonId = faces.length === 1 && faces[0].name !== 'Unknown' ? faces[0].person_id : '';
                             const currentImage = webcamRef.current?.getScreenshot();
 
+                            // Processed in the background; the result arrives on /ws/listen
                             await addMemory(
                                 unambiguousPersonId,
                                 transcript,
-                                currentImage || undefined
+                                currentImage || undefined,
+                                clientId.current
                             );
                         }
                     } catch (e) {
                         console.error(e);
                     }
+                } else {
+                    transcription.cancel();
                 }
             };
 
@@ -34,11 +34,17 @@ export async function transcribeAudio(audioBlob: Blob) {
     return response.json();
 }
 
-export async function addMemory(personId: string, transcript: string, imageBase64?: string) {
+// With a clientId the memory is processed in the background and the result
+// arrives as a `job_done` message on that client's /ws/listen socket.
+export async function addMemory(personId: string, transcript: string, imageBase64?: string, clientId?: string) {
     const formData = new FormData();
     if (personId) formData.append('person_id', personId);
     formData.append('transcript', transcript);
     if (imageBase64) formData.append('image_base64', imageBase64);
+    if (clientId) {
+        formData.append('background', 'true');
+        formData.append('client_id', clientId);
+    }
 
     const response = await fetch(`${API_URL}/add-memory`, {
         method: 'POST',
@@ -4,9 +4,11 @@ export class RecognitionWebSocket {
     private url: string;
     private onMessage: (data: any) => void;
 
-    constructor(onMessage: (data: any) => void) {
+    // sessionId pairs this socket with the device's /ws/listen socket (same client_id),
+    // so names heard by this device are only attached to faces seen by its camera
+    constructor(onMessage: (data: any) => void, sessionId?: string) {
         const wsUrl = process.env.NEXT_PUBLIC_WS_URL || 'ws://localhost:8000/ws/recognition';
-        this.url = wsUrl;
+        this.url = sessionId ? `${wsUrl}?session=${encodeURIComponent(sessionId)}` : wsUrl;
         this.onMessage = onMessage;
     }
 
@@ -39,9 +41,76 @@ export class RecognitionWebSocket {
         }
     }
 
+    // Binary mode: 20-byte header ("MLF1", frame id, width, height, capture time) + raw JPEG/WebP bytes
+    sendFrameBlob(image: Blob, frameId: number, width: number, height: number) {
+        if (this.socket && this.socket.readyState === WebSocket.OPEN) {
+            const header = new ArrayBuffer(20);
+            const view = new DataView(header);
+            'MLF1'.split('').forEach((c, i) => view.setUint8(i, c.charCodeAt(0)));
+            view.setUint32(4, frameId >>> 0, true);
+            view.setUint16(8, width, true);
+            view.setUint16(10, height, true);
+            view.setFloat64(12, Date.now(), true);
+            this.socket.send(new Blob([header, image]));
+        }
+    }
+
     close() {
         if (this.socket) {
             this.socket.close();
         }
     }
 }
+
+// Streams recorder chunks to /ws/transcribe while recording, so the upload is
+// done by the time the recording ends. finish() resolves with the transcript,
+// or rejects if the backend failed (callers fall back to POST /transcribe).
+export class TranscriptionStream {
+    private socket: WebSocket;
+    private pending: Blob[] = [];
+    private transcript: Promise<string>;
+
+    constructor() {
+        this.socket = new WebSocket(`ws://${window.location.hostname}:8000/ws/transcribe`);
+        this.transcript = new Promise((resolve, reject) => {
+            this.socket.onmessage = (event) => {
+                const data = JSON.parse(event.data);
+                if (data.type === 'transcript') resolve(data.text);
+                else if (data.type === 'error') reject(new Error(data.message));
+            };
+            this.socket.onerror = () => reject(new Error('Transcription stream failed'));
+            this.socket.onclose = () => reject(new Error('Transcription stream closed'));
+        });
+        // Rejections are only interesting to finish()
+        this.transcript.catch(() => {});
+        this.socket.onopen = () => {
+            // Chunks recorded before the socket opened
+            this.pending.forEach((chunk) => this.socket.send(chunk));
+            this.pending = [];
+        };
+    }
+
+    sendChunk(chunk: Blob) {
+        if (this.socket.readyState === WebSocket.OPEN) {
+            this.socket.send(chunk);
+        } else {
+            this.pending.push(chunk);
+        }
+    }
+
+    async finish(): Promise<string> {
+        if (this.socket.readyState !== WebSocket.OPEN) {
+            throw new Error('Transcription stream not connected');
+        }
+        this.socket.send('end');
+        try {
+            return await this.transcript;
+        } finally {
+            this.socket.close();
+        }
+    }
+
+    cancel() {
+        this.socket.close();
+    }
+}